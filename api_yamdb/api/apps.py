@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api_yamdb.db import close_unusable_connections
+
+        from . import signals  # noqa: F401
+
+        request_started.connect(close_unusable_connections,
+                                dispatch_uid='db_health_checks')
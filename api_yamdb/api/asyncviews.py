@@ -0,0 +1,65 @@
+"""
+Асинхронные обертки вьюсетов для запуска под ASGI (SERVER_MODE=asgi).
+
+DRF 3.12 не поддерживает асинхронные представления, поэтому вьюсет целиком,
+вместе с аутентификацией и проверкой прав, выполняется в потоке:
+- чтение (GET, HEAD, OPTIONS) — в общем пуле потоков
+  (thread_sensitive=False), и медленные запросы к БД выполняются
+  параллельно, не занимая цикл событий;
+- запись — в потоке запроса (thread_sensitive=True), как это делает
+  сам Django для синхронных представлений под ASGI.
+Соединение с БД в потоке пула принадлежит этому потоку, поэтому
+до и после запроса вызывается close_old_connections: устаревшее
+соединение закрывается по тем же правилам CONN_MAX_AGE,
+что и в конце обычного запроса.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+from api_yamdb.db import close_unusable_connections
+
+from .metrics import record_queries
+
+
+def render(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def render_with_fresh_connection(view, request, *args, **kwargs):
+    close_old_connections()
+    close_unusable_connections()
+    try:
+        with record_queries():
+            return render(view, request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронное представление, выполняющее view в потоке."""
+    read = sync_to_async(render_with_fresh_connection, thread_sensitive=False)
+    write = sync_to_async(render, thread_sensitive=True)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(view, request, *args, **kwargs)
+        return await write(view, request, *args, **kwargs)
+
+    return functools.update_wrapper(async_view, view)
+
+
+def async_read_urls(urls, viewsets):
+    """Оборачивает в async_read_view маршруты перечисленных вьюсетов."""
+    return [
+        URLPattern(url.pattern, async_read_view(url.callback),
+                   url.default_args, url.name)
+        if getattr(url.callback, 'cls', None) in viewsets else url
+        for url in urls
+    ]
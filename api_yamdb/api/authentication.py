@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from reviews.models import User
+
+# Поля пользователя, которых достаточно для проверки прав доступа.
+# Model.from_db ожидает значения в порядке полей модели.
+PRINCIPAL_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in ('id', 'username', 'role', 'is_staff',
+                         'is_superuser', 'is_active')
+)
+
+cache_key_prefix = 'jwt-user:'
+
+
+def get_cache_key(user_id):
+    return f'{cache_key_prefix}{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(get_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT без запроса к таблице пользователей:
+    поля PRINCIPAL_FIELDS берутся из кэша на JWT_USER_CACHE_TIMEOUT секунд
+    (0 — без кэша, поля читаются из БД одним запросом).
+    Пользователь создается как модель с отложенными полями:
+    остальные поля загружаются из БД при первом обращении.
+    Запись в кэше удаляется при изменении или удалении пользователя.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                'Token contained no recognizable user identification'
+            )
+        timeout = settings.JWT_USER_CACHE_TIMEOUT
+        key = get_cache_key(user_id)
+        values = cache.get(key) if timeout else None
+        if values is None:
+            values = (User.objects
+                      .filter(**{api_settings.USER_ID_FIELD: user_id})
+                      .values_list(*PRINCIPAL_FIELDS)
+                      .first())
+            if values is None:
+                raise AuthenticationFailed('User not found',
+                                           code='user_not_found')
+            if timeout:
+                cache.set(key, values, timeout)
+        user = User.from_db(router.db_for_read(User), PRINCIPAL_FIELDS,
+                            values)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user
@@ -0,0 +1,310 @@
+"""
+Пакетная запись произведений (POST /api/v1/titles/bulk/).
+
+Элементы пакета проверяются сериализатором без запросов к БД, слаги
+категорий и жанров всего пакета разрешаются одним запросом на модель,
+существующие произведения для upsert — одним запросом по ключу.
+Новые произведения и их связи с жанрами записываются bulk_create,
+измененные — bulk_update, все в одной транзакции. bulk_create
+и bulk_update не отправляют сигналов, поэтому счетчики TitleFacet
+и кэш ответов обновляются здесь один раз на пакет.
+
+Элементы с ошибками пропускаются (как в import_yamdb), ошибки
+возвращаются в ответе на месте элемента.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from reviews.models import Category, FacetChoices, Genre, Title, TitleFacet
+
+from .cache import response_cache
+from .validators import max_year_validator, min_year_validator
+
+# Ключи, по которым элемент пакета находит существующее произведение.
+UPSERT_KEYS = {
+    'id': ('id',),
+    'name,year': ('name', 'year'),
+}
+
+# Поля, обязательные для нового произведения (как в TitleSerializer).
+REQUIRED_FIELDS = ('name', 'year', 'category', 'genre')
+
+
+class TitleBulkItemSerializer(serializers.Serializer):
+    """
+    Элемент пакета. Все поля необязательны: при изменении передаются
+    только меняющиеся поля, обязательность для новых произведений
+    проверяет TitleBulkWriter.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    name = serializers.CharField(required=False, max_length=256)
+    year = serializers.IntegerField(required=False,
+                                    validators=[
+                                        min_year_validator,
+                                        max_year_validator,
+                                    ])
+    description = serializers.CharField(required=False, allow_blank=True)
+    category = serializers.SlugField(required=False)
+    genre = serializers.ListField(child=serializers.SlugField(),
+                                  required=False)
+
+
+class TitleBulkWriter:
+    """
+    Проверяет и сохраняет пакет произведений. Без ключа upsert все
+    элементы создаются; с ключом элемент, нашедший произведение,
+    изменяет в нем переданные поля (жанры заменяются целиком),
+    остальные создаются. Элемент с id, которого нет в БД, — ошибка.
+    """
+
+    def __init__(self, items, key=None):
+        self.items = items
+        self.key = UPSERT_KEYS[key] if key else None
+        self.errors = {}
+
+    def add_error(self, index, field, message):
+        self.errors.setdefault(index, {}).setdefault(field, []).append(
+            message
+        )
+
+    def validate_items(self):
+        """Проверяет элементы по отдельности: {индекс: данные}."""
+        data = {}
+        for index, item in enumerate(self.items):
+            serializer = TitleBulkItemSerializer(data=item)
+            if not serializer.is_valid():
+                self.errors[index] = serializer.errors
+            elif 'id' in serializer.validated_data and self.key != ('id',):
+                self.add_error(index, 'id', 'Изменение по id: ?upsert=id.')
+            else:
+                data[index] = serializer.validated_data
+        return data
+
+    def get_key(self, values):
+        if self.key is None or any(field not in values
+                                   for field in self.key):
+            return None
+        return tuple(values[field] for field in self.key)
+
+    def collect_keys(self, data):
+        """Ключи upsert элементов: {индекс: ключ}, без повторов."""
+        keys = {}
+        seen = set()
+        for index, values in data.items():
+            key = self.get_key(values)
+            if key is None:
+                continue
+            if key in seen:
+                self.add_error(index, api_settings.NON_FIELD_ERRORS_KEY,
+                               'Ключ повторяется в пакете.')
+                continue
+            seen.add(key)
+            keys[index] = key
+        return keys
+
+    def load_existing(self, data):
+        """
+        Находит одним запросом произведения по ключу upsert
+        и блокирует их строки до конца транзакции.
+        """
+        keys = self.collect_keys(data)
+        if not keys:
+            return {}
+        if self.key == ('id',):
+            titles = Title.objects.filter(
+                pk__in=[key[0] for key in keys.values()]
+            )
+        else:
+            titles = Title.objects.filter(
+                name__in={key[0] for key in keys.values()},
+                year__in={key[1] for key in keys.values()}
+            )
+        found = defaultdict(list)
+        for title in titles.select_for_update().order_by('pk'):
+            found[tuple(getattr(title, field)
+                        for field in self.key)].append(title)
+        matches = {}
+        for index, key in keys.items():
+            titles = found.get(key, ())
+            if len(titles) > 1:
+                self.add_error(index, api_settings.NON_FIELD_ERRORS_KEY,
+                               'Ключу соответствует несколько произведений.')
+            elif titles:
+                matches[index] = titles[0]
+            elif self.key == ('id',):
+                self.add_error(index, 'id',
+                               f'Произведение с id={key[0]} не найдено.')
+        return matches
+
+    def resolve_slugs(self, data):
+        """Слаги категорий и жанров пакета: {slug: id}, запрос на модель."""
+        category_slugs = {values['category'] for values in data.values()
+                          if 'category' in values}
+        genre_slugs = {slug for values in data.values()
+                       for slug in values.get('genre', ())}
+        categories = dict(
+            Category.objects.filter(slug__in=category_slugs)
+            .values_list('slug', 'id')
+        ) if category_slugs else {}
+        genres = dict(
+            Genre.objects.filter(slug__in=genre_slugs)
+            .values_list('slug', 'id')
+        ) if genre_slugs else {}
+        for index, values in data.items():
+            category = values.get('category')
+            if category is not None and category not in categories:
+                self.add_error(index, 'category',
+                               f'Объект с slug={category} не существует.')
+            for slug in values.get('genre', ()):
+                if slug not in genres:
+                    self.add_error(index, 'genre',
+                                   f'Объект с slug={slug} не существует.')
+        return categories, genres
+
+    def check_required(self, data, matches):
+        message = str(serializers.Field.default_error_messages['required'])
+        for index, values in data.items():
+            if index in matches:
+                continue
+            for field in REQUIRED_FIELDS:
+                if field not in values:
+                    self.add_error(index, field, message)
+
+    def insert(self, titles):
+        """
+        Вставляет новые произведения. Возвращает True, если категорию
+        и год в TitleFacet уже учли сигналы.
+        """
+        connection = connections[router.db_for_write(Title)]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+            return False
+        # bulk_create без RETURNING (SQLite) не заполняет id, нужные
+        # для связей с жанрами: произведения сохраняются по одному.
+        for title in titles:
+            title.save()
+        return True
+
+    def save(self):
+        """
+        Сохраняет корректные элементы пакета. Возвращает список той же
+        длины: {'id', 'created'} для сохраненных элементов и {'errors'}
+        для пропущенных.
+        """
+        data = self.validate_items()
+        with transaction.atomic():
+            matches = self.load_existing(data)
+            categories, genres = self.resolve_slugs(data)
+            self.check_required(data, matches)
+            data = {index: values for index, values in data.items()
+                    if index not in self.errors}
+            matches = {index: title for index, title in matches.items()
+                       if index in data}
+            saved = self.write(data, matches, categories, genres)
+        if saved:
+            response_cache.invalidate('titles')
+        results = []
+        for index in range(len(self.items)):
+            if index in self.errors:
+                results.append({'errors': self.errors[index]})
+            else:
+                results.append({
+                    'id': saved[index].pk,
+                    'created': index not in matches,
+                })
+        return results
+
+    def write(self, data, matches, categories, genres):
+        """Записывает пакет; возвращает {индекс: произведение}."""
+        self.facets = {facet: Counter() for facet in FacetChoices.values}
+        created = self.create_titles(data, matches, categories)
+        self.update_titles(data, matches, categories)
+        saved = {**created, **matches}
+        self.replace_genres(
+            {saved[index].pk: {genres[slug] for slug in values['genre']}
+             for index, values in data.items() if 'genre' in values},
+            {title.pk for title in created.values()}
+        )
+        if matches:
+            Title.objects.filter(
+                pk__in=[title.pk for title in matches.values()]
+            ).touch()
+        self.shift_facets()
+        return saved
+
+    def create_titles(self, data, matches, categories):
+        created = {
+            index: Title(
+                name=values['name'],
+                year=values['year'],
+                description=values.get('description', ''),
+                category_id=categories[values['category']],
+            )
+            for index, values in data.items() if index not in matches
+        }
+        if not self.insert(list(created.values())):
+            for title in created.values():
+                self.facets[FacetChoices.CATEGORY][title.category_id] += 1
+                self.facets[FacetChoices.YEAR][title.year] += 1
+        return created
+
+    def update_titles(self, data, matches, categories):
+        """Изменяет переданные поля найденных произведений одним запросом."""
+        fields = set()
+        for index, title in matches.items():
+            values = data[index]
+            old_state = (title.category_id, title.year)
+            for field in ('name', 'year', 'description'):
+                if field in values:
+                    setattr(title, field, values[field])
+                    fields.add(field)
+            if 'category' in values:
+                title.category_id = categories[values['category']]
+                fields.add('category')
+            for facet, old, new in zip(
+                (FacetChoices.CATEGORY, FacetChoices.YEAR),
+                old_state, (title.category_id, title.year)
+            ):
+                if old != new:
+                    self.facets[facet][old] -= 1
+                    self.facets[facet][new] += 1
+        if fields:
+            Title.objects.bulk_update(matches.values(), sorted(fields))
+
+    def replace_genres(self, genres, created):
+        """
+        Заменяет жанры произведений: {id произведения: id жанров}.
+        Связи измененных произведений удаляются и создаются заново
+        одним DELETE и одним INSERT.
+        """
+        through = Title.genre.through
+        replaced = [pk for pk in genres if pk not in created]
+        old_genres = defaultdict(set)
+        if replaced:
+            links = (through.objects.filter(title_id__in=replaced)
+                     .values_list('title_id', 'genre_id'))
+            for title_id, genre_id in links:
+                old_genres[title_id].add(genre_id)
+            through.objects.filter(title_id__in=replaced).delete()
+        for pk, genre_ids in genres.items():
+            self.facets[FacetChoices.GENRE].update(genre_ids - old_genres[pk])
+            self.facets[FacetChoices.GENRE].subtract(
+                old_genres[pk] - genre_ids
+            )
+        through.objects.bulk_create(
+            through(title_id=pk, genre_id=genre_id)
+            for pk, genre_ids in genres.items()
+            for genre_id in genre_ids
+        )
+
+    def shift_facets(self):
+        """Обновляет счетчики: один вызов shift на срез и величину delta."""
+        for facet, counter in self.facets.items():
+            values = defaultdict(list)
+            for value, delta in counter.items():
+                if delta:
+                    values[delta].append(value)
+            for delta, group in values.items():
+                TitleFacet.objects.shift(facet, group, delta)
@@ -0,0 +1,140 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+from reviews.models import ResourceVersion
+
+
+def get_request_signature(request):
+    """
+    Строка, однозначно описывающая GET-запрос: путь,
+    отсортированные непустые параметры и формат ответа.
+    """
+    params = sorted(
+        (name, values)
+        for name, values in request.query_params.lists()
+        if any(values)
+    )
+    return f'{request.path}:{params}:{request.accepted_renderer.format}'
+
+
+class LocMemLRUBackend:
+    """
+    LRU-кэш в памяти процесса
+    с ограничением на количество записей и время жизни записи.
+    """
+
+    def __init__(self, max_entries=1000, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Хранит ответы в общем кэше Django из настройки CACHES."""
+
+    def __init__(self, alias='default', timeout=60):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ResponseCache:
+    """
+    Кэш отрендеренных ответов API с версионированием по ресурсам.
+    Версия ресурса входит в ключ записи: запись в ресурс увеличивает версию,
+    и старые записи больше никогда не читаются.
+    Версии хранятся в БД (ResourceVersion) и меняются в транзакции записи,
+    поэтому их видят все процессы, даже с кэшем ответов в памяти процесса.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        config = settings.RESPONSE_CACHE
+        return cls(import_string(config['BACKEND'])(
+            **config.get('OPTIONS', {})
+        ))
+
+    def get_version(self, resource):
+        return ResourceVersion.objects.get_version(resource)
+
+    def invalidate(self, *resources):
+        """
+        Увеличивает версии ресурсов. Внутри транзакции новая версия
+        становится видна вместе с изменениями при коммите: ответ,
+        собранный по старым данным, сохраняется под старой версией.
+        """
+        for resource in resources:
+            ResourceVersion.objects.bump(resource)
+
+    def make_key(self, resource, request, version=None):
+        if version is None:
+            version = self.get_version(resource)
+        raw = f'{resource}:{version}:{get_request_signature(request)}'
+        return 'response-cache:' + hashlib.sha1(raw.encode()).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+response_cache = SimpleLazyObject(ResponseCache.from_settings)
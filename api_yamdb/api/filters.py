@@ -1,11 +1,36 @@
 from django_filters import rest_framework as drf
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 from reviews.models import Title
+from reviews.search import search
 
 
 class SlugFilter(drf.FilterSet):
     category = drf.CharFilter(field_name='category__slug', lookup_expr='exact')
     genre = drf.CharFilter(field_name='genre__slug', lookup_expr='exact')
+    min_rating = drf.NumberFilter(field_name='rating', lookup_expr='gte')
+    max_rating = drf.NumberFilter(field_name='rating', lookup_expr='lte')
 
     class Meta:
         model = Title
-        fields = ['name', 'year', 'category', 'genre']
+        fields = ['name', 'year', 'category', 'genre', 'min_rating',
+                  'max_rating']
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск ?q=. Без явного ?ordering=
+    результаты сортируются по релевантности.
+    """
+
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = search(queryset, query)
+        if ('search_rank' not in queryset.query.annotations
+                or api_settings.ORDERING_PARAM in request.query_params):
+            return queryset
+        return queryset.order_by('-search_rank', 'pk')
@@ -0,0 +1,160 @@
+"""
+Метрики запросов: количество запросов к БД, время в БД, время
+сериализации, размер и длительность ответа — гистограммами по маршрутам.
+Метрики хранятся в памяти процесса, при нескольких воркерах gunicorn
+каждый отдает свои.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+from .cache import response_cache
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Гистограммы: имя, описание, границы корзин.
+HISTOGRAMS = {
+    'duration': ('yamdb_request_duration_seconds',
+                 'Длительность обработки запроса', DURATION_BUCKETS),
+    'queries': ('yamdb_request_queries',
+                'Количество запросов к БД', QUERY_BUCKETS),
+    'db_time': ('yamdb_request_db_seconds',
+                'Время выполнения запросов к БД', DURATION_BUCKETS),
+    'serializer_time': ('yamdb_request_serializer_seconds',
+                        'Время работы обработчика вне БД и рендеринга',
+                        DURATION_BUCKETS),
+    'response_size': ('yamdb_response_size_bytes',
+                      'Размер тела ответа', SIZE_BUCKETS),
+}
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.handler_started = None
+        self.handler_db_time = 0
+        self.serializer_time = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def start_handler(self):
+        self.handler_started = time.perf_counter()
+        self.handler_db_time = self.db_time
+
+    def finish_handler(self):
+        if self.handler_started is None:
+            return
+        self.serializer_time = (
+            time.perf_counter() - self.handler_started
+            - (self.db_time - self.handler_db_time)
+        )
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+
+@contextmanager
+def record_queries():
+    """
+    Учитывает в метриках текущего запроса запросы к БД из этого потока:
+    execute_wrapper действует на соединения только своего потока.
+    """
+    metrics = current_metrics.get()
+    with ExitStack() as stack:
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.record_query)
+                )
+        yield
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def observe(self, route, metrics, response_size):
+        values = {
+            'duration': metrics.duration,
+            'queries': metrics.queries,
+            'db_time': metrics.db_time,
+            'serializer_time': metrics.serializer_time,
+        }
+        if response_size is not None:
+            values['response_size'] = response_size
+        with self.lock:
+            histograms = self.routes.setdefault(route, {
+                name: Histogram(buckets)
+                for name, (_, _, buckets) in HISTOGRAMS.items()
+            })
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (metric, description, buckets) in HISTOGRAMS.items():
+                lines += [f'# HELP {metric} {description}',
+                          f'# TYPE {metric} histogram']
+                for route, histograms in sorted(self.routes.items()):
+                    histogram = histograms[name]
+                    label = f'route="{route}"'
+                    for bound, count in zip(buckets, histogram.counts):
+                        lines.append(
+                            f'{metric}_bucket{{{label},le="{bound}"}} {count}'
+                        )
+                    lines += [
+                        f'{metric}_bucket{{{label},le="+Inf"}} '
+                        f'{histogram.count}',
+                        f'{metric}_sum{{{label}}} {histogram.sum}',
+                        f'{metric}_count{{{label}}} {histogram.count}',
+                    ]
+        stats = response_cache.stats()
+        for name in ('hits', 'misses'):
+            metric = f'yamdb_response_cache_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {stats[name]}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
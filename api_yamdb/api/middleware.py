@@ -0,0 +1,37 @@
+from django.conf import settings
+
+from .metrics import RequestMetrics, current_metrics, record_queries, registry
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики запроса (см. api.metrics) по имени маршрута,
+    например titles-list или reviews-detail, и при включенной настройке
+    METRICS['SERVER_TIMING'] добавляет заголовок Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS['ENABLED']:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with record_queries():
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        registry.observe(route, metrics, size)
+        if settings.METRICS['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.1f};'
+                f'desc="{metrics.queries} queries", '
+                f'serializer;dur={metrics.serializer_time * 1000:.1f}, '
+                f'total;dur={metrics.duration * 1000:.1f}'
+            )
+        return response
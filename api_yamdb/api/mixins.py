@@ -1,8 +1,192 @@
+import hashlib
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, viewsets
 
+from api_yamdb.db.routers import reads_from_replicas
+
+from .cache import get_request_signature, response_cache
+from .metrics import current_metrics
+
+
+class MetricsMixin:
+    """
+    Отмечает для MetricsMiddleware начало и конец работы обработчика:
+    после проверки прав и до готового ответа. Время без запросов к БД
+    считается временем сериализации. Mixin ставится первым в списке
+    базовых классов, чтобы учесть и рендеринг в других mixin.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.start_handler()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        try:
+            return super().finalize_response(request, response,
+                                             *args, **kwargs)
+        finally:
+            metrics = current_metrics.get()
+            if metrics is not None:
+                metrics.finish_handler()
+
+
+class ValuesReadMixin:
+    """
+    Отвечает на GET list и retrieve сериализатором values_serializer_class
+    (см. serializers.ValuesSerializer): после фильтрации queryset
+    переводится в values(), и модели для строк ответа не создаются.
+    Права на объект для безопасных методов не должны обращаться
+    к атрибутам объекта: вместо модели будет словарь.
+    """
+
+    values_serializer_class = None
+    values_actions = ('list', 'retrieve')
+
+    def use_values_serializer(self):
+        return (self.values_serializer_class is not None
+                and self.action in self.values_actions
+                and self.request.method in ('GET', 'HEAD'))
+
+    def get_serializer_class(self):
+        if self.use_values_serializer():
+            return self.values_serializer_class
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_values_serializer():
+            return self.values_serializer_class.get_values_queryset(queryset)
+        return queryset
+
 
 class CreateListDestroyViewSet(mixins.CreateModelMixin,
                                mixins.ListModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
     pass
+
+
+class EarlyResponseError(Exception):
+    """
+    Не ошибка: прерывает обработку запроса,
+    ответ на который готов до вызова действия вьюсета.
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+
+class EarlyResponseMixin:
+
+    def handle_exception(self, exc):
+        if isinstance(exc, EarlyResponseError):
+            return exc.response
+        return super().handle_exception(exc)
+
+
+class ConditionalGetMixin(EarlyResponseMixin, ABC):
+    """
+    Добавляет к ответам list и retrieve заголовки ETag и Last-Modified
+    и отвечает 304 на If-None-Match / If-Modified-Since
+    до выборки данных и сериализации.
+    При чтении с реплик заголовки не добавляются: отстающая реплика
+    отдала бы старые данные с версией из основной БД.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    _etag = None
+    _last_modified = None
+
+    @abstractmethod
+    def get_conditional_state(self):
+        """Возвращает (версия данных ответа, время изменения или None)."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (self.action not in self.conditional_actions
+                or request.method not in ('GET', 'HEAD')
+                or reads_from_replicas()):
+            return
+        version, last_modified = self.get_conditional_state()
+        raw = f'{version}:{get_request_signature(request)}'
+        self._etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+        if last_modified is not None:
+            self._last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=self._etag, last_modified=self._last_modified
+        )
+        if response is not None:
+            raise EarlyResponseError(response)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        if self._etag and response.status_code in (200, 304):
+            response['ETag'] = self._etag
+            if self._last_modified is not None:
+                response['Last-Modified'] = http_date(self._last_modified)
+        return response
+
+
+class CachedResponseMixin(EarlyResponseMixin):
+    """
+    Отдает ответы list и retrieve из кэша ответов API.
+    Кэшируются только успешные JSON-ответы; ключ учитывает версию
+    ресурса cache_resource, путь и нормализованные параметры запроса.
+    Ответы, прочитанные с реплик, не сохраняются: реплика может еще
+    не получить запись, которая уже изменила версию.
+    """
+
+    cache_resource = None
+    cached_actions = ('list', 'retrieve')
+    _response_cache_key = None
+    _resource_version = None
+
+    def get_resource_version(self):
+        """Версия ресурса cache_resource, читается один раз за запрос."""
+        if self._resource_version is None:
+            self._resource_version = response_cache.get_version(
+                self.cache_resource
+            )
+        return self._resource_version
+
+    def is_response_cacheable(self, request):
+        return (settings.RESPONSE_CACHE['ENABLED']
+                and self.action in self.cached_actions
+                and request.method in ('GET', 'HEAD')
+                and request.accepted_renderer.format == 'json')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.is_response_cacheable(request):
+            return
+        # Версия читается до запросов к БД: ответ, собранный во время
+        # параллельной записи, сохранится под старой версией.
+        key = response_cache.make_key(self.cache_resource, request,
+                                      self.get_resource_version())
+        cached = response_cache.get(key)
+        if cached is None:
+            if not reads_from_replicas():
+                self._response_cache_key = key
+            return
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['X-Cache'] = 'HIT'
+        raise EarlyResponseError(response)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        if self._response_cache_key and response.status_code == 200:
+            response.render()
+            response_cache.set(self._response_cache_key,
+                               (response.content, response['Content-Type']))
+            response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,143 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Постраничный вывод по ключу сортировки (keyset pagination).
+    Следующая страница выбирается условием по последней строке предыдущей,
+    поэтому запрос не использует OFFSET и не считает общее число записей:
+    любая страница стоит столько же, сколько первая.
+    Поля ordering должны однозначно упорядочивать записи
+    и совпадать с составным индексом модели.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('id',)
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = (self.get_position(rows[-1])
+                              if self.has_next else None)
+        return rows
+
+    def get_position(self, row):
+        """Возвращает значения полей сортировки для строки выборки."""
+        if isinstance(row, dict):
+            return [row[field] for field in self.ordering]
+        return [getattr(row, field) for field in self.ordering]
+
+    def get_position_filter(self, position):
+        """
+        Условие (a, b) > (x, y), записанное через OR,
+        чтобы его поддерживали все СУБД.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            prefix = dict(zip(self.ordering[:index], position[:index]))
+            condition |= Q(**prefix, **{f'{field}__gt': position[index]})
+        return condition
+
+    def encode_cursor(self, position):
+        # isoformat() сохраняет микросекунды pub_date, иначе курсор
+        # пропускал бы записи, созданные в ту же миллисекунду.
+        data = json.dumps(position, default=lambda value: value.isoformat())
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [self.model._meta.get_field(field).to_python(value)
+                    for field, value in zip(self.ordering, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                },
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPagination(pagination.PageNumberPagination):
+    """
+    Постраничный вывод по номеру страницы, который переключается
+    в режим KeysetPagination параметром ?pagination=cursor
+    или переданным курсором ?cursor=.
+    В режиме курсора сортировка задается keyset_ordering.
+    """
+
+    keyset_ordering = ('id',)
+    mode_query_param = 'pagination'
+    keyset = None
+
+    def is_keyset_requested(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param
+                in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_keyset_requested(request):
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = KeysetPagination()
+        self.keyset.ordering = self.keyset_ordering
+        self.keyset.page_size = self.get_page_size(request)
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TitlePagination(OptionalKeysetPagination):
+    keyset_ordering = ('name', 'id')
+
+
+class PubDatePagination(OptionalKeysetPagination):
+    keyset_ordering = ('pub_date', 'id')
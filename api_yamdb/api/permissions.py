@@ -13,6 +13,19 @@ class IsAdminOrSuperUser(permissions.BasePermission):
                      or (request.user.is_staff and request.user.is_superuser)))
 
 
+class IsModeratorOrAdmin(permissions.BasePermission):
+    """
+    Доступ модератору, админу и суперпользователю: права проверяются
+    один раз на запрос, без проверки отдельных объектов.
+    """
+
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated
+                and (request.user.is_moderator
+                     or request.user.is_admin
+                     or (request.user.is_staff and request.user.is_superuser)))
+
+
 class IsSuperUserIsAdminIsModeratorIsAuthor(permissions.BasePermission):
     """
     Анонимный пользователь может совершать только безопасные запросы.
@@ -28,7 +41,7 @@ class IsSuperUserIsAdminIsModeratorIsAuthor(permissions.BasePermission):
             and ((request.user.is_staff and request.user.is_superuser)
                  or request.user.is_admin
                  or request.user.is_moderator
-                 or request.user == obj.author)
+                 or obj.author_id == request.user.pk)
         )
 
 
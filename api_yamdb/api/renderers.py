@@ -0,0 +1,39 @@
+"""
+JSON-ответы API через orjson, если он установлен.
+
+orjson сам кодирует словари, списки, числа и datetime (UTC — с суффиксом Z,
+как JSONEncoder DRF), остальное передается в default JSONEncoder DRF.
+Ответ совпадает с ответом JSONRenderer DRF. Без orjson, с отступами
+(?indent, браузерный API) или при ошибке orjson ответ рендерит сам
+JSONRenderer на стандартном json.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None
+                or self.get_indent(accepted_media_type or '',
+                                   renderer_context or {})
+                or not self.compact or self.ensure_ascii):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=JSONEncoder().default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Как и JSONRenderer: U+2028 и U+2029 допустимы в JSON,
+        # но не в JavaScript.
+        return (content.replace('\u2028'.encode(), b'\\u2028')
+                .replace('\u2029'.encode(), b'\\u2029'))
@@ -1,8 +1,13 @@
+from abc import ABC, abstractmethod
+
 from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.moderation import ModerationAction
 
 from .validators import (email_uniq_validator, max_score_validator,
                          max_year_validator, min_score_validator,
@@ -22,22 +27,59 @@ class AuthSignupSerializer(serializers.ModelSerializer):
         fields = ['username', 'email']
         model = User
 
-    def validate(self, attrs):
-        username = attrs['username']
-        email = attrs['email']
-        if User.objects.filter(username=username).exists():
-            user = User.objects.get(username=username)
-            if user.email != email:
-                raise serializers.ValidationError(
-                    f'Для пользователя <{username}> '
-                    'не правильно указана почта!'
-                )
-        elif User.objects.filter(email=email).exists():
-            raise serializers.ValidationError(
-                f'Почта <{email}> уже зарегистрирована '
-                'для другого пользователя!'
-            )
-        return attrs
+    def get_or_create_user(self, username, email):
+        """
+        Возвращает пользователя с этими username и email, блокируя его
+        строку до конца транзакции, или создает нового.
+        """
+        users = list(User.objects
+                     .select_for_update()
+                     .filter(Q(username=username) | Q(email=email))[:2])
+        for user in users:
+            if user.username == username and user.email == email:
+                return user
+        for user in users:
+            if user.username == username:
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f'Для пользователя <{username}> '
+                        'не правильно указана почта!'
+                    ]
+                })
+        if users:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Почта <{email}> уже зарегистрирована '
+                    'для другого пользователя!'
+                ]
+            })
+        return User.objects.create(username=username, email=email)
+
+    def create(self, validated_data):
+        """
+        Регистрирует пользователя или находит уже зарегистрированного
+        и выдает ему новый код подтверждения.
+        Если одновременная регистрация с тем же username или email
+        успела создать пользователя, запрос повторяется и видит его.
+        """
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    user = self.get_or_create_user(validated_data['username'],
+                                                   validated_data['email'])
+                    user.confirmation_code = (
+                        default_token_generator.make_token(user)
+                    )
+                    user.save(update_fields=['confirmation_code'])
+                    return user
+            except IntegrityError:
+                continue
+        raise serializers.ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                'Пользователь с такими данными уже регистрируется, '
+                'повторите запрос.'
+            ]
+        })
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -49,14 +91,25 @@ class AuthTokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(required=True, max_length=40)
 
     def validate(self, attrs):
+        """
+        Проверяет код и сразу заменяет его новым: код одноразовый,
+        а после неверной попытки прежний код тоже перестает действовать.
+        Замена выполняется условным UPDATE, поэтому из одновременных
+        запросов с одним кодом успешен только один.
+        """
         username = attrs['username']
         confirmation_code = attrs['confirmation_code']
-        user = get_object_or_404(User, username=username)
-        user_confirmation_code = user.confirmation_code
-        user.confirmation_code = default_token_generator.make_token(user)
-        user.save()
-        if user_confirmation_code != confirmation_code:
+        user = get_object_or_404(
+            User.objects.only('username', 'email', 'password', 'last_login'),
+            username=username
+        )
+        new_code = default_token_generator.make_token(user)
+        if not User.objects.filter(
+            pk=user.pk, confirmation_code=confirmation_code
+        ).update(confirmation_code=new_code):
+            User.objects.filter(pk=user.pk).update(confirmation_code=new_code)
             raise serializers.ValidationError('Неверный confirmation_code!')
+        attrs['user'] = user
         return attrs
 
 
@@ -108,8 +161,8 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
-        read_only_fields = ['id', 'rating']
+        fields = ['id', 'name', 'year', 'description', 'genre', 'category']
+        read_only_fields = ['id']
 
 
 class TitleListSerializer(serializers.ModelSerializer):
@@ -124,6 +177,43 @@ class TitleListSerializer(serializers.ModelSerializer):
         )
 
 
+def load_review_comments(review_ids, context):
+    """
+    Число комментариев к отзывам и, если в context есть comments_limit
+    (?expand=comments), первые комментарии каждого отзыва — одним
+    запросом на страницу отзывов. Возвращает ({id отзыва: число},
+    {id отзыва: комментарии в формате ответа} или None).
+    """
+    limit = context.get('comments_limit')
+    if not limit:
+        return Comment.objects.count_by_review(review_ids), None
+    counts, first = Comment.objects.first_by_review(review_ids, limit)
+    represent = CommentValuesSerializer().represent_row
+    comments = {
+        review_id: [represent({'id': comment.id,
+                               'text': comment.text,
+                               'author__username': comment.author_name,
+                               'pub_date': comment.pub_date})
+                    for comment in review_comments]
+        for review_id, review_comments in first.items()
+    }
+    return counts, comments
+
+
+class ReviewListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        reviews = list(data)
+        counts, comments = load_review_comments(
+            [review.pk for review in reviews], self.context
+        )
+        for review in reviews:
+            review.comment_count = counts.get(review.pk, 0)
+            if comments is not None:
+                review.embedded_comments = comments.get(review.pk, [])
+        return super().to_representation(reviews)
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         default=serializers.CurrentUserDefault(),
@@ -135,21 +225,31 @@ class ReviewSerializer(serializers.ModelSerializer):
                                          min_score_validator,
                                          max_score_validator,
                                      ])
+    comment_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Review
-        fields = ['id', 'text', 'author', 'score', 'pub_date']
+        fields = ['id', 'text', 'author', 'score', 'pub_date',
+                  'comment_count']
         read_only_fields = ['id', 'author', 'pub_date']
+        list_serializer_class = ReviewListSerializer
 
-    def validate(self, data):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
-                raise ValidationError('Вы не можете добавить более'
-                                      'одного отзыва на произведение')
+    def create(self, validated_data):
+        review = super().create(validated_data)
+        # У нового отзыва комментариев нет.
+        review.comment_count = 0
+        return review
+
+    def to_representation(self, instance):
+        if not hasattr(instance, 'comment_count'):
+            counts, comments = load_review_comments([instance.pk],
+                                                    self.context)
+            instance.comment_count = counts.get(instance.pk, 0)
+            if comments is not None:
+                instance.embedded_comments = comments.get(instance.pk, [])
+        data = super().to_representation(instance)
+        if hasattr(instance, 'embedded_comments'):
+            data['comments'] = instance.embedded_comments
         return data
 
 
@@ -163,3 +263,147 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'text', 'author', 'pub_date']
         read_only_fields = ['id', 'author', 'pub_date']
+
+
+class ModerationSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=ModerationAction.choices)
+    reviews = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=1000
+    )
+    comments = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=1000
+    )
+    authors = serializers.ListField(
+        child=serializers.CharField(max_length=150),
+        required=False,
+        max_length=100
+    )
+
+    def validate(self, attrs):
+        if not any(attrs.get(name)
+                   for name in ('reviews', 'comments', 'authors')):
+            raise serializers.ValidationError(
+                'Укажите reviews, comments или authors.'
+            )
+        return attrs
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        rows = list(data)
+        self.child.load_related(rows)
+        return [self.child.represent_row(row) for row in rows]
+
+
+class ValuesSerializer(serializers.BaseSerializer, ABC):
+    """
+    Сериализатор только для чтения для строк из values():
+    словари ответа собираются напрямую, без моделей и полей DRF.
+    Вывод должен совпадать с выводом обычного сериализатора.
+    """
+
+    values_fields = ()
+    datetime_field = serializers.DateTimeField()
+
+    class Meta:
+        list_serializer_class = ValuesListSerializer
+
+    @classmethod
+    def get_values_queryset(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.values_fields)
+
+    def load_related(self, rows):
+        """Догружает в строки связанные данные одним запросом на выборку."""
+
+    @abstractmethod
+    def represent_row(self, row):
+        """Возвращает словарь ответа для строки values()."""
+
+    def to_representation(self, row):
+        self.load_related([row])
+        return self.represent_row(row)
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """Быстрый вариант TitleListSerializer."""
+
+    values_fields = ('id', 'name', 'year', 'rating', 'description',
+                     'category__name', 'category__slug')
+
+    def load_related(self, rows):
+        genres = {row['id']: [] for row in rows}
+        related = (Title.genre.through.objects
+                   .filter(title_id__in=genres)
+                   .order_by('genre__name')
+                   .values_list('title_id', 'genre__name', 'genre__slug'))
+        for title_id, name, slug in related:
+            genres[title_id].append({'name': name, 'slug': slug})
+        for row in rows:
+            row['genre'] = genres[row['id']]
+
+    def represent_row(self, row):
+        rating = row['rating']
+        category = None
+        if row['category__slug'] is not None:
+            category = {'name': row['category__name'],
+                        'slug': row['category__slug']}
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'year': row['year'],
+            'rating': None if rating is None else int(rating),
+            'description': row['description'],
+            'genre': row['genre'],
+            'category': category,
+        }
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    """Быстрый вариант ReviewSerializer для чтения."""
+
+    values_fields = ('id', 'text', 'author__username', 'score', 'pub_date')
+
+    def load_related(self, rows):
+        counts, comments = load_review_comments(
+            [row['id'] for row in rows], self.context
+        )
+        for row in rows:
+            row['comment_count'] = counts.get(row['id'], 0)
+            if comments is not None:
+                row['comments'] = comments.get(row['id'], [])
+
+    def represent_row(self, row):
+        data = {
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'score': row['score'],
+            'pub_date': self.datetime_field.to_representation(
+                row['pub_date']
+            ),
+            'comment_count': row['comment_count'],
+        }
+        if 'comments' in row:
+            data['comments'] = row['comments']
+        return data
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """Быстрый вариант CommentSerializer для чтения."""
+
+    values_fields = ('id', 'text', 'author__username', 'pub_date')
+
+    def represent_row(self, row):
+        return {
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'pub_date': self.datetime_field.to_representation(
+                row['pub_date']
+            ),
+        }
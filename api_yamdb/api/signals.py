@@ -0,0 +1,41 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from reviews.models import Category, Genre, Review, Title, User
+
+from .authentication import invalidate_user
+from .cache import response_cache
+
+# Ресурсы кэша ответов, содержимое которых зависит от модели.
+CACHE_DEPENDENCIES = {
+    Title: ('titles',),
+    Category: ('categories', 'titles'),
+    Genre: ('genres', 'titles'),
+    Review: ('titles',),
+}
+
+
+def invalidate_response_cache(sender, **kwargs):
+    response_cache.invalidate(*CACHE_DEPENDENCIES[sender])
+
+
+def invalidate_title_genres(sender, action, **kwargs):
+    if action.startswith('post_'):
+        response_cache.invalidate('titles')
+
+
+for model in CACHE_DEPENDENCIES:
+    post_save.connect(invalidate_response_cache, sender=model,
+                      dispatch_uid=f'response_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_response_cache, sender=model,
+                        dispatch_uid=f'response_cache_delete_{model.__name__}')
+m2m_changed.connect(invalidate_title_genres, sender=Title.genre.through,
+                    dispatch_uid='response_cache_title_genre')
+
+
+def invalidate_jwt_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+post_save.connect(invalidate_jwt_user, sender=User,
+                  dispatch_uid='jwt_user_save')
+post_delete.connect(invalidate_jwt_user, sender=User,
+                    dispatch_uid='jwt_user_delete')
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from . import views
+from .asyncviews import async_read_urls
 
 router = DefaultRouter()
 router.register(r'users', views.UserViewSet, basename='user')
@@ -13,6 +15,12 @@ router.register(r'titles/(?P<title_id>\d+)/reviews',
 router.register(r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)'
                 r'/comments', views.CommentViewSet, basename='comments')
 
+router_urls = router.urls
+if settings.SERVER_MODE == 'asgi':
+    router_urls = async_read_urls(router_urls, (
+        views.TitleViewSet, views.ReviewViewSet, views.CommentViewSet
+    ))
+
 
 auth_patterns = [
     path('signup/', views.APIAuthSignup.as_view()),
@@ -21,6 +29,10 @@ auth_patterns = [
 
 
 urlpatterns = [
-    path('v1/', include(router.urls)),
+    path('v1/cache/stats/', views.ResponseCacheStats.as_view()),
+    path('v1/metrics/', views.Metrics.as_view()),
+    path('v1/export/<str:dataset>/', views.DatasetExport.as_view()),
+    path('v1/moderation/', views.Moderation.as_view()),
+    path('v1/', include(router_urls)),
     path('v1/auth/', include(auth_patterns)),
 ]
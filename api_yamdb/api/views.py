@@ -1,25 +1,43 @@
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import (filters, pagination, permissions, status, views,
-                            viewsets)
+from rest_framework import filters, permissions, status, views, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.dataset import DATASET_ORDER, FORMATS, export_rows, format_rows
+from reviews.facets import FACETS, grouped_counts, sort_counts
+from reviews.models import (Category, DailyReviewCount, Genre, Review, Title,
+                            TitleFacet, User)
+from reviews.moderation import moderate
+from reviews.outbox import enqueue_email
 
 from api_yamdb.settings import CONFIRM_CODE_EMAIL
 
-from .filters import SlugFilter
-from .mixins import CreateListDestroyViewSet
+from .bulk import UPSERT_KEYS, TitleBulkWriter
+from .cache import response_cache
+from .filters import FullTextSearchFilter, SlugFilter
+from .metrics import registry
+from .mixins import (CachedResponseMixin, ConditionalGetMixin,
+                     CreateListDestroyViewSet, MetricsMixin, ValuesReadMixin)
+from .pagination import PubDatePagination, TitlePagination
 from .permissions import (IsAdminOrReadOnly, IsAdminOrSuperUser,
+                          IsModeratorOrAdmin,
                           IsSuperUserIsAdminIsModeratorIsAuthor)
 from .serializers import (AuthSignupSerializer, AuthTokenSerializer,
                           CategorySerializer, CommentSerializer,
-                          GenreSerializer, ReviewSerializer,
-                          TitleListSerializer, TitleSerializer, UserSerializer)
+                          CommentValuesSerializer, GenreSerializer,
+                          ModerationSerializer, ReviewSerializer,
+                          ReviewValuesSerializer, TitleListSerializer,
+                          TitleSerializer, TitleValuesSerializer,
+                          UserSerializer)
 
 
 class APIAuthSignup(views.APIView):
@@ -28,18 +46,14 @@ class APIAuthSignup(views.APIView):
     def post(self, request):
         serializer = AuthSignupSerializer(data=request.data)
         if serializer.is_valid():
-            username = serializer.validated_data['username']
-            email = serializer.validated_data['email']
-            if not User.objects.filter(username=username).exists():
-                serializer.save()
-            user = User.objects.get(username=username)
-            user.confirmation_code = default_token_generator.make_token(user)
-            user.save()
-            send_mail(
+            user = serializer.save()
+            # Письмо отправит команда dispatch_outbox.
+            enqueue_email(
+                user,
                 'Код подтверждения для получения токена',
                 user.confirmation_code,
                 CONFIRM_CODE_EMAIL,
-                [email]
+                user.email
             )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -52,15 +66,80 @@ class APIAuthToken(views.APIView):
     def post(self, request):
         serializer = AuthTokenSerializer(data=request.data)
         if serializer.is_valid():
-            username = serializer.data['username']
-            user = get_object_or_404(User, username=username)
+            user = serializer.validated_data['user']
             access_token = str(AccessToken.for_user(user))
             return Response({'token': access_token}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class ResponseCacheStats(views.APIView):
+    """Счетчики попаданий и промахов кэша ответов текущего процесса."""
+
+    permission_classes = [IsAdminOrSuperUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class Metrics(views.APIView):
+    """Метрики запросов текущего процесса в формате Prometheus."""
+
+    permission_classes = [IsAdminOrSuperUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render(),
+                            content_type='text/plain; version=0.0.4')
+
+
+class Moderation(views.APIView):
+    """
+    Удаляет, скрывает или открывает отзывы и комментарии по спискам id
+    или по авторам одним запросом модератора.
+    """
+
+    permission_classes = [IsModeratorOrAdmin]
+
+    def post(self, request):
+        serializer = ModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        counts = moderate(**serializer.validated_data)
+        # Строки изменены без сигналов, кэш ответов сбрасывается здесь.
+        response_cache.invalidate('titles')
+        return Response(counts, status=status.HTTP_200_OK)
+
+
+class DatasetExport(views.APIView):
+    """
+    Потоковая выгрузка модели в CSV или JSONL (?file_format=jsonl)
+    в формате команды import_yamdb.
+    """
+
+    permission_classes = [IsAdminOrSuperUser]
+    content_types = {
+        'csv': 'text/csv; charset=utf-8',
+        'jsonl': 'application/x-ndjson; charset=utf-8',
+    }
+
+    def get(self, request, dataset):
+        file_format = request.query_params.get('file_format', 'csv')
+        if dataset not in DATASET_ORDER or file_format not in FORMATS:
+            return Response(
+                {'detail': f'Доступные выгрузки: {", ".join(DATASET_ORDER)}; '
+                           f'форматы: {", ".join(FORMATS)}.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = StreamingHttpResponse(
+            format_rows(dataset, export_rows(dataset), file_format),
+            content_type=self.content_types[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{file_format}"'
+        )
+        return response
+
+
+class UserViewSet(MetricsMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     http_method_names = ['get', 'post', 'patch', 'delete']
@@ -72,21 +151,24 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['GET', 'PATCH'], url_path='me',
             permission_classes=[permissions.IsAuthenticated])
     def me_action(self, request):
+        # request.user содержит только поля для проверки прав,
+        # профиль загружается целиком одним запросом.
+        instance = User.objects.get(pk=self.request.user.pk)
         if self.request.method == 'GET':
-            instance = self.request.user
             serializer = self.get_serializer(instance)
             return Response(serializer.data)
 
-        instance = self.request.user
         serializer = self.get_serializer(instance, data=request.data,
                                          partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.validated_data['role'] = self.request.user.role
+        serializer.validated_data['role'] = instance.role
         serializer.save()
         return Response(serializer.data)
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(MetricsMixin, CachedResponseMixin,
+                      CreateListDestroyViewSet):
+    cache_resource = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -95,7 +177,9 @@ class CategoryViewSet(CreateListDestroyViewSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(MetricsMixin, CachedResponseMixin,
+                   CreateListDestroyViewSet):
+    cache_resource = 'genres'
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -105,67 +189,297 @@ class GenreViewSet(CreateListDestroyViewSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(MetricsMixin, CachedResponseMixin, ConditionalGetMixin,
+                   ValuesReadMixin, viewsets.ModelViewSet):
+    cache_resource = 'titles'
+    values_serializer_class = TitleValuesSerializer
     queryset = (Title.objects
                 .select_related('category')
                 .prefetch_related('genre').all()
-                .annotate(rating=Avg('reviews__score'))
                 .order_by('name'))
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = pagination.PageNumberPagination
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = TitlePagination
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,
+                       FullTextSearchFilter)
     filterset_class = SlugFilter
+    ordering_fields = ('name', 'year', 'rating')
+    ordering = ('name',)
+    facets_query_param = 'facets'
+    bulk_max_items = 1000
+    facet_filter_params = (*SlugFilter.base_filters,
+                           FullTextSearchFilter.search_param)
+
+    def get_conditional_state(self):
+        # Версия кэша ответов в БД меняется при любом изменении каталога.
+        version = self.get_resource_version()
+        if self.action == 'list':
+            return version, None
+        modified = (Title.objects
+                    .filter(pk=self.kwargs.get('pk'))
+                    .values_list('modified', flat=True)
+                    .first())
+        return version, modified
+
+    def get_requested_facets(self):
+        facets = [
+            facet.strip()
+            for facet in self.request.query_params.get(
+                self.facets_query_param, ''
+            ).split(',')
+            if facet.strip()
+        ]
+        unknown = set(facets) - set(FACETS)
+        if unknown:
+            raise ValidationError({
+                self.facets_query_param: [
+                    f'Доступные срезы: {", ".join(FACETS)}.'
+                ]
+            })
+        return facets
+
+    def get_facets(self, facets):
+        """
+        Количество произведений по значениям срезов для текущих фильтров.
+        Без фильтров счетчики читаются из TitleFacet.
+        """
+        params = self.request.query_params
+        if any(params.get(name) for name in self.facet_filter_params):
+            counts = grouped_counts(
+                self.filter_queryset(self.get_queryset()), facets
+            )
+        else:
+            counts = TitleFacet.objects.counts(facets)
+        return sort_counts(counts)
+
+    def list(self, request, *args, **kwargs):
+        facets = self.get_requested_facets()
+        response = super().list(request, *args, **kwargs)
+        if facets and isinstance(response.data, dict):
+            response.data['facets'] = self.get_facets(facets)
+        return response
+
+    def get_leaderboard_limit(self):
+        limit = self.request.query_params.get('limit', '10')
+        if not limit.isdigit() or not 1 <= int(limit) <= 100:
+            raise ValidationError(
+                {'limit': ['Укажите число от 1 до 100.']}
+            )
+        return int(limit)
+
+    def leaderboard_response(self, titles):
+        serializer = TitleValuesSerializer(titles, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def top(self, request):
+        """
+        Лучшие произведения по взвешенному рейтингу — всего каталога,
+        жанра (?genre=) или категории (?category=). Читается по индексу
+        weighted_rating первые ?limit= строк.
+        """
+        queryset = Title.objects.filter(review_count__gt=0)
+        for name in ('genre', 'category'):
+            if request.query_params.get(name):
+                queryset = queryset.filter(
+                    **{f'{name}__slug': request.query_params[name]}
+                )
+        queryset = queryset.order_by('-weighted_rating', 'id')
+        return self.leaderboard_response(
+            TitleValuesSerializer.get_values_queryset(
+                queryset[:self.get_leaderboard_limit()]
+            )
+        )
+
+    @action(detail=False)
+    def trending(self, request):
+        """
+        Произведения с наибольшим числом отзывов за последние
+        LEADERBOARD['TRENDING_DAYS'] дней, по счетчикам отзывов за день.
+        """
+        since = timezone.localdate() - timedelta(
+            days=settings.LEADERBOARD['TRENDING_DAYS'] - 1
+        )
+        ids = list(DailyReviewCount.objects.trending(
+            since, self.get_leaderboard_limit()
+        ))
+        rows = {
+            row['id']: row
+            for row in TitleValuesSerializer.get_values_queryset(
+                Title.objects.filter(pk__in=ids)
+            )
+        }
+        return self.leaderboard_response(
+            [rows[pk] for pk in ids if pk in rows]
+        )
+
+    @action(detail=False, methods=['post'],
+            permission_classes=[IsAdminOrSuperUser])
+    def bulk(self, request):
+        """
+        Создает или изменяет (?upsert=id или ?upsert=name,year) список
+        произведений; элементы с ошибками пропускаются. Ответ — список
+        результатов в порядке элементов, 207 при ошибках в части из них.
+        """
+        key = request.query_params.get('upsert')
+        if key is not None and key not in UPSERT_KEYS:
+            raise ValidationError({
+                'upsert': [f'Доступные ключи: {"; ".join(UPSERT_KEYS)}.']
+            })
+        if (not isinstance(request.data, list)
+                or not 1 <= len(request.data) <= self.bulk_max_items):
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Ожидался список из 1–'
+                    f'{self.bulk_max_items} произведений.'
+                ]
+            })
+        results = TitleBulkWriter(request.data, key).save()
+        if any('errors' in result for result in results):
+            return Response(results, status=status.HTTP_207_MULTI_STATUS)
+        return Response(results, status=status.HTTP_200_OK)
 
     def get_serializer_class(self):
+        if self.use_values_serializer():
+            return self.values_serializer_class
         if self.action == 'list' or self.action == 'retrieve':
             return TitleListSerializer
         return TitleSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(MetricsMixin, ConditionalGetMixin, ValuesReadMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Review."""
 
     serializer_class = ReviewSerializer
+    values_serializer_class = ReviewValuesSerializer
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsSuperUserIsAdminIsModeratorIsAuthor
     )
+    pagination_class = PubDatePagination
+    filter_backends = (FullTextSearchFilter,)
+    expand_query_param = 'expand'
+    comments_limit_query_param = 'comments_limit'
+    default_comments_limit = 3
+    max_comments_limit = 20
 
     def get_title(self):
-        """Возвращает объект текущего произведения."""
-        title_id = self.kwargs.get('title_id')
-        return get_object_or_404(Title, pk=title_id)
+        """
+        Возвращает объект текущего произведения.
+        Загружается один раз за запрос.
+        """
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, pk=self.kwargs.get('title_id')
+            )
+        return self._title
+
+    def get_conditional_state(self):
+        """Версия и время изменения отзывов произведения."""
+        title = self.get_title()
+        return (title.pk, title.version), title.modified
+
+    def get_comments_limit(self):
+        """
+        Число комментариев, встраиваемых в каждый отзыв
+        (?expand=comments&comments_limit=), или 0 без ?expand.
+        """
+        params = self.request.query_params
+        expand = {name.strip()
+                  for name in params.get(self.expand_query_param,
+                                         '').split(',')
+                  if name.strip()}
+        if expand - {'comments'}:
+            raise ValidationError({
+                self.expand_query_param: ['Доступно значение: comments.']
+            })
+        if not expand:
+            return 0
+        limit = params.get(self.comments_limit_query_param,
+                           str(self.default_comments_limit))
+        if not limit.isdigit() or not 1 <= int(limit) <= (
+            self.max_comments_limit
+        ):
+            raise ValidationError({
+                self.comments_limit_query_param: [
+                    f'Укажите число от 1 до {self.max_comments_limit}.'
+                ]
+            })
+        return int(limit)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['title'] = self.get_title()
+        if self.request.method in permissions.SAFE_METHODS:
+            context['comments_limit'] = self.get_comments_limit()
+        return context
 
     def get_queryset(self):
         """Возвращает queryset c отзывами для текущего произведения."""
-        return self.get_title().reviews.select_related('author').all()
+        return (self.get_title().reviews
+                .filter(is_hidden=False)
+                .select_related('author'))
 
     def perform_create(self, serializer):
         """Создает отзыв для текущего произведения,
-        где автором является текущий пользователь."""
-        serializer.save(
-            author=self.request.user,
-            title=self.get_title()
-        )
+        где автором является текущий пользователь.
+        Повторный отзыв отклоняет ограничение unique_review."""
+        try:
+            serializer.save(
+                author=self.request.user,
+                title=self.get_title()
+            )
+        except IntegrityError:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы не можете добавить более '
+                    'одного отзыва на произведение'
+                ]
+            })
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(MetricsMixin, ConditionalGetMixin, ValuesReadMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Comment."""
 
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsSuperUserIsAdminIsModeratorIsAuthor
     )
+    pagination_class = PubDatePagination
 
     def get_review(self):
-        """Возвращает объект текущего отзыва."""
-        review_id = self.kwargs.get('review_id')
-        return get_object_or_404(Review, pk=review_id)
+        """
+        Возвращает объект текущего отзыва вместе с произведением.
+        Отзыв должен относиться к произведению из URL;
+        загружается одним запросом один раз за запрос.
+        """
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.select_related('title'),
+                pk=self.kwargs.get('review_id'),
+                is_hidden=False,
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
+
+    def get_conditional_state(self):
+        """Версия и время изменения комментариев к отзывам произведения."""
+        title = self.get_review().title
+        return (title.pk, title.version), title.modified
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['review'] = self.get_review()
+        return context
 
     def get_queryset(self):
         """Возвращает queryset c комментариями для текущего отзыва."""
-        return self.get_review().comments.select_related('author').all()
+        return (self.get_review().comments
+                .filter(is_hidden=False)
+                .select_related('author'))
 
     def perform_create(self, serializer):
         """Создает комментарий для текущего отзыва,
@@ -0,0 +1,164 @@
+"""
+Сжатие ответов и статических файлов.
+
+CompressionMiddleware сжимает ответы brotli (если установлен пакет brotli)
+или gzip — по заголовку Accept-Encoding клиента. Ответы короче
+COMPRESSION['MIN_SIZE'] байт не сжимаются, потоковые ответы (выгрузки)
+сжимаются по частям.
+
+CompressedStaticFilesStorage после collectstatic записывает рядом
+с текстовыми файлами сжатые копии .gz и .br: nginx отдает их
+(gzip_static) без сжатия на лету.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_EXTENSIONS = ('.css', '.js', '.map', '.html', '.svg', '.json',
+                     '.txt', '.xml', '.yaml')
+
+
+def get_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding с весами q."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """Лучшая из поддерживаемых кодировок, принимаемых клиентом, или None."""
+    accepted = parse_accept_encoding(header)
+    candidates = [
+        coding for coding in get_encodings()
+        if accepted.get(coding, accepted.get('*', 0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(candidates,
+               key=lambda coding: accepted.get(coding, accepted.get('*')))
+
+
+def compress_brotli(content, quality):
+    return brotli.compress(content, quality=quality)
+
+
+def compress_brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        # flush() отдает клиенту каждую часть сразу, как и compress_sequence.
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return compress_brotli(content, settings.COMPRESSION['BROTLI_QUALITY'])
+    return compress_string(content)
+
+
+def compress_stream(sequence, encoding):
+    if encoding == 'br':
+        return compress_brotli_sequence(
+            sequence, settings.COMPRESSION['BROTLI_QUALITY']
+        )
+    return compress_sequence(sequence)
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответ выбранной по Accept-Encoding кодировкой.
+    Стоит после MetricsMiddleware, чтобы в метриках был размер
+    сжатого ответа и время сжатия.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = settings.COMPRESSION
+        if (not config['ENABLED']
+                or response.has_header('Content-Encoding')
+                or not response.streaming
+                and len(response.content) < config['MIN_SIZE']):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        # Сжатый ответ не совпадает побайтно с исходным:
+        # сильный ETag становится слабым (RFC 7232, 2.1).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    """
+    Записывает сжатые копии .gz (и .br, если установлен brotli)
+    текстовых файлов не короче COMPRESSION['MIN_SIZE'] байт.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for path in paths:
+            if not path.endswith(STATIC_EXTENSIONS):
+                continue
+            with self.open(path) as file:
+                content = file.read()
+            if len(content) < settings.COMPRESSION['MIN_SIZE']:
+                continue
+            # Файлы сжимаются один раз: максимальная степень сжатия.
+            compressed = {'gz': gzip.compress(content, 9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = compress_brotli(content, 11)
+            for extension, data in compressed.items():
+                if len(data) >= len(content):
+                    continue
+                target = f'{path}.{extension}'
+                if self.exists(target):
+                    self.delete(target)
+                self.save(target, ContentFile(data))
+            yield path, path, True
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db import connections
+
+
+def close_unusable_connections(**kwargs):
+    """
+    Проверяет постоянные соединения с БД перед запросом и закрывает те,
+    что перестали работать (перезапуск БД, разрыв по таймауту): иначе
+    первый запрос после разрыва завершился бы ошибкой 500.
+    Django 3.2 проверяет соединение только после ошибки в нем.
+    Включается настройкой DB_CONN_HEALTH_CHECKS: проверка — лишний
+    запрос SELECT 1 на каждый запрос API.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
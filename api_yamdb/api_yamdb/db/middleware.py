@@ -0,0 +1,43 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import use_replicas
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Отправляет чтение безопасных запросов на реплики.
+    После успешной записи клиент REPLICA_STICKY_SECONDS секунд читает
+    из основной БД (read-your-writes), пока реплика не догонит ее.
+    Клиент определяется по заголовку Authorization: анонимные
+    пользователи ничего не пишут.
+    """
+
+    cache_key_prefix = 'replica-sticky:'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_sticky_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return (self.cache_key_prefix
+                + hashlib.sha1(authorization.encode()).hexdigest())
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        key = self.get_sticky_key(request)
+        if request.method in SAFE_METHODS:
+            replicas = key is None or cache.get(key) is None
+            with use_replicas(replicas):
+                return self.get_response(request)
+        response = self.get_response(request)
+        if key is not None and response.status_code < 400:
+            cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
@@ -0,0 +1,131 @@
+"""
+PostgreSQL с пулом соединений внутри процесса.
+
+ENGINE = 'api_yamdb.db.postgresql_pool'. Закрытие соединения Django
+возвращает его в пул, а новое соединение берется из пула, поэтому
+при CONN_MAX_AGE = 0 каждый запрос использует готовое соединение.
+Другое значение CONN_MAX_AGE — ошибка конфигурации.
+Пул общий для потоков процесса и подходит для потоковых
+и асинхронных воркеров. Параметры в OPTIONS:
+- pool_min_size — сколько свободных соединений держать открытыми;
+- pool_max_size — сколько соединений можно открыть одновременно;
+- pool_timeout — сколько секунд ждать свободного соединения.
+"""
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg2.pool import ThreadedConnectionPool
+
+POOL_OPTIONS = {
+    'pool_min_size': 2,
+    'pool_max_size': 10,
+    'pool_timeout': 10,
+}
+
+
+class ConnectionPool:
+    """ThreadedConnectionPool, который ждет свободное соединение."""
+
+    def __init__(self, conn_params, pool_min_size, pool_max_size,
+                 pool_timeout):
+        self.pool = ThreadedConnectionPool(pool_min_size, pool_max_size,
+                                           **conn_params)
+        self.slots = threading.BoundedSemaphore(pool_max_size)
+        self.timeout = pool_timeout
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                'Нет свободных соединений в пуле'
+            )
+        try:
+            connection = self.pool.getconn()
+            if connection.closed or (settings.DB_CONN_HEALTH_CHECKS
+                                     and not self.is_usable(connection)):
+                self.pool.putconn(connection, close=True)
+                connection = self.pool.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        return connection
+
+    def putconn(self, connection):
+        try:
+            self.pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            self.slots.release()
+
+    @staticmethod
+    def is_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options):
+    # Пул не переживает fork: у каждого процесса свой.
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(conn_params, **options)
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        if settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(
+                'Пул соединений требует CONN_MAX_AGE = 0: иначе соединения '
+                'не возвращаются в пул после запроса'
+            )
+        super().__init__(settings_dict, *args, **kwargs)
+
+    def get_pool_options(self):
+        options = self.settings_dict['OPTIONS']
+        return {name: options.get(name, default)
+                for name, default in POOL_OPTIONS.items()}
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        for name in POOL_OPTIONS:
+            conn_params.pop(name, None)
+        return conn_params
+
+    def get_pool(self):
+        return get_pool(self.alias, self.get_connection_params(),
+                        self.get_pool_options())
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool().getconn()
+        # То же, что делает base.DatabaseWrapper после connect().
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection,
+                                               loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().putconn(self.connection)
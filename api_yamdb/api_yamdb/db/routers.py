@@ -0,0 +1,51 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Разрешено ли читать с реплики в текущем запросе.
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    token = replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+def reads_from_replicas():
+    """
+    Может ли чтение текущего запроса идти с реплики, данные которой
+    отстают от основной БД.
+    """
+    return bool(settings.DATABASE_REPLICAS and replica_reads.get())
+
+
+class ReplicaRouter:
+    """
+    Запись и чтение вне use_replicas() — в основную БД,
+    чтение внутри use_replicas() — со случайной реплики
+    из DATABASE_REPLICAS. Внутри транзакции основной БД чтение
+    остается в ней, чтобы видеть собственные изменения.
+    Миграции на реплики не применяются: их схема приходит с основной БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (settings.DATABASE_REPLICAS and replica_reads.get()
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -29,7 +29,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api_yamdb.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api_yamdb.db.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,6 +62,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# wsgi — синхронные воркеры gunicorn, asgi — воркеры uvicorn
+# и асинхронные представления каталога (см. gunicorn.conf.py).
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+
 
 # Database
 
@@ -70,10 +77,103 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Время жизни соединения в секундах, 0 — закрывать после запроса.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+    }
+}
+
+# Проверка постоянных соединений (SELECT 1) перед запросом: лишний запрос
+# к БД на каждый запрос API, поэтому по умолчанию выключена.
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', default='0') == '1'
+
+# Пул соединений внутри процесса: DB_ENGINE=api_yamdb.db.postgresql_pool.
+if DATABASES['default']['ENGINE'] == 'api_yamdb.db.postgresql_pool':
+    # Соединение возвращается в пул в конце запроса: постоянное соединение
+    # оставалось бы занятым потоком воркера.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool_min_size': int(os.getenv('DB_POOL_MIN_SIZE', default=2)),
+        'pool_max_size': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+    }
+
+# Реплики для чтения: DB_REPLICA_HOSTS=replica1,replica2.
+# Безопасные запросы читают с них (см. ReplicaRoutingMiddleware),
+# после записи клиент REPLICA_STICKY_SECONDS секунд читает из основной БД.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+    start=1
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['api_yamdb.db.routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=5))
+
+
+# Cache
+# Для нескольких процессов gunicorn нужен общий кэш (например, Memcached):
+# в нем хранятся данные пользователей JWT и метки чтения из основной БД.
+# Версии кэша ответов API хранятся в БД (модель ResourceVersion).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND',
+                             default='django.core.cache.backends.locmem'
+                                     '.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
     }
 }
 
+RESPONSE_CACHE = {
+    'ENABLED': os.getenv('RESPONSE_CACHE_ENABLED', default='1') == '1',
+    'BACKEND': os.getenv('RESPONSE_CACHE_BACKEND',
+                         default='api.cache.LocMemLRUBackend'),
+    'OPTIONS': {
+        'max_entries': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES',
+                                     default=1000)),
+        'timeout': int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=60)),
+    },
+}
+
+# Метрики запросов: GET /api/v1/metrics/ (Prometheus)
+# и заголовок Server-Timing.
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', default='1') == '1',
+    'SERVER_TIMING': os.getenv('METRICS_SERVER_TIMING', default='0') == '1',
+}
+
+COMPRESSION = {
+    'ENABLED': os.getenv('COMPRESSION_ENABLED', default='1') == '1',
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', default=1024)),
+    'BROTLI_QUALITY': int(os.getenv('COMPRESSION_BROTLI_QUALITY', default=5)),
+}
+
+# Байесовский рейтинг лучших произведений: C (PRIOR_MEAN) и m (PRIOR_WEIGHT).
+LEADERBOARD = {
+    'PRIOR_MEAN': float(os.getenv('LEADERBOARD_PRIOR_MEAN', default=5.5)),
+    'PRIOR_WEIGHT': int(os.getenv('LEADERBOARD_PRIOR_WEIGHT', default=10)),
+    'TRENDING_DAYS': int(os.getenv('LEADERBOARD_TRENDING_DAYS', default=7)),
+}
+
+# Кэш в памяти процесса не виден другим процессам gunicorn.
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith(
+    ('LocMemCache', 'DummyCache')
+)
+
+# Пользователь JWT кэшируется, только если кэш общий: сброс записи при смене
+# роли или удалении пользователя иначе дошел бы лишь до одного процесса.
+# 0 — без кэша, пользователь читается из БД на каждый запрос.
+JWT_USER_CACHE_TIMEOUT = int(os.getenv('JWT_USER_CACHE_TIMEOUT',
+                                       default=60 if SHARED_CACHE else 0))
+
 
 # Password validation
 
@@ -114,6 +214,7 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+STATICFILES_STORAGE = 'api_yamdb.compression.CompressedStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -126,7 +227,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination'
                                 '.PageNumberPagination',
@@ -0,0 +1,17 @@
+"""
+Настройки gunicorn. Режим задает переменная SERVER_MODE:
+wsgi (по умолчанию) — синхронные воркеры, asgi — воркеры uvicorn.
+"""
+import multiprocessing
+import os
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('GUNICORN_BIND', '0:80')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() + 1))
+
+if server_mode == 'asgi':
+    wsgi_app = 'api_yamdb.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'api_yamdb.wsgi:application'
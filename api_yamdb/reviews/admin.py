@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, Comment, Genre, OutgoingEmail, Review, Title,
+                     User)
 
 admin.site.register(User)
 admin.site.register(Review)
@@ -8,3 +9,4 @@ admin.site.register(Comment)
 admin.site.register(Title)
 admin.site.register(Genre)
 admin.site.register(Category)
+admin.site.register(OutgoingEmail)
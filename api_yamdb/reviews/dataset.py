@@ -0,0 +1,547 @@
+"""
+Формат выгрузки и загрузки данных YaMDb.
+
+Каждая модель хранится в отдельном файле <имя>.csv или <имя>.jsonl.
+Внешние ключи записываются естественными ключами: категория и жанры
+произведения — слагами, автор отзыва и комментария — username.
+Произведения и отзывы, на которые ссылаются другие файлы,
+сохраняют свои id.
+"""
+import csv
+import io
+import json
+import re
+from abc import ABC, abstractmethod
+from itertools import groupby, islice
+
+from api.validators import (max_score_validator, max_year_validator,
+                            min_score_validator, min_year_validator,
+                            username_regex_validator)
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import DataError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Category, Comment, Genre, Review, RoleChoices, Title, User
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ('csv', 'jsonl')
+
+# Порядок загрузки: модели идут после тех, на которые ссылаются.
+DATASET_ORDER = ('categories', 'genres', 'users', 'titles', 'reviews',
+                 'comments')
+
+FIELDS = {
+    'categories': ('name', 'slug'),
+    'genres': ('name', 'slug'),
+    'users': ('username', 'email', 'role', 'bio', 'first_name', 'last_name'),
+    'titles': ('id', 'name', 'year', 'description', 'category', 'genre',
+               'rating'),
+    'reviews': ('id', 'title', 'author', 'text', 'score', 'pub_date',
+                'is_hidden'),
+    'comments': ('id', 'review', 'author', 'text', 'pub_date', 'is_hidden'),
+}
+
+EXPORT_MODELS = {
+    'categories': Category,
+    'genres': Genre,
+    'users': User,
+    'reviews': Review,
+    'comments': Comment,
+}
+
+# Разделитель слагов жанров в CSV; в JSONL жанры — список.
+GENRE_SEPARATOR = ','
+
+
+def export_rows(name, chunk_size=2000):
+    """
+    Построчно выгружает модель через серверный курсор (iterator),
+    поэтому расход памяти не зависит от размера таблицы.
+    """
+    if name == 'titles':
+        yield from export_titles(chunk_size)
+        return
+    # Автор выгружается по username.
+    columns = [field if field != 'author' else 'author__username'
+               for field in FIELDS[name]]
+    queryset = (EXPORT_MODELS[name].objects
+                .order_by('id')
+                .values_list(*columns)
+                .iterator(chunk_size=chunk_size))
+    for values in queryset:
+        yield dict(zip(FIELDS[name], values))
+
+
+def export_titles(chunk_size):
+    """
+    Произведения и их жанры читаются двумя курсорами,
+    упорядоченными по id произведения, и объединяются слиянием.
+    """
+    titles = (Title.objects
+              .order_by('id')
+              .values('id', 'name', 'year', 'description', 'rating',
+                      'category__slug')
+              .iterator(chunk_size=chunk_size))
+    links = (Title.genre.through.objects
+             .order_by('title_id', 'genre__slug')
+             .values_list('title_id', 'genre__slug')
+             .iterator(chunk_size=chunk_size))
+    genres = groupby(links, key=lambda link: link[0])
+    current_id, current_genres = next(genres, (None, ()))
+    for title in titles:
+        while current_id is not None and current_id < title['id']:
+            current_id, current_genres = next(genres, (None, ()))
+        slugs = ([slug for _, slug in current_genres]
+                 if current_id == title['id'] else [])
+        yield {
+            'id': title['id'],
+            'name': title['name'],
+            'year': title['year'],
+            'description': title['description'],
+            'category': title['category__slug'],
+            'genre': slugs,
+            'rating': title['rating'],
+        }
+
+
+def dump_json_line(row):
+    if orjson is not None:
+        # datetime в orjson — тот же isoformat().
+        return orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE).decode()
+    return json.dumps(row, ensure_ascii=False,
+                      default=lambda value: value.isoformat()) + '\n'
+
+
+def format_rows(name, rows, file_format):
+    """Превращает строки выгрузки в куски текста CSV или JSONL."""
+    if file_format == 'jsonl':
+        for row in rows:
+            yield dump_json_line(row)
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS[name])
+    writer.writeheader()
+    yield buffer.getvalue()
+    for row in rows:
+        if 'genre' in row:
+            row['genre'] = GENRE_SEPARATOR.join(row['genre'])
+        if row.get('pub_date'):
+            row['pub_date'] = row['pub_date'].isoformat()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def read_rows(path, file_format):
+    """
+    Построчно читает файл, не загружая его в память целиком.
+    Вместо строки JSONL, которая не разбирается в объект, выдает None.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+
+
+def chunked(rows, size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def as_int(value):
+    return None if value in (None, '') else int(value)
+
+
+def parse_ints(rows, field, errors):
+    """
+    Целые значения поля field строк пакета. Для нечисловых значений
+    возвращает None и добавляет сообщение в errors.
+    """
+    values = []
+    for index, row in enumerate(rows):
+        try:
+            values.append(as_int(row.get(field)))
+        except (TypeError, ValueError):
+            errors.setdefault(
+                index, f'{field}: не целое число <{row.get(field)}>'
+            )
+            values.append(None)
+    return values
+
+
+def parse_flags(rows, field, errors):
+    """
+    Логические значения поля field строк пакета: True/False из CSV
+    или JSON, 1/0; пустые — False.
+    """
+    values = []
+    for index, row in enumerate(rows):
+        value = row.get(field)
+        if value in (None, '', False, 'False', 'false', '0', 0):
+            values.append(False)
+        elif value in (True, 'True', 'true', '1', 1):
+            values.append(True)
+        else:
+            errors.setdefault(index, f'{field}: ожидалось True или False '
+                                     f'<{value}>')
+            values.append(False)
+    return values
+
+
+def parse_dates(rows, field, errors):
+    """
+    Значения поля даты field модели в строках пакета; пустые — None.
+    Для некорректных значений добавляет сообщение в errors.
+    """
+    values = []
+    for index, row in enumerate(rows):
+        value = row.get(field.name) or None
+        try:
+            values.append(field.to_python(value))
+        except ValidationError:
+            errors.setdefault(
+                index, f'{field.name}: некорректная дата <{value}>'
+            )
+            values.append(None)
+    return values
+
+
+def as_list(value):
+    if isinstance(value, list):
+        return value
+    return [slug for slug in (value or '').split(GENRE_SEPARATOR) if slug]
+
+
+def check_range(values, min_validator, max_validator):
+    """
+    Проверяет числовые значения пакета валидаторами модели.
+    Сначала сравниваются минимум и максимум пакета; построчная проверка
+    нужна, только если пакет выходит за границы.
+    Возвращает {индекс: сообщение} для некорректных значений.
+    """
+    present = [value for value in values if value is not None]
+    if (present
+            and min_validator.limit_value <= min(present)
+            and max(present) <= max_validator.limit_value):
+        return {}
+    errors = {}
+    for index, value in enumerate(values):
+        if value is None:
+            errors[index] = 'значение не указано'
+            continue
+        try:
+            min_validator(value)
+            max_validator(value)
+        except ValidationError as error:
+            errors[index] = ' '.join(error.messages)
+    return errors
+
+
+class Importer(ABC):
+    """
+    Загружает строки одной модели пакетами через bulk_create.
+    Для каждого пакета внешние ключи разрешаются одним запросом,
+    а строки с ошибками пропускаются и попадают в отчет.
+    Если пакет нарушает ограничения БД (повторный username, id),
+    он сохраняется построчно и в отчет попадают только такие строки.
+    """
+
+    model = None
+
+    def __init__(self, batch_size=5000, ignore_conflicts=False):
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.created = 0
+        self.errors = []
+        self.has_ids = False
+
+    @abstractmethod
+    def build(self, rows):
+        """Возвращает (объекты модели, {индекс строки: ошибка})."""
+
+    def save(self, objects, indexes):
+        """Сохраняет корректные объекты; indexes — их номера в пакете."""
+        self.model.objects.bulk_create(
+            objects, ignore_conflicts=self.ignore_conflicts
+        )
+
+    def run(self, rows):
+        line = 1
+        try:
+            for batch in chunked(rows, self.batch_size):
+                self.run_batch(batch, line)
+                line += len(batch)
+        finally:
+            self.errors.sort()
+            if self.has_ids:
+                self.reset_sequence()
+
+    def run_batch(self, batch, line):
+        """Сохраняет пакет строк; line — номер его первой строки."""
+        invalid = {index: 'строка не разобрана'
+                   for index, row in enumerate(batch) if row is None}
+        objects, errors = self.build([row or {} for row in batch])
+        errors.update(invalid)
+        for index, message in errors.items():
+            self.errors.append((line + index, message))
+        indexes = [index for index in range(len(batch))
+                   if index not in errors]
+        if not indexes:
+            return
+        objects = [objects[index] for index in indexes]
+        self.has_ids = self.has_ids or any(obj.pk for obj in objects)
+        try:
+            with transaction.atomic():
+                self.save(objects, indexes)
+        except (IntegrityError, DataError):
+            self.save_rows(objects, indexes, line)
+        else:
+            self.created += len(objects)
+
+    def save_rows(self, objects, indexes, line):
+        """Сохраняет объекты пакета по одному, пропуская конфликты."""
+        for obj, index in zip(objects, indexes):
+            try:
+                with transaction.atomic():
+                    self.save([obj], [index])
+            except (IntegrityError, DataError) as error:
+                self.errors.append(
+                    (line + index, f'нарушено ограничение БД: {error}')
+                )
+            else:
+                self.created += 1
+
+    def reset_sequence(self):
+        """После вставки явных id продолжает последовательность с максимума."""
+        statements = connection.ops.sequence_reset_sql(no_style(),
+                                                       [self.model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+class SlugModelImporter(Importer):
+
+    def build(self, rows):
+        objects = [self.model(name=row['name'], slug=row['slug'])
+                   for row in rows]
+        errors = {index: 'не указан slug'
+                  for index, row in enumerate(rows) if not row.get('slug')}
+        return objects, errors
+
+
+class CategoryImporter(SlugModelImporter):
+    model = Category
+
+
+class GenreImporter(SlugModelImporter):
+    model = Genre
+
+
+class UserImporter(Importer):
+    model = User
+
+    def build(self, rows):
+        objects = []
+        errors = {}
+        username_regex = re.compile(username_regex_validator.regex.pattern)
+        unusable_password = make_password(None)
+        for index, row in enumerate(rows):
+            username = row.get('username') or ''
+            role = row.get('role') or RoleChoices.USR
+            if not username_regex.match(username) or username == 'me':
+                errors[index] = f'недопустимый username <{username}>'
+            elif role not in RoleChoices.values:
+                errors[index] = f'неизвестная роль <{role}>'
+            objects.append(User(
+                username=username,
+                email=row.get('email') or '',
+                role=role,
+                bio=row.get('bio') or '',
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                password=unusable_password,
+            ))
+        return objects, errors
+
+
+class TitleImporter(Importer):
+    model = Title
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Категорий и жанров мало, их слаги загружаются один раз.
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.genres = dict(Genre.objects.values_list('slug', 'id'))
+
+    def build(self, rows):
+        errors = {}
+        ids = parse_ints(rows, 'id', errors)
+        years = parse_ints(rows, 'year', errors)
+        for index, message in check_range(years, min_year_validator,
+                                          max_year_validator).items():
+            errors.setdefault(index, message)
+        objects = []
+        self.genre_ids = []
+        for index, (row, pk, year) in enumerate(zip(rows, ids, years)):
+            category = row.get('category') or None
+            genres = as_list(row.get('genre'))
+            unknown = [slug for slug in genres if slug not in self.genres]
+            if category and category not in self.categories:
+                errors.setdefault(index,
+                                  f'неизвестная категория <{category}>')
+            elif unknown:
+                errors.setdefault(index, f'неизвестные жанры {unknown}')
+            objects.append(Title(
+                id=pk,
+                name=row.get('name') or '',
+                year=year,
+                description=row.get('description') or '',
+                category_id=self.categories.get(category),
+            ))
+            self.genre_ids.append([self.genres[slug] for slug in genres
+                                   if slug in self.genres])
+        return objects, errors
+
+    def save(self, objects, indexes):
+        super().save(objects, indexes)
+        through = Title.genre.through
+        links = []
+        for obj, index in zip(objects, indexes):
+            if obj.pk is None:
+                raise ValueError('Для загрузки жанров произведений '
+                                 'в файле нужен столбец id.')
+            links.extend(through(title_id=obj.pk, genre_id=genre_id)
+                         for genre_id in self.genre_ids[index])
+        through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class AuthoredImporter(Importer):
+    """Общая часть загрузки отзывов и комментариев."""
+
+    parent_model = None
+    parent_field = None
+
+    def resolve(self, rows):
+        """
+        Одним запросом на пакет находит авторов и родительские объекты.
+        Возвращает (авторы по username, столбцы id, родителя, pub_date
+        и is_hidden, ошибки).
+        """
+        errors = {}
+        ids = parse_ints(rows, 'id', errors)
+        parent_ids = parse_ints(rows, self.parent_field, errors)
+        dates = parse_dates(rows, self.model._meta.get_field('pub_date'),
+                            errors)
+        hidden = parse_flags(rows, 'is_hidden', errors)
+        usernames = {row.get('author') for row in rows}
+        authors = dict(User.objects
+                       .filter(username__in=usernames)
+                       .values_list('username', 'id'))
+        parents = set(self.parent_model.objects
+                      .filter(pk__in=set(parent_ids) - {None})
+                      .values_list('pk', flat=True))
+        for index, (row, parent_id) in enumerate(zip(rows, parent_ids)):
+            if row.get('author') not in authors:
+                errors.setdefault(
+                    index, f'неизвестный автор <{row.get("author")}>'
+                )
+            elif parent_id not in parents:
+                errors.setdefault(index, f'неизвестный {self.parent_field} '
+                                         f'<{row.get(self.parent_field)}>')
+        return authors, (ids, parent_ids, dates, hidden), errors
+
+    def save(self, objects, indexes):
+        """
+        Вставляет строки, как loaddata, запросом с raw=True: значения
+        берутся из объектов без pre_save, поэтому дата из файла попадает
+        в поле auto_now_add, а само поле модели, общее для потоков
+        процесса, не меняется.
+        """
+        now = timezone.now()
+        for obj in objects:
+            obj.pub_date = obj.pub_date or now
+        opts = self.model._meta
+        manager = self.model._base_manager
+        # Как в bulk_create: строки без id вставляются без столбца id.
+        for has_pk, group in groupby(objects,
+                                     key=lambda obj: obj.pk is not None):
+            group = list(group)
+            fields = [field for field in opts.local_concrete_fields
+                      if has_pk or field is not opts.pk]
+            size = max(connection.ops.bulk_batch_size(fields, group), 1)
+            for batch in chunked(group, size):
+                manager._insert(batch, fields, raw=True,
+                                ignore_conflicts=self.ignore_conflicts)
+
+
+class ReviewImporter(AuthoredImporter):
+    model = Review
+    parent_model = Title
+    parent_field = 'title'
+
+    def build(self, rows):
+        authors, columns, errors = self.resolve(rows)
+        scores = parse_ints(rows, 'score', errors)
+        for index, message in check_range(scores, min_score_validator,
+                                          max_score_validator).items():
+            errors.setdefault(index, message)
+        objects = [Review(
+            id=pk,
+            title_id=title_id,
+            author_id=authors.get(row.get('author')),
+            text=row.get('text') or '',
+            score=score,
+            pub_date=pub_date,
+            is_hidden=is_hidden,
+        ) for row, (pk, title_id, pub_date, is_hidden), score
+            in zip(rows, zip(*columns), scores)]
+        return objects, errors
+
+
+class CommentImporter(AuthoredImporter):
+    model = Comment
+    parent_model = Review
+    parent_field = 'review'
+
+    def build(self, rows):
+        authors, columns, errors = self.resolve(rows)
+        objects = [Comment(
+            id=pk,
+            review_id=review_id,
+            author_id=authors.get(row.get('author')),
+            text=row.get('text') or '',
+            pub_date=pub_date,
+            is_hidden=is_hidden,
+        ) for row, (pk, review_id, pub_date, is_hidden)
+            in zip(rows, zip(*columns))]
+        return objects, errors
+
+
+IMPORTERS = {
+    'categories': CategoryImporter,
+    'genres': GenreImporter,
+    'users': UserImporter,
+    'titles': TitleImporter,
+    'reviews': ReviewImporter,
+    'comments': CommentImporter,
+}
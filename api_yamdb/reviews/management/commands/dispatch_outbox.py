@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from reviews.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди OutgoingEmail. Без --once '
+            'работает постоянно и проверяет очередь каждые --interval с.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Количество потоков отправки.')
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--backoff', type=float, default=30,
+                            help='Задержка перед первым повтором, с.')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Пауза, когда очередь пуста, с.')
+        parser.add_argument('--once', action='store_true',
+                            help='Отправить все готовые письма и выйти.')
+
+    def handle(self, *args, **options):
+        backoff = timedelta(seconds=options['backoff'])
+        while True:
+            close_old_connections()
+            sent, failed = dispatch_batch(
+                options['batch_size'], options['workers'],
+                options['max_attempts'], backoff
+            )
+            if sent or failed:
+                self.stdout.write(f'Отправлено: {sent}, ошибок: {failed}')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,42 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from reviews.dataset import DATASET_ORDER, FORMATS, export_rows, format_rows
+
+
+class Command(BaseCommand):
+    help = ('Выгружает данные YaMDb в файлы CSV или JSONL в формате, '
+            'который принимает import_yamdb.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов выгрузки.')
+        parser.add_argument('--model', choices=DATASET_ORDER,
+                            action='append',
+                            help='Выгружаемая модель; по умолчанию все.')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        directory = Path(options['directory'])
+        directory.mkdir(parents=True, exist_ok=True)
+        file_format = options['format']
+        for name in options['model'] or DATASET_ORDER:
+            path = directory / f'{name}.{file_format}'
+            started = time.monotonic()
+            rows = 0
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                for rows, chunk in enumerate(format_rows(
+                    name, export_rows(name, options['chunk_size']),
+                    file_format
+                ), start=1):
+                    file.write(chunk)
+            if file_format == 'csv':
+                rows = max(rows - 1, 0)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{name}: выгружено {rows} строк в {path} '
+                f'за {elapsed:.1f} с '
+                f'({rows / max(elapsed, 1e-6):.0f} строк/с)'
+            )
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена.'))
@@ -0,0 +1,55 @@
+import time
+
+from api.cache import response_cache
+from django.core.management.base import BaseCommand
+from reviews.dataset import DATASET_ORDER, IMPORTERS
+from reviews.models import DailyReviewCount, Title, TitleFacet
+from reviews.synthetic import SyntheticDataset
+
+
+class Command(BaseCommand):
+    help = ('Создает синтетические данные для нагрузочного тестирования: '
+            'отзывы распределены по произведениям по закону Ципфа. '
+            'Данные загружаются пакетами, как в import_yamdb, и '
+            'добавляются к существующим.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=50000)
+        parser.add_argument('--users', type=int, default=2000,
+                            help='Не меньше, чем отзывов на самое '
+                                 'популярное произведение.')
+        parser.add_argument('--comments', type=int, default=0)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        dataset = SyntheticDataset(
+            titles=options['titles'], reviews=options['reviews'],
+            users=options['users'], comments=options['comments'],
+            categories=options['categories'], genres=options['genres'],
+            exponent=options['zipf'], seed=options['seed'],
+        )
+        for name in DATASET_ORDER:
+            # Справочники и пользователи при повторном запуске уже есть.
+            importer = IMPORTERS[name](
+                batch_size=options['batch_size'],
+                ignore_conflicts=name in ('categories', 'genres', 'users'),
+            )
+            started = time.monotonic()
+            importer.run(getattr(dataset, name)())
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{name}: создано {importer.created} строк '
+                f'за {elapsed:.1f} с '
+                f'({importer.created / max(elapsed, 1e-6):.0f} строк/с)'
+            )
+        Title.objects.rebuild_ratings()
+        DailyReviewCount.objects.rebuild()
+        TitleFacet.objects.rebuild()
+        response_cache.invalidate('titles', 'categories', 'genres')
+        self.stdout.write(self.style.SUCCESS('Данные созданы.'))
@@ -0,0 +1,92 @@
+import time
+from pathlib import Path
+
+from api.cache import response_cache
+from django.core.management.base import BaseCommand, CommandError
+from reviews.dataset import DATASET_ORDER, FORMATS, IMPORTERS, read_rows
+from reviews.models import DailyReviewCount, Title, TitleFacet
+
+
+class Command(BaseCommand):
+    help = ('Загружает данные YaMDb из файлов CSV или JSONL пакетами '
+            'через bulk_create. Имя файла без расширения задает модель: '
+            f'{", ".join(DATASET_ORDER)}. Для каталога загружаются '
+            'все найденные файлы в порядке зависимостей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+',
+                            help='Файлы или каталоги с файлами данных.')
+        parser.add_argument('--model', choices=DATASET_ORDER,
+                            help='Модель для единственного файла, если '
+                                 'она не следует из имени файла.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Формат файлов; по умолчанию '
+                                 'определяется по расширению.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='Пропускать строки, нарушающие '
+                                 'уникальность (повторная загрузка).')
+
+    def collect_files(self, options):
+        files = {}
+        for path in map(Path, options['paths']):
+            candidates = sorted(path.iterdir()) if path.is_dir() else [path]
+            for file in candidates:
+                name = options['model'] or file.stem
+                file_format = options['format'] or file.suffix.lstrip('.')
+                if name not in IMPORTERS or file_format not in FORMATS:
+                    if not path.is_dir():
+                        raise CommandError(
+                            f'Не удалось определить модель или формат '
+                            f'файла {file}.'
+                        )
+                    continue
+                files[name] = (file, file_format)
+        return [(name, *files[name]) for name in DATASET_ORDER
+                if name in files]
+
+    def handle(self, *args, **options):
+        files = self.collect_files(options)
+        if not files:
+            raise CommandError('Файлы данных не найдены.')
+        loaded = set()
+        try:
+            for name, file, file_format in files:
+                # Пересчет нужен и после частично загруженного файла.
+                loaded.add(name)
+                self.load_file(name, file, file_format, options)
+        finally:
+            self.rebuild(loaded)
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена.'))
+
+    def load_file(self, name, file, file_format, options):
+        importer = IMPORTERS[name](
+            batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+        started = time.monotonic()
+        try:
+            importer.run(read_rows(file, file_format))
+        except ValueError as error:
+            raise CommandError(f'{file}: {error}')
+        finally:
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{name}: загружено {importer.created} строк '
+                f'за {elapsed:.1f} с '
+                f'({importer.created / max(elapsed, 1e-6):.0f} строк/с), '
+                f'пропущено {len(importer.errors)}'
+            )
+            for line, message in importer.errors[:20]:
+                self.stderr.write(f'  {file}, строка {line}: {message}')
+
+    def rebuild(self, loaded):
+        """Пересчитывает данные, которые bulk_create не обновляет."""
+        if loaded & {'titles', 'reviews'}:
+            # bulk_create не вызывает сигналы, обновляющие рейтинг.
+            Title.objects.rebuild_ratings()
+            DailyReviewCount.objects.rebuild()
+        if loaded & {'titles', 'categories', 'genres'}:
+            # Как и счетчики срезов каталога.
+            TitleFacet.objects.rebuild()
+        response_cache.invalidate('titles', 'categories', 'genres')
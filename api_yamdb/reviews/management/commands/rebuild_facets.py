@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from reviews.models import TitleFacet
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает количество произведений по жанрам, категориям '
+            'и годам (таблица TitleFacet).')
+
+    def handle(self, *args, **options):
+        TitleFacet.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны срезы каталога: {TitleFacet.objects.count()}'
+        ))
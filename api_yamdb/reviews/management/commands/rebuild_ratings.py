@@ -0,0 +1,16 @@
+from api.cache import response_cache
+from django.core.management.base import BaseCommand
+from reviews.models import DailyReviewCount, Title
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинг, взвешенный рейтинг, количество отзывов '
+            'и сумму оценок всех произведений и счетчики отзывов по дням.')
+
+    def handle(self, *args, **options):
+        updated = Title.objects.rebuild_ratings()
+        DailyReviewCount.objects.rebuild()
+        response_cache.invalidate('titles')
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитан рейтинг произведений: {updated}')
+        )
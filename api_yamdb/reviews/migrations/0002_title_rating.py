@@ -0,0 +1,57 @@
+# Generated by Django 3.2 on 2026-10-18 04:42
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def rebuild_ratings(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    reviews = (Review.objects
+               .filter(title=OuterRef('pk'))
+               .order_by()
+               .values('title'))
+    Title.objects.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(value=Count('pk')).values('value')), 0
+        ),
+        score_sum=Coalesce(
+            Subquery(reviews.annotate(value=Sum('score')).values('value')), 0
+        ),
+        rating=Subquery(reviews.annotate(value=Avg('score')).values('value')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'ordering': ['name']},
+        ),
+        migrations.AlterModelOptions(
+            name='genre',
+            options={'ordering': ['name']},
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(db_index=True, editable=False, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(rebuild_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2 on 2026-10-18 05:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_facets(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleFacet = apps.get_model('reviews', 'TitleFacet')
+    facets = []
+    for facet, column in (('genre', 'genre_id'), ('category', 'category_id'),
+                          ('year', 'year')):
+        rows = (Title.objects.order_by()
+                .filter(**{f'{facet}__isnull': False})
+                .values(facet)
+                .annotate(count=Count('pk')))
+        facets += [TitleFacet(facet=facet, title_count=row['count'],
+                              **{column: row[facet]})
+                   for row in rows]
+    TitleFacet.objects.bulk_create(facets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_category_year_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('genre', 'Жанр'), ('category', 'Категория'), ('year', 'Год')], max_length=16, verbose_name='Срез')),
+                ('year', models.IntegerField(blank=True, null=True, verbose_name='Год')),
+                ('title_count', models.PositiveIntegerField(default=0, verbose_name='Количество произведений')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='reviews.category')),
+                ('genre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='reviews.genre')),
+            ],
+            options={
+                'verbose_name': 'Срез каталога',
+                'verbose_name_plural': 'Срезы каталога',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titlefacet',
+            constraint=models.UniqueConstraint(condition=models.Q(facet='genre'), fields=('genre',), name='unique_genre_facet'),
+        ),
+        migrations.AddConstraint(
+            model_name='titlefacet',
+            constraint=models.UniqueConstraint(condition=models.Q(facet='category'), fields=('category',), name='unique_category_facet'),
+        ),
+        migrations.AddConstraint(
+            model_name='titlefacet',
+            constraint=models.UniqueConstraint(condition=models.Q(facet='year'), fields=('year',), name='unique_year_facet'),
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 3.2 on 2026-10-18 05:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast, TruncDate
+
+
+def fill_leaderboard(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    DailyReviewCount = apps.get_model('reviews', 'DailyReviewCount')
+    config = settings.LEADERBOARD
+    Title.objects.filter(review_count__gt=0).update(
+        weighted_rating=(
+            Cast(F('score_sum'), FloatField())
+            + config['PRIOR_WEIGHT'] * config['PRIOR_MEAN']
+        ) / (F('review_count') + config['PRIOR_WEIGHT'])
+    )
+    days = (Review.objects
+            .annotate(day=TruncDate('pub_date'))
+            .order_by()
+            .values('title', 'day')
+            .annotate(count=Count('pk')))
+    DailyReviewCount.objects.bulk_create(
+        (DailyReviewCount(title_id=row['title'], day=row['day'],
+                          review_count=row['count'])
+         for row in days.iterator()),
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_facet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReviewCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+            ],
+            options={
+                'verbose_name': 'Отзывы за день',
+                'verbose_name_plural': 'Отзывы по дням',
+            },
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-weighted_rating', 'id'], name='title_weighted_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-weighted_rating', 'id'], name='title_category_weighted_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyreviewcount',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_reviews', to='reviews.title'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyreviewcount',
+            index=models.Index(fields=['day', 'title'], name='daily_review_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyreviewcount',
+            constraint=models.UniqueConstraint(fields=('title', 'day'), name='unique_daily_review_count'),
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
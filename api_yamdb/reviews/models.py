@@ -1,8 +1,18 @@
+import time
+
 from api.validators import (max_score_validator, max_year_validator,
                             min_score_validator, min_year_validator,
                             username_me_validator, username_regex_validator)
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import (Avg, Case, Count, F, FloatField, OuterRef,
+                              Subquery, Sum, When, Window)
+from django.db.models.functions import (Cast, Coalesce, Greatest, NullIf,
+                                        RowNumber, TruncDate)
+from django.utils import timezone
+
+from .facets import FACETS, grouped_counts
 
 
 class RoleChoices(models.TextChoices):
@@ -51,6 +61,15 @@ class User(AbstractUser):
     class Meta:
         ordering = ['username']
 
+    # Имя пользователя в БД: оно входит в ответы с отзывами и комментариями.
+    _saved_username = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_username = instance.__dict__.get('username')
+        return instance
+
     @property
     def is_admin(self):
         return self.role == RoleChoices.ADM
@@ -100,6 +119,74 @@ class Genre(models.Model):
         return self.slug
 
 
+def weighted_rating(count=0, score=0):
+    """
+    Байесовский рейтинг после сдвига агрегатов на count отзывов с суммой
+    оценок score: (сумма + m * C) / (количество + m), где C и m —
+    LEADERBOARD['PRIOR_MEAN'] и ['PRIOR_WEIGHT']. Пока отзывов мало,
+    рейтинг близок к C, поэтому один отзыв с оценкой 10
+    не поднимает произведение на первое место.
+    """
+    config = settings.LEADERBOARD
+    prior = config['PRIOR_WEIGHT'] * config['PRIOR_MEAN']
+    return Case(
+        When(review_count=-count, then=None),
+        default=(Cast(F('score_sum') + score, FloatField()) + prior)
+        / (F('review_count') + count + config['PRIOR_WEIGHT']),
+        output_field=FloatField(),
+    )
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def update_rating(self, count, score):
+        """
+        Сдвигает агрегаты рейтинга на count отзывов с суммой оценок score
+        одним UPDATE без чтения строк произведений.
+        """
+        return self.update(
+            review_count=F('review_count') + count,
+            score_sum=F('score_sum') + score,
+            rating=(Cast(F('score_sum') + score, FloatField())
+                    / NullIf(F('review_count') + count, 0)),
+            weighted_rating=weighted_rating(count, score),
+            version=F('version') + 1,
+            modified=timezone.now(),
+        )
+
+    def touch(self):
+        """Отмечает изменение произведения, его отзывов или комментариев."""
+        return self.update(version=F('version') + 1, modified=timezone.now())
+
+    def rebuild_ratings(self):
+        """
+        Пересчитывает агрегаты рейтинга по таблице отзывов и, как touch,
+        меняет версию произведений: ETag и кэш ответов их отзывов
+        устаревают.
+        """
+        reviews = (Review.objects
+                   .filter(title=OuterRef('pk'), is_hidden=False)
+                   .order_by()
+                   .values('title'))
+        self.update(
+            review_count=Coalesce(
+                Subquery(reviews.annotate(value=Count('pk')).values('value')),
+                0
+            ),
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(value=Sum('score')).values('value')),
+                0
+            ),
+            rating=Subquery(
+                reviews.annotate(value=Avg('score')).values('value')
+            ),
+        )
+        # Взвешенный рейтинг — по уже обновленным агрегатам.
+        return self.update(weighted_rating=weighted_rating(),
+                           version=F('version') + 1,
+                           modified=timezone.now())
+
+
 class Title(models.Model):
     name = models.CharField(
         'Название произведения',
@@ -131,13 +218,195 @@ class Title(models.Model):
         related_name='titles',
         blank=False
     )
+    rating = models.FloatField(
+        'Рейтинг',
+        null=True,
+        editable=False,
+        db_index=True
+    )
+    weighted_rating = models.FloatField(
+        'Взвешенный рейтинг',
+        null=True,
+        editable=False
+    )
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False
+    )
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        'Версия отзывов и комментариев',
+        default=0,
+        editable=False
+    )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='title_name_id_idx'),
+            models.Index(fields=['category', 'year'],
+                         name='title_category_year_idx'),
+            # Лучшие произведения читаются по индексу: O(K) строк.
+            models.Index(fields=['-weighted_rating', 'id'],
+                         name='title_weighted_rating_idx'),
+            models.Index(fields=['category', '-weighted_rating', 'id'],
+                         name='title_category_weighted_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'Общая информация о произведении {self.name}'
 
+    # Категория и год в БД, уже учтенные в счетчиках TitleFacet.
+    _facet_state = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._facet_state = instance.get_facet_state()
+        return instance
+
+    def get_facet_state(self):
+        """Возвращает пару (category_id, year), учитываемую в TitleFacet."""
+        if 'category_id' not in self.__dict__ or 'year' not in self.__dict__:
+            return None
+        return self.category_id, self.year
+
+    def save(self, *args, **kwargs):
+        # Счетчики TitleFacet обновляются в post_save в той же транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class FacetChoices(models.TextChoices):
+    GENRE = 'genre', 'Жанр'
+    CATEGORY = 'category', 'Категория'
+    YEAR = 'year', 'Год'
+
+
+# Поле TitleFacet, в котором хранится значение среза.
+FACET_FIELDS = {
+    FacetChoices.GENRE: 'genre_id',
+    FacetChoices.CATEGORY: 'category_id',
+    FacetChoices.YEAR: 'year',
+}
+
+
+class TitleFacetQuerySet(models.QuerySet):
+
+    def shift(self, facet, values, delta):
+        """
+        Прибавляет delta к счетчикам значений values среза facet;
+        недостающие счетчики создаются.
+        """
+        field = FACET_FIELDS[facet]
+        values = {value for value in values if value is not None}
+        if not values or not delta:
+            return
+        counters = self.filter(facet=facet, **{f'{field}__in': values})
+        if (counters.update(title_count=F('title_count') + delta)
+                == len(values) or delta < 0):
+            return
+        existing = set(counters.values_list(field, flat=True))
+        for value in values - existing:
+            try:
+                with transaction.atomic():
+                    self.create(facet=facet, title_count=delta,
+                                **{field: value})
+            except IntegrityError:
+                # Счетчик успело создать одновременное изменение.
+                self.filter(facet=facet, **{field: value}).update(
+                    title_count=F('title_count') + delta
+                )
+
+    def rebuild(self):
+        """Пересчитывает все счетчики по таблицам произведений и жанров."""
+        counts = grouped_counts(
+            Title.objects.all(), FACETS,
+            {'genre': 'genre__id', 'category': 'category_id', 'year': 'year'}
+        )
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                self.model(facet=facet, title_count=count,
+                           **{FACET_FIELDS[facet]: int(value)})
+                for facet, values in counts.items()
+                for value, count in values.items()
+            )
+
+    def counts(self, facets):
+        """Хранимые счетчики в виде {срез: {значение: количество}}."""
+        counts = {facet: {} for facet in facets}
+        rows = (self.filter(facet__in=facets, title_count__gt=0)
+                .values_list('facet', 'genre__slug', 'category__slug',
+                             'year', 'title_count'))
+        for facet, genre, category, year, count in rows:
+            value = {FacetChoices.GENRE: genre,
+                     FacetChoices.CATEGORY: category}.get(facet, year)
+            counts[facet][str(value)] = count
+        return counts
+
+
+class TitleFacet(models.Model):
+    """Количество произведений с жанром, категорией или годом."""
+    facet = models.CharField(
+        'Срез',
+        max_length=16,
+        choices=FacetChoices.choices
+    )
+    genre = models.ForeignKey(
+        Genre,
+        on_delete=models.CASCADE,
+        related_name='facets',
+        null=True,
+        blank=True
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='facets',
+        null=True,
+        blank=True
+    )
+    year = models.IntegerField(
+        'Год',
+        null=True,
+        blank=True
+    )
+    title_count = models.PositiveIntegerField(
+        'Количество произведений',
+        default=0
+    )
+
+    objects = TitleFacetQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Срез каталога'
+        verbose_name_plural = 'Срезы каталога'
+        constraints = [
+            models.UniqueConstraint(
+                fields=[field],
+                condition=models.Q(facet=facet),
+                name=f'unique_{facet}_facet'
+            )
+            for facet, field in (('genre', 'genre'),
+                                 ('category', 'category'),
+                                 ('year', 'year'))
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.facet}: {self.title_count}'
+
 
 class Review(models.Model):
     """Класс отзывов."""
@@ -168,6 +437,10 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    is_hidden = models.BooleanField(
+        verbose_name='Скрыт модератором',
+        default=False
+    )
 
     class Meta:
         verbose_name = 'Отзыв'
@@ -179,6 +452,183 @@ class Review(models.Model):
                 name='unique_review'
             ),
         ]
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
+
+    # Состояние отзыва в БД, уже учтенное в агрегатах рейтинга Title.
+    _rating_state = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rating_state = instance.get_rating_state()
+        return instance
+
+    def get_rating_state(self):
+        """
+        Возвращает пару (title_id, score), учитываемую в рейтинге.
+        Скрытый отзыв в рейтинге не учитывается.
+        """
+        title_id = self.__dict__.get('title_id')
+        score = self.__dict__.get('score')
+        if title_id is None or score is None or self.__dict__.get(
+            'is_hidden'
+        ):
+            return None
+        return title_id, score
+
+    def save(self, *args, **kwargs):
+        # Рейтинг произведения обновляется в post_save в той же транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class DailyReviewCountQuerySet(models.QuerySet):
+
+    def shift(self, title_id, day, delta):
+        """Прибавляет delta к числу отзывов на произведение за день."""
+        connection = connections[router.db_for_write(self.model)]
+        if delta > 0 and connection.vendor in ('postgresql', 'sqlite'):
+            # Один запрос вместо UPDATE и INSERT для первого отзыва за день.
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (title_id, day, review_count) '
+                    f'VALUES (%s, %s, %s) ON CONFLICT (title_id, day) '
+                    f'DO UPDATE SET review_count = '
+                    f'{table}.review_count + EXCLUDED.review_count',
+                    [title_id, connection.ops.adapt_datefield_value(day),
+                     delta]
+                )
+            return
+        counters = self.filter(title_id=title_id, day=day)
+        updated = counters.update(review_count=F('review_count') + delta)
+        if updated or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                self.create(title_id=title_id, day=day, review_count=delta)
+        except IntegrityError:
+            # Счетчик успело создать одновременное изменение.
+            counters.update(review_count=F('review_count') + delta)
+
+    def rebuild(self, titles=None):
+        """
+        Пересчитывает счетчики по таблице отзывов: все или только
+        произведений titles (id или queryset).
+        """
+        reviews = Review.objects.filter(is_hidden=False)
+        counters = self.all()
+        if titles is not None:
+            reviews = reviews.filter(title__in=titles)
+            counters = counters.filter(title__in=titles)
+        days = (reviews
+                .annotate(day=TruncDate('pub_date'))
+                .order_by()
+                .values('title', 'day')
+                .annotate(count=Count('pk')))
+        with transaction.atomic():
+            counters.delete()
+            self.bulk_create(
+                (self.model(title_id=row['title'], day=row['day'],
+                            review_count=row['count'])
+                 for row in days.iterator()),
+                batch_size=5000
+            )
+
+    def trending(self, since, limit):
+        """id произведений с наибольшим числом отзывов начиная с since."""
+        return (self.filter(day__gte=since)
+                .values('title')
+                .annotate(total=Sum('review_count'))
+                .order_by('-total', 'title')
+                .values_list('title', flat=True)[:limit])
+
+
+class DailyReviewCount(models.Model):
+    """Количество отзывов на произведение за день."""
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='daily_reviews'
+    )
+    day = models.DateField('День')
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0
+    )
+
+    objects = DailyReviewCountQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Отзывы за день'
+        verbose_name_plural = 'Отзывы по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'day'],
+                                    name='unique_daily_review_count'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'title'],
+                         name='daily_review_day_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.title_id}, {self.day}: {self.review_count}'
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def count_by_review(self, review_ids):
+        """Число видимых комментариев к отзывам: {id отзыва: число}."""
+        return dict(self.filter(review_id__in=review_ids, is_hidden=False)
+                    .order_by()
+                    .values('review_id')
+                    .annotate(count=Count('pk'))
+                    .values_list('review_id', 'count'))
+
+    def first_by_review(self, review_ids, limit):
+        """
+        Первые limit видимых комментариев каждого отзыва (по pub_date, id)
+        и число комментариев к нему одним запросом: ROW_NUMBER() и COUNT()
+        по отзыву считаются в подзапросе, наружу попадают только первые
+        строки. Возвращает ({id отзыва: число}, {id отзыва: комментарии});
+        username автора — в атрибуте author_name.
+        """
+        comments = (self.filter(review_id__in=review_ids, is_hidden=False)
+                    .annotate(author_name=F('author__username')))
+        connection = connections[self.db]
+        if connection.features.supports_over_clause:
+            ranked = comments.annotate(
+                comment_rank=Window(RowNumber(),
+                                    partition_by=[F('review_id')],
+                                    order_by=[F('pub_date').asc(),
+                                              F('id').asc()]),
+                comment_total=Window(Count('id'),
+                                     partition_by=[F('review_id')]),
+            ).order_by()
+            sql, params = ranked.query.get_compiler(self.db).as_sql()
+            comments = self.raw(
+                f'SELECT * FROM ({sql}) ranked '
+                f'WHERE ranked.comment_rank <= %s '
+                f'ORDER BY ranked.review_id, ranked.comment_rank',
+                (*params, limit)
+            )
+            rows = [(comment, comment.comment_total) for comment in comments]
+        else:
+            rows = [(comment, None) for comment
+                    in comments.order_by('review_id', 'pub_date', 'id')]
+        counts = {}
+        first = {}
+        for comment, total in rows:
+            counts[comment.review_id] = (
+                total or counts.get(comment.review_id, 0) + 1
+            )
+            first.setdefault(comment.review_id, [])
+            if len(first[comment.review_id]) < limit:
+                first[comment.review_id].append(comment)
+        return counts, first
 
 
 class Comment(models.Model):
@@ -203,8 +653,157 @@ class Comment(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    is_hidden = models.BooleanField(
+        verbose_name='Скрыт модератором',
+        default=False
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['pub_date']
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+        ]
+
+
+class EmailStatus(models.TextChoices):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди на отправку (outbox).
+    Для пользователя хранится не больше одного неотправленного письма:
+    повторная регистрация заменяет его текст.
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='emails'
+    )
+    subject = models.CharField(
+        'Тема',
+        max_length=256
+    )
+    body = models.TextField(
+        'Текст'
+    )
+    from_email = models.EmailField(
+        'Отправитель'
+    )
+    to_email = models.EmailField(
+        'Получатель'
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=7,
+        choices=EmailStatus.choices,
+        default=EmailStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попытки отправки',
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now
+    )
+    sent_at = models.DateTimeField(
+        'Дата отправки',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Письма'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_email'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='email_status_next_attempt_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.subject} <{self.to_email}>'
+
+
+class ResourceVersionQuerySet(models.QuerySet):
+
+    def get_version(self, resource):
+        """Версия ресурса из основной БД или 0, если он не изменялся."""
+        return (self.using(router.db_for_write(self.model))
+                .filter(resource=resource)
+                .values_list('version', flat=True)
+                .first()) or 0
+
+    def bump(self, resource):
+        """
+        Увеличивает версию ресурса. Новая версия не меньше текущего
+        времени в наносекундах: после очистки таблицы она не совпадет
+        с версией, под которой в кэше остались записи.
+        """
+        connection = connections[router.db_for_write(self.model)]
+        now = time.time_ns()
+        if connection.vendor in ('postgresql', 'sqlite'):
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (resource, version) '
+                    f'VALUES (%s, %s) ON CONFLICT (resource) '
+                    f'DO UPDATE SET version = CASE '
+                    f'WHEN EXCLUDED.version > {table}.version '
+                    f'THEN EXCLUDED.version ELSE {table}.version + 1 END',
+                    [resource, now]
+                )
+            return
+        versions = self.filter(resource=resource)
+        if versions.update(version=Greatest(F('version') + 1, now)):
+            return
+        try:
+            with transaction.atomic():
+                self.create(resource=resource, version=now)
+        except IntegrityError:
+            versions.update(version=Greatest(F('version') + 1, now))
+
+
+class ResourceVersion(models.Model):
+    """
+    Версия ресурса кэша ответов API (titles, categories, genres).
+    Хранится в БД, чтобы изменение видели все процессы и серверы,
+    и меняется в одной транзакции с данными ресурса.
+    """
+    resource = models.CharField(
+        'Ресурс',
+        max_length=50,
+        primary_key=True
+    )
+    version = models.BigIntegerField(
+        'Версия',
+        default=0
+    )
+
+    objects = ResourceVersionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Версия ресурса'
+        verbose_name_plural = 'Версии ресурсов'
+
+    def __str__(self) -> str:
+        return f'{self.resource}: {self.version}'
@@ -0,0 +1,84 @@
+"""
+Пакетная модерация отзывов и комментариев.
+
+Отзывы и комментарии выбираются по id или по авторам и удаляются
+(вместе с комментариями удаляемых отзывов) или скрываются запросами
+над множеством строк: объекты не загружаются, сигналы на каждый
+объект не отправляются. Рейтинг, счетчики отзывов за день и версии
+затронутых произведений затем пересчитываются одним проходом.
+"""
+from django.db import connections, models, router, transaction
+from django.db.models import Q
+
+from .models import Comment, DailyReviewCount, Review, Title, User
+
+
+class ModerationAction(models.TextChoices):
+    DELETE = 'delete'
+    HIDE = 'hide'
+    UNHIDE = 'unhide'
+
+
+def delete_rows(queryset):
+    """
+    Удаляет строки queryset одним DELETE ... WHERE id IN (SELECT ...).
+    Каскады и сигналы не выполняются: зависимые строки удаляет
+    вызывающий код.
+    """
+    using = router.db_for_write(queryset.model)
+    connection = connections[using]
+    meta = queryset.model._meta
+    sql, params = (queryset.order_by().values('pk').query
+                   .get_compiler(using).as_sql())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(meta.db_table)} '
+            f'WHERE {connection.ops.quote_name(meta.pk.column)} IN ({sql})',
+            params
+        )
+        return cursor.rowcount
+
+
+def moderate(action, reviews=(), comments=(), authors=()):
+    """
+    Удаляет, скрывает или открывает отзывы с id reviews, комментарии
+    с id comments и все отзывы и комментарии авторов authors (username).
+    Возвращает число затронутых отзывов и комментариев.
+    """
+    author_ids = (list(User.objects.filter(username__in=authors)
+                       .order_by().values_list('pk', flat=True))
+                  if authors else [])
+    target_reviews = Review.objects.filter(
+        Q(pk__in=reviews) | Q(author_id__in=author_ids)
+    )
+    comment_filter = Q(pk__in=comments) | Q(author_id__in=author_ids)
+    if action == ModerationAction.DELETE:
+        comment_filter |= Q(review__in=target_reviews.values('pk'))
+    target_comments = Comment.objects.filter(comment_filter)
+    if action != ModerationAction.DELETE:
+        # Меняются только строки, видимость которых действительно меняется.
+        hidden = action == ModerationAction.UNHIDE
+        target_reviews = target_reviews.filter(is_hidden=hidden)
+        target_comments = target_comments.filter(is_hidden=hidden)
+    with transaction.atomic():
+        rating_titles = set(target_reviews.order_by()
+                            .values_list('title_id', flat=True).distinct())
+        titles = rating_titles | set(
+            target_comments.order_by()
+            .values_list('review__title_id', flat=True).distinct()
+        )
+        counts = {}
+        if action == ModerationAction.DELETE:
+            # Сначала комментарии: на удаляемые отзывы ссылаются их ключи.
+            counts['comments'] = delete_rows(target_comments)
+            counts['reviews'] = delete_rows(target_reviews)
+        else:
+            hidden = action == ModerationAction.HIDE
+            counts['reviews'] = target_reviews.update(is_hidden=hidden)
+            counts['comments'] = target_comments.update(is_hidden=hidden)
+        if rating_titles:
+            Title.objects.filter(pk__in=rating_titles).rebuild_ratings()
+            DailyReviewCount.objects.rebuild(rating_titles)
+        if titles:
+            Title.objects.filter(pk__in=titles).touch()
+    return counts
@@ -0,0 +1,143 @@
+"""
+Очередь исходящих писем.
+
+Запрос только записывает письмо в OutgoingEmail, отправляет его
+команда dispatch_outbox: пачками, в нескольких потоках, каждый поток
+через одно соединение get_connection(), с повтором после ошибки.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailStatus, OutgoingEmail
+
+# Время, на которое отправитель резервирует взятые письма:
+# другие процессы dispatch_outbox их не возьмут.
+LEASE = timedelta(minutes=5)
+
+# Поля, которые заменяет повторная постановка письма в очередь.
+CONTENT_FIELDS = ('subject', 'body', 'from_email', 'to_email')
+
+
+def enqueue_email(user, subject, body, from_email, to_email):
+    """
+    Ставит письмо пользователю в очередь. Если неотправленное письмо
+    уже есть, оно заменяется новым. Письмо, которое в это время
+    отправляется, остается в очереди с новым текстом
+    (см. unchanged_emails).
+    """
+    fields = {
+        'subject': subject,
+        'body': body,
+        'from_email': from_email,
+        'to_email': to_email,
+        'attempts': 0,
+        'next_attempt_at': timezone.now(),
+        'last_error': '',
+    }
+    pending = OutgoingEmail.objects.filter(user=user,
+                                           status=EmailStatus.PENDING)
+    if pending.update(**fields):
+        return
+    try:
+        with transaction.atomic():
+            OutgoingEmail.objects.create(user=user, **fields)
+    except IntegrityError:
+        # Письмо успело поставить одновременное обращение.
+        pending.update(**fields)
+
+
+def claim_batch(batch_size):
+    """Выбирает письма, которые пора отправить, и резервирует их."""
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = (OutgoingEmail.objects
+                    .filter(status=EmailStatus.PENDING,
+                            next_attempt_at__lte=now)
+                    .order_by('next_attempt_at', 'id'))
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        emails = list(queryset[:batch_size])
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt_at=now + LEASE)
+    return emails
+
+
+def unchanged_emails(emails):
+    """
+    Условие на строки взятых писем, текст которых не заменила повторная
+    постановка в очередь за время отправки: состояние остальных строк
+    относится уже к новому письму.
+    """
+    condition = Q(pk__in=[])
+    for email in emails:
+        condition |= Q(pk=email.pk, **{field: getattr(email, field)
+                                       for field in CONTENT_FIELDS})
+    return condition
+
+
+def send_chunk(emails):
+    """
+    Отправляет письма через одно соединение.
+    Возвращает пары (письмо, текст ошибки или None).
+    """
+    try:
+        with get_connection() as mail_connection:
+            results = []
+            for email in emails:
+                message = EmailMessage(email.subject, email.body,
+                                       email.from_email, [email.to_email],
+                                       connection=mail_connection)
+                try:
+                    message.send()
+                except Exception as error:
+                    results.append((email, repr(error)))
+                else:
+                    results.append((email, None))
+            return results
+    except Exception as error:
+        return [(email, repr(error)) for email in emails]
+
+
+def dispatch_batch(batch_size=100, workers=4, max_attempts=5,
+                   backoff=timedelta(seconds=30)):
+    """
+    Отправляет одну пачку писем. После неудачи следующая попытка
+    откладывается на backoff * 2 ** (попытка - 1), после max_attempts
+    письмо помечается как failed.
+    Возвращает количество отправленных и неотправленных писем.
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+    chunks = [emails[index::workers] for index in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = [result
+                   for chunk_results in executor.map(send_chunk, chunks)
+                   for result in chunk_results]
+    now = timezone.now()
+    sent = [email for email, error in results if error is None]
+    OutgoingEmail.objects.filter(unchanged_emails(sent)).update(
+        status=EmailStatus.SENT, sent_at=now, last_error=''
+    )
+    failed = [(email, error) for email, error in results if error]
+    for email, error in failed:
+        email.attempts += 1
+        email.last_error = error
+        if email.attempts >= max_attempts:
+            email.status = EmailStatus.FAILED
+        else:
+            email.next_attempt_at = (
+                now + backoff * 2 ** (email.attempts - 1)
+            )
+        # Ошибки редки: отдельный UPDATE с проверкой текста на письмо.
+        OutgoingEmail.objects.filter(unchanged_emails([email])).update(
+            attempts=email.attempts, last_error=email.last_error,
+            status=email.status, next_attempt_at=email.next_attempt_at
+        )
+    return len(sent), len(failed)
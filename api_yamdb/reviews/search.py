@@ -0,0 +1,147 @@
+"""
+Полнотекстовый поиск по произведениям и отзывам.
+
+PostgreSQL: столбец search_vector (tsvector) с GIN-индексом,
+который заполняет триггер tsvector_update_trigger.
+SQLite: виртуальная таблица FTS5 с внешним содержимым,
+которую поддерживают триггеры на вставку, изменение и удаление.
+Структуры создаются идемпотентно после каждой миграции: SQLite
+пересоздает таблицу при изменении схемы и теряет ее триггеры.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Review, Title
+
+SEARCH_FIELDS = {
+    Title: ('name', 'description'),
+    Review: ('text',),
+}
+
+POSTGRES_CONFIG = 'pg_catalog.russian'
+
+
+# Поддержка FTS5 по псевдонимам соединений: она зависит от сборки SQLite
+# и не меняется, пока работает процесс.
+fts5_support = {}
+
+
+def fts5_available(connection):
+    """Собран ли SQLite с FTS5; PRAGMA выполняется раз на соединение."""
+    if connection.alias not in fts5_support:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            options = {row[0] for row in cursor.fetchall()}
+        fts5_support[connection.alias] = 'ENABLE_FTS5' in options
+    return fts5_support[connection.alias]
+
+
+def install_postgresql(connection, model, fields):
+    table = model._meta.db_table
+    document = " || ' ' || ".join(
+        f"coalesce({field}, '')" for field in fields
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM information_schema.columns '
+            "WHERE table_name = %s AND column_name = 'search_vector'",
+            [table]
+        )
+        if cursor.fetchone():
+            return
+        cursor.execute(
+            f'ALTER TABLE {table} ADD COLUMN search_vector tsvector'
+        )
+        cursor.execute(
+            f'UPDATE {table} SET search_vector = '
+            f'to_tsvector(%s, {document})', [POSTGRES_CONFIG]
+        )
+        cursor.execute(f'CREATE INDEX {table}_search_idx '
+                       f'ON {table} USING gin(search_vector)')
+        cursor.execute(
+            f'CREATE TRIGGER {table}_search_update '
+            f'BEFORE INSERT OR UPDATE ON {table} FOR EACH ROW '
+            f'EXECUTE PROCEDURE tsvector_update_trigger('
+            f"search_vector, '{POSTGRES_CONFIG}', {', '.join(fields)})"
+        )
+
+
+def install_sqlite(connection, model, fields):
+    table = model._meta.db_table
+    columns = ', '.join(fields)
+    new_values = ', '.join(f'new.{field}' for field in fields)
+    old_values = ', '.join(f'old.{field}' for field in fields)
+    insert = (f'INSERT INTO {table}_fts(rowid, {columns}) '
+              f'VALUES (new.id, {new_values});')
+    delete = (f"INSERT INTO {table}_fts({table}_fts, rowid, {columns}) "
+              f"VALUES ('delete', old.id, {old_values});")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' "
+            'AND name LIKE %s', [f'{table}_fts_%']
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5('
+            f"{columns}, content='{table}', content_rowid='id')"
+        )
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_fts_insert '
+                       f'AFTER INSERT ON {table} BEGIN {insert} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_fts_delete '
+                       f'AFTER DELETE ON {table} BEGIN {delete} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_fts_update '
+                       f'AFTER UPDATE ON {table} BEGIN {delete} {insert} END')
+        cursor.execute(f"INSERT INTO {table}_fts({table}_fts) "
+                       f"VALUES ('rebuild')")
+
+
+def install_search_index(using):
+    """Создает поисковые структуры, если их еще нет."""
+    connection = connections[using]
+    for model, fields in SEARCH_FIELDS.items():
+        if connection.vendor == 'postgresql':
+            install_postgresql(connection, model, fields)
+        elif connection.vendor == 'sqlite' and fts5_available(connection):
+            install_sqlite(connection, model, fields)
+
+
+def fts5_query(query):
+    """Каждое слово запроса — отдельный терм в кавычках (логическое И)."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+def search(queryset, query):
+    """
+    Фильтрует queryset по поисковому запросу и добавляет
+    релевантность search_rank (чем больше, тем выше в выдаче).
+    Отбор идет по индексу, без полного просмотра таблицы;
+    без индекса (другие СУБД) — поиск подстроки по первому полю.
+    """
+    model = queryset.model
+    table = model._meta.db_table
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        tsquery = 'plainto_tsquery(%s, %s)'
+        params = (POSTGRES_CONFIG, query)
+        matches = RawSQL(f'SELECT id FROM {table} '
+                         f'WHERE search_vector @@ {tsquery}', params)
+        rank = RawSQL(f'ts_rank("{table}"."search_vector", {tsquery})',
+                      params, output_field=FloatField())
+    elif connection.vendor == 'sqlite' and fts5_available(connection):
+        terms = fts5_query(query)
+        if not terms:
+            return queryset.none()
+        matches = RawSQL(f'SELECT rowid FROM {table}_fts '
+                         f'WHERE {table}_fts MATCH %s', (terms,))
+        rank = RawSQL(f'(SELECT -bm25({table}_fts) FROM {table}_fts '
+                      f'WHERE {table}_fts MATCH %s '
+                      f'AND rowid = "{table}"."id")',
+                      (terms,), output_field=FloatField())
+    else:
+        field = SEARCH_FIELDS[model][0]
+        return queryset.filter(**{f'{field}__icontains': query})
+    return queryset.filter(pk__in=matches).annotate(search_rank=rank)
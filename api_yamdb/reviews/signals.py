@@ -0,0 +1,191 @@
+from django.db.models import Q
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (Category, Comment, DailyReviewCount, FacetChoices, Genre,
+                     Review, Title, TitleFacet, User)
+from .search import install_search_index
+
+
+def shift_daily_reviews(title_id, review, delta):
+    day = timezone.localtime(review.pub_date).date()
+    DailyReviewCount.objects.shift(title_id, day, delta)
+
+
+@receiver(post_save, sender=Review)
+def update_title_rating_on_save(sender, instance, raw, **kwargs):
+    """
+    Учитывает новый или измененный отзыв в рейтинге произведения
+    и в счетчике отзывов за день.
+    """
+    if raw:
+        return
+    old_state = instance._rating_state
+    new_state = instance.get_rating_state()
+    old_title = old_state[0] if old_state else None
+    new_title = new_state[0] if new_state else None
+    if old_title != new_title:
+        if old_title:
+            shift_daily_reviews(old_title, instance, -1)
+        if new_title:
+            shift_daily_reviews(new_title, instance, 1)
+    if old_state == new_state:
+        Title.objects.filter(pk=instance.title_id).touch()
+        return
+    if old_state and new_state and old_state[0] == new_state[0]:
+        Title.objects.filter(pk=new_state[0]).update_rating(
+            0, new_state[1] - old_state[1]
+        )
+    else:
+        if old_state:
+            Title.objects.filter(pk=old_state[0]).update_rating(
+                -1, -old_state[1]
+            )
+        if new_state:
+            Title.objects.filter(pk=new_state[0]).update_rating(
+                1, new_state[1]
+            )
+    instance._rating_state = new_state
+
+
+@receiver(post_delete, sender=Review)
+def update_title_rating_on_delete(sender, instance, **kwargs):
+    """Исключает удаленный отзыв (в том числе каскадно) из рейтинга."""
+    state = instance._rating_state
+    if state:
+        Title.objects.filter(pk=state[0]).update_rating(-1, -state[1])
+        shift_daily_reviews(state[0], instance, -1)
+    instance._rating_state = None
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_title_on_comment_change(sender, instance, **kwargs):
+    """Меняет версию произведения, к отзыву которого относится комментарий."""
+    Title.objects.filter(reviews=instance.review_id).touch()
+
+
+@receiver(post_save, sender=User)
+def touch_titles_on_author_rename(sender, instance, raw, **kwargs):
+    """
+    Меняет версии произведений, в отзывах и комментариях к которым
+    показывается имя переименованного пользователя.
+    """
+    if raw:
+        return
+    old_username = instance._saved_username
+    if old_username is not None and old_username != instance.username:
+        Title.objects.filter(
+            Q(reviews__author=instance) | Q(reviews__comments__author=instance)
+        ).touch()
+    instance._saved_username = instance.username
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def touch_titles_on_catalog_change(sender, instance, raw=False, **kwargs):
+    """
+    Меняет версии и дату изменения произведений, в которых показывается
+    измененная или удаляемая категория или жанр: связи при удалении
+    обнуляются каскадно, без сигналов произведения.
+    """
+    if raw:
+        return
+    field = 'category' if sender is Category else 'genre'
+    Title.objects.filter(**{field: instance}).touch()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_on_genre_change(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Title):
+        Title.objects.filter(pk=instance.pk).touch()
+    else:
+        Title.objects.filter(pk__in=pk_set or ()).touch()
+
+
+@receiver(post_save, sender=Title)
+def update_facets_on_save(sender, instance, created, raw, **kwargs):
+    """Учитывает категорию и год нового или измененного произведения."""
+    if raw:
+        return
+    old_state = None if created else instance._facet_state
+    new_state = instance.get_facet_state()
+    if not created and old_state is None or old_state == new_state:
+        return
+    for facet, index in ((FacetChoices.CATEGORY, 0), (FacetChoices.YEAR, 1)):
+        if old_state and old_state[index] == new_state[index]:
+            continue
+        if old_state:
+            TitleFacet.objects.shift(facet, [old_state[index]], -1)
+        TitleFacet.objects.shift(facet, [new_state[index]], 1)
+    instance._facet_state = new_state
+
+
+@receiver(pre_delete, sender=Title)
+def remember_genres_on_delete(sender, instance, **kwargs):
+    # Связи с жанрами удаляются каскадно, без сигнала m2m_changed.
+    instance._facet_genres = list(
+        instance.genre.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Title)
+def update_facets_on_delete(sender, instance, **kwargs):
+    """Исключает удаленное произведение из счетчиков."""
+    state = instance._facet_state
+    if state:
+        TitleFacet.objects.shift(FacetChoices.CATEGORY, [state[0]], -1)
+        TitleFacet.objects.shift(FacetChoices.YEAR, [state[1]], -1)
+    TitleFacet.objects.shift(FacetChoices.GENRE,
+                             getattr(instance, '_facet_genres', ()), -1)
+    instance._facet_state = None
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def update_facets_on_genre_change(sender, instance, action, reverse,
+                                  pk_set, **kwargs):
+    """
+    Учитывает добавленные и удаленные связи произведений с жанрами.
+    Удаляемые связи читаются из БД до удаления: remove() передает
+    и id, которых у произведения не было.
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(
+            **{'genre' if reverse else 'title': instance.pk}
+        )
+        if pk_set is not None:
+            links = links.filter(
+                **{'title__in' if reverse else 'genre__in': pk_set}
+            )
+        instance._facet_removed_genres = list(
+            links.values_list('genre_id', flat=True)
+        )
+        return
+    if action == 'post_add':
+        # При добавлении pk_set содержит только новые связи.
+        genres, delta = pk_set, 1
+        if reverse:
+            genres = [instance.pk] * len(pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        genres, delta = instance.__dict__.pop('_facet_removed_genres', ()), -1
+    else:
+        return
+    if reverse:
+        # Один жанр добавлен нескольким произведениям или удален у них.
+        TitleFacet.objects.shift(FacetChoices.GENRE, [instance.pk],
+                                 delta * len(genres))
+    else:
+        TitleFacet.objects.shift(FacetChoices.GENRE, genres, delta)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using, **kwargs):
+    """Создает или восстанавливает индексы полнотекстового поиска."""
+    if sender.name == 'reviews':
+        install_search_index(using)
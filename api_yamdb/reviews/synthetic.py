@@ -0,0 +1,137 @@
+"""
+Синтетические данные для нагрузочного тестирования.
+
+Строки создаются генераторами в формате import_yamdb и загружаются
+теми же загрузчиками (reviews.dataset.IMPORTERS) пакетами bulk_create.
+Количество отзывов на произведение распределено по закону Ципфа:
+немногие популярные произведения собирают большую часть отзывов.
+"""
+import random
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Comment, Review, Title
+
+WORDS = ('книга', 'фильм', 'песня', 'сюжет', 'герой', 'финал', 'автор',
+         'жанр', 'история', 'мир', 'война', 'любовь', 'время', 'город',
+         'дорога', 'музыка', 'роль', 'сцена', 'образ', 'идея')
+
+
+def next_id(model):
+    return (model.objects.aggregate(value=Max('id'))['value'] or 0) + 1
+
+
+def zipf_counts(total, size, exponent, limit):
+    """
+    Делит total на size частей по закону Ципфа с показателем exponent;
+    ни одна часть не больше limit (число авторов для уникальности отзыва).
+    """
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    scale = total / sum(weights)
+    counts = [min(int(weight * scale), limit) for weight in weights]
+    rest = total - sum(counts)
+    for index in range(size):
+        if rest <= 0:
+            break
+        extra = min(limit - counts[index], rest)
+        counts[index] += extra
+        rest -= extra
+    return counts
+
+
+class SyntheticDataset:
+    """Генераторы строк всех моделей для одного набора параметров."""
+
+    def __init__(self, titles, reviews, users, comments=0, categories=10,
+                 genres=30, exponent=1.1, seed=0, prefix='bench'):
+        self.random = random.Random(seed)
+        self.sizes = {'titles': titles, 'reviews': reviews, 'users': users,
+                      'comments': comments, 'categories': categories,
+                      'genres': genres}
+        self.exponent = exponent
+        self.prefix = prefix
+        self.first_title = next_id(Title)
+        self.first_review = next_id(Review)
+        self.first_comment = next_id(Comment)
+        self.now = timezone.now()
+        self.review_count = 0
+
+    def text(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def username(self, number):
+        return f'{self.prefix}{number}'
+
+    def pub_date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(3 * 365 * 24 * 3600)
+        )
+
+    def categories(self):
+        for number in range(self.sizes['categories']):
+            yield {'name': f'Категория {number}',
+                   'slug': f'{self.prefix}-category-{number}'}
+
+    def genres(self):
+        for number in range(self.sizes['genres']):
+            yield {'name': f'Жанр {number}',
+                   'slug': f'{self.prefix}-genre-{number}'}
+
+    def users(self):
+        for number in range(self.sizes['users']):
+            yield {'username': self.username(number),
+                   'email': f'{self.username(number)}@yamdb.fake',
+                   'role': 'user'}
+
+    def titles(self):
+        for number in range(self.sizes['titles']):
+            genres = self.random.sample(range(self.sizes['genres']),
+                                        k=min(2, self.sizes['genres']))
+            category = self.random.randrange(self.sizes['categories'])
+            yield {
+                'id': self.first_title + number,
+                'name': f'{self.text(2)} {number}',
+                'year': self.random.randint(1900, self.now.year),
+                'description': self.text(12),
+                'category': f'{self.prefix}-category-{category}',
+                'genre': [f'{self.prefix}-genre-{genre}' for genre in genres],
+            }
+
+    def reviews(self):
+        users = self.sizes['users']
+        counts = zipf_counts(self.sizes['reviews'], self.sizes['titles'],
+                             self.exponent, users)
+        # Самое популярное произведение — не обязательно первое по id.
+        order = list(range(self.sizes['titles']))
+        self.random.shuffle(order)
+        review_id = self.first_review
+        for title, count in zip(order, counts):
+            start = self.random.randrange(users)
+            for offset in range(count):
+                yield {
+                    'id': review_id,
+                    'title': self.first_title + title,
+                    'author': self.username((start + offset) % users),
+                    'text': self.text(20),
+                    'score': self.random.randint(1, 10),
+                    'pub_date': self.pub_date(),
+                }
+                review_id += 1
+        self.review_count = review_id - self.first_review
+
+    def comments(self):
+        if not self.review_count:
+            return
+        for number in range(self.sizes['comments']):
+            yield {
+                'id': self.first_comment + number,
+                'review': (self.first_review
+                           + self.random.randrange(self.review_count)),
+                'author': self.username(
+                    self.random.randrange(self.sizes['users'])
+                ),
+                'text': self.text(8),
+                'pub_date': self.pub_date(),
+            }
@@ -0,0 +1,270 @@
+"""
+Нагрузочный тест основных маршрутов API на синтетических данных.
+
+Данные создает команда generate_dataset (отзывы распределены по закону
+Ципфа), БД берется из окружения (DB_ENGINE, DB_NAME, ...), как у
+приложения. Запросы выполняются в процессе через тестовый клиент Django
+(--mode inprocess) или по HTTP к gunicorn, запущенному с конфигурацией
+приложения (--mode gunicorn). Для каждого маршрута выводятся запросы
+в секунду, p50/p95/p99 задержки и число запросов к БД на запрос (из
+заголовка Server-Timing), результаты сохраняются в JSON. Кэш ответов
+по умолчанию выключен, чтобы измерять саму обработку запроса.
+
+    python api_yamdb/manage.py generate_dataset --titles 100000 \\
+        --reviews 10000000 --users 20000
+    python benchmarks/api_load.py --mode gunicorn --concurrency 16 \\
+        --output after.json --compare before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from server_modes import start_server
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ['METRICS_ENABLED'] = '1'
+os.environ['METRICS_SERVER_TIMING'] = '1'
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def get_endpoints():
+    """
+    Маршруты для нагрузки. Отзывы и комментарии берутся у самого
+    популярного произведения, страницы по курсору — по ссылке next
+    первой страницы.
+    """
+    from reviews.models import Category, Review, Title
+
+    title = Title.objects.order_by('-review_count', 'id').first()
+    if title is None:
+        raise SystemExit('Нет данных: запустите manage.py generate_dataset')
+    review = (Review.objects.filter(title=title)
+              .order_by('-id').only('id').first())
+    category = Category.objects.order_by('id').first()
+    titles = '/api/v1/titles/'
+    reviews = f'{titles}{title.id}/reviews/'
+    endpoints = {
+        'titles-list': titles,
+        'titles-cursor': f'{titles}?pagination=cursor',
+        'titles-filter': f'{titles}?category={category.slug}',
+        'titles-search': f'{titles}?q=герой',
+        'titles-detail': f'{titles}{title.id}/',
+        'titles-top': f'{titles}top/',
+        'titles-trending': f'{titles}trending/',
+        'categories-list': '/api/v1/categories/',
+        'genres-list': '/api/v1/genres/',
+    }
+    if review is not None:
+        endpoints.update({
+            'reviews-list': reviews,
+            'reviews-cursor': f'{reviews}?pagination=cursor',
+            'reviews-expand': f'{reviews}?expand=comments',
+            'reviews-search': f'{reviews}?q=герой',
+            'reviews-detail': f'{reviews}{review.id}/',
+            'comments-list': f'{reviews}{review.id}/comments/',
+        })
+    return endpoints
+
+
+def next_page(get, path):
+    """Адрес второй страницы (с курсором) или первой, если ее нет."""
+    status, body, _ = get(path)
+    link = json.loads(body).get('next') if status == 200 else None
+    if not link:
+        return path
+    parts = urlsplit(link)
+    if 'cursor=' not in parts.query:
+        # Иначе строки -cursor измеряли бы страницы с OFFSET.
+        raise SystemExit(f'{path}: ссылка next без курсора: {link}')
+    return f'{parts.path}?{parts.query}'
+
+
+def inprocess_get():
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+
+    def get(path):
+        response = client.get(path)
+        return (response.status_code, response.content,
+                response.get('Server-Timing', ''))
+
+    return get
+
+
+def http_get(port):
+    local = threading.local()
+
+    def get(path):
+        if not hasattr(local, 'connection'):
+            local.connection = http.client.HTTPConnection('127.0.0.1', port)
+        try:
+            local.connection.request('GET', path)
+            response = local.connection.getresponse()
+            body = response.read()
+        except OSError:
+            del local.connection
+            return 599, b'', ''
+        return (response.status, body,
+                response.getheader('Server-Timing', ''))
+
+    return get
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def load(get, path, concurrency, duration):
+    latencies = []
+    queries = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            status, _, timing = get(path)
+            elapsed = time.perf_counter() - started
+            match = QUERIES_RE.search(timing)
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += status >= 400
+                if match:
+                    queries.append(int(match.group(1)))
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        'path': path,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.5) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'queries': sum(queries) / len(queries) if queries else None,
+        'errors': errors[0],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_sizes():
+    from reviews.models import Comment, Review, Title, User
+
+    return {model.__name__.lower(): model.objects.count()
+            for model in (Title, Review, Comment, User)}
+
+
+def print_results(results, baseline):
+    for name, result in results.items():
+        line = (f'{name:16} {result["rps"]:8.1f} запросов/с  '
+                f'p50 {result["p50"]:7.1f}  p95 {result["p95"]:7.1f}  '
+                f'p99 {result["p99"]:7.1f} мс  '
+                f'БД {result["queries"] or 0:4.1f}  '
+                f'ошибок {result["errors"]}')
+        old = baseline.get(name)
+        if old:
+            line += (f'  ({(result["rps"] / old["rps"] - 1) * 100:+.0f}% '
+                     f'rps, {(result["p95"] / old["p95"] - 1) * 100:+.0f}% '
+                     f'p95)')
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn'),
+                        default='inprocess')
+    parser.add_argument('--server-mode', choices=('wsgi', 'asgi'),
+                        default='wsgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Секунд нагрузки на каждый маршрут.')
+    parser.add_argument('--warmup', type=float, default=1)
+    parser.add_argument('--endpoint', action='append',
+                        help='Только перечисленные маршруты.')
+    parser.add_argument('--response-cache', action='store_true',
+                        help='Не выключать кэш ответов.')
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    parser.add_argument('--compare', help='JSON прошлого запуска.')
+    args = parser.parse_args()
+    if not args.response_cache:
+        os.environ['RESPONSE_CACHE_ENABLED'] = '0'
+
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    endpoints = get_endpoints()
+    if args.endpoint:
+        endpoints = {name: endpoints[name] for name in args.endpoint}
+    server = None
+    if args.mode == 'gunicorn':
+        server = start_server(args.server_mode, args.port, args.workers)
+        get = http_get(args.port)
+    else:
+        # Разрешает тестовому клиенту хост testserver.
+        setup_test_environment()
+        get = inprocess_get()
+    results = {}
+    try:
+        for name, path in endpoints.items():
+            if name.endswith('-cursor'):
+                path = next_page(get, path)
+            load(get, path, args.concurrency, args.warmup)
+            results[name] = load(get, path, args.concurrency, args.duration)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    baseline = {}
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())['results']
+    print_results(results, baseline)
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'vendor': connection.vendor,
+            'dataset': dataset_sizes(),
+            'options': vars(args),
+            'results': results,
+        }
+        Path(args.output).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Время рендеринга JSON: JSONRenderer DRF и api.renderers.FastJSONRenderer
+на выводе TitleListSerializer и разбора тела запроса JSONParser
+и api.parsers.FastJSONParser.
+
+Запуск из корня репозитория (SQLite в памяти, данные из generate_dataset):
+
+    python benchmarks/renderers.py --rows 1000 --repeat 50
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+os.environ.setdefault('DB_NAME', ':memory:')
+
+
+def measure(function, repeat):
+    """Лучшее время из repeat запусков, мс."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from api.parsers import FastJSONParser
+    from api.renderers import FastJSONRenderer, orjson
+    from api.serializers import ReviewSerializer, TitleListSerializer
+    from django.core.management import call_command
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from reviews.models import Review, Title
+
+    if orjson is None:
+        print('orjson не установлен: FastJSONRenderer работает как '
+              'JSONRenderer')
+    call_command('migrate', verbosity=0)
+    call_command('generate_dataset', titles=args.rows, reviews=args.rows,
+                 users=args.rows, stdout=io.StringIO())
+    titles = TitleListSerializer(
+        Title.objects.select_related('category').prefetch_related('genre')
+        .order_by('id')[:args.rows],
+        many=True
+    ).data
+    reviews = ReviewSerializer(
+        Review.objects.select_related('author').order_by('id')[:args.rows],
+        many=True
+    ).data
+    for name, data in (('titles', titles), ('reviews', reviews)):
+        before = measure(lambda: JSONRenderer().render(data), args.repeat)
+        after = measure(lambda: FastJSONRenderer().render(data), args.repeat)
+        print(f'рендеринг {name}: {before:.2f} мс -> {after:.2f} мс '
+              f'на {args.rows} строк (в {before / after:.1f} раза быстрее)')
+
+    body = JSONRenderer().render(titles)
+    before = measure(lambda: JSONParser().parse(io.BytesIO(body)),
+                     args.repeat)
+    after = measure(lambda: FastJSONParser().parse(io.BytesIO(body)),
+                    args.repeat)
+    print(f'разбор {len(body) // 1024} КБ: {before:.2f} мс -> '
+          f'{after:.2f} мс (в {before / after:.1f} раза быстрее)')
+
+
+if __name__ == '__main__':
+    main()
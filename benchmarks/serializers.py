@@ -0,0 +1,72 @@
+"""
+Время выборки и сериализации 1000 строк обычными сериализаторами
+и их быстрыми вариантами через values() (api.serializers.ValuesSerializer).
+
+Запуск из корня репозитория (SQLite в памяти, данные из generate_dataset):
+
+    python benchmarks/serializers.py --rows 1000 --repeat 20
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+os.environ.setdefault('DB_NAME', ':memory:')
+
+
+def measure(serialize, repeat):
+    """Лучшее время из repeat запусков, мс."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serialize()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from api.serializers import (CommentSerializer, CommentValuesSerializer,
+                                 ReviewSerializer, ReviewValuesSerializer,
+                                 TitleListSerializer, TitleValuesSerializer)
+    from django.core.management import call_command
+    from reviews.models import Comment, Review, Title
+
+    call_command('migrate', verbosity=0)
+    call_command('generate_dataset', titles=args.rows, reviews=args.rows,
+                 users=args.rows, comments=args.rows, stdout=io.StringIO())
+    cases = {
+        'titles': (Title.objects.select_related('category')
+                   .prefetch_related('genre'),
+                   TitleListSerializer, TitleValuesSerializer),
+        'reviews': (Review.objects.select_related('author'),
+                    ReviewSerializer, ReviewValuesSerializer),
+        'comments': (Comment.objects.select_related('author'),
+                     CommentSerializer, CommentValuesSerializer),
+    }
+    for name, (queryset, regular, fast) in cases.items():
+        queryset = queryset.order_by('id')[:args.rows]
+        before = measure(lambda: regular(queryset.all(), many=True).data,
+                         args.repeat)
+        after = measure(
+            lambda: fast(fast.get_values_queryset(queryset.all()),
+                         many=True).data,
+            args.repeat
+        )
+        print(f'{name}: {before:.1f} мс -> {after:.1f} мс '
+              f'на {args.rows} строк (в {before / after:.1f} раза быстрее)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Сравнение режимов SERVER_MODE=wsgi и SERVER_MODE=asgi под нагрузкой.
+
+Для каждого режима запускается gunicorn с одинаковым числом воркеров,
+на адреса из --path отправляются GET-запросы из --concurrency потоков
+в течение --duration секунд. Выводятся запросы в секунду, p50 и p99
+задержки и суммарная память (RSS) процессов gunicorn.
+БД берется из окружения (DB_ENGINE, DB_NAME, ...), как у приложения.
+
+    python benchmarks/server_modes.py --workers 2 --concurrency 64 \\
+        --path /api/v1/titles/ --path /api/v1/titles/1/reviews/
+"""
+import argparse
+import http.client
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb'
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, SERVER_MODE=mode,
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_WORKERS=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=PROJECT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', '/api/v1/')
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f'gunicorn ({mode}) не запустился')
+
+
+def server_rss(server):
+    """Суммарная RSS процесса gunicorn и его воркеров, МБ (Linux)."""
+    pids = [str(server.pid)]
+    children = Path(f'/proc/{server.pid}/task/{server.pid}/children')
+    if children.exists():
+        pids += children.read_text().split()
+    total = 0
+    for pid in pids:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                total += int(line.split()[1])
+    return total / 1024
+
+
+def load(port, paths, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        for path in itertools.islice(itertools.cycle(paths), offset, None):
+            if time.monotonic() > deadline:
+                return
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 500
+            except OSError:
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(index,))
+               for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        'rps': len(latencies) / duration,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000,
+        'errors': errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--path', action='append')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    paths = args.path or ['/api/v1/titles/']
+
+    for mode in ('wsgi', 'asgi'):
+        server = start_server(mode, args.port, args.workers)
+        try:
+            load(args.port, paths, args.concurrency, 2)
+            result = load(args.port, paths, args.concurrency, args.duration)
+            rss = server_rss(server)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f'{mode}: {result["rps"]:.0f} запросов/с, '
+              f'p50 {result["p50"]:.1f} мс, p99 {result["p99"]:.1f} мс, '
+              f'ошибок {result["errors"]}, память {rss:.0f} МБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Запросы к БД и время на регистрацию и получение токена.
+
+Запуск из корня репозитория (SQLite в памяти, письма не отправляются):
+
+    python benchmarks/signup_queries.py --users 200
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+os.environ.setdefault('DB_NAME', ':memory:')
+
+
+def measure(client, url, data):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, data)
+    assert response.status_code == 200, response.content
+    # Управление транзакциями не считается.
+    return sum(
+        not query['sql'].startswith(('BEGIN', 'SAVEPOINT', 'RELEASE'))
+        for query in context.captured_queries
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+    from rest_framework.test import APIClient
+    from reviews.models import User
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    client = APIClient()
+    results = {'signup': [], 'repeated signup': [], 'token': []}
+    started = time.perf_counter()
+    for index in range(args.users):
+        data = {'username': f'user{index}', 'email': f'user{index}@b.fake'}
+        results['signup'].append(
+            measure(client, '/api/v1/auth/signup/', data)
+        )
+        results['repeated signup'].append(
+            measure(client, '/api/v1/auth/signup/', data)
+        )
+        code = User.objects.get(username=data['username']).confirmation_code
+        results['token'].append(measure(
+            client, '/api/v1/auth/token/',
+            {'username': data['username'], 'confirmation_code': code}
+        ))
+    elapsed = time.perf_counter() - started
+    for name, counts in results.items():
+        print(f'{name}: {sum(counts) / len(counts):.1f} запросов')
+    print(f'{args.users} пользователей за {elapsed:.2f} с')
+
+
+if __name__ == '__main__':
+    main()
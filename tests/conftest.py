@@ -1,9 +1,44 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    """Тесты с БД выполняются на SQLite вместо PostgreSQL из настроек."""
+    from django.conf import settings
+    from django.db import connections
+
+    # Словарь из модуля настроек не изменяется: его проверяет test_settings.
+    settings.DATABASES = {
+        'default': {
+            **settings.DATABASES['default'],
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        },
+    }
+    connections.settings = settings.DATABASES
+    del connections['default']
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create(username='reviewer',
+                                            email='reviewer@yamdb.fake')
+
+
+@pytest.fixture
+def user_client(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
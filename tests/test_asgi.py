@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.urls import URLPattern
+from rest_framework.test import APIRequestFactory
+from reviews.models import Title
+
+from api import views
+from api.asyncviews import async_read_urls, async_read_view
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncReadViews:
+
+    def test_async_list_matches_sync(self):
+        Title.objects.create(name='Тест', year=2000)
+        view = views.TitleViewSet.as_view({'get': 'list'})
+        request = APIRequestFactory().get('/api/v1/titles/')
+        sync_response = view(request)
+        sync_response.render()
+        async_response = async_to_sync(async_read_view(view))(
+            APIRequestFactory().get('/api/v1/titles/')
+        )
+        assert async_response.status_code == 200
+        assert async_response.content == sync_response.content, (
+            'Проверьте, что асинхронное чтение возвращает тот же ответ'
+        )
+
+    def test_only_listed_viewsets_are_wrapped(self):
+        from api.urls import router
+        urls = async_read_urls(router.urls, (views.TitleViewSet,))
+        wrapped = {url.callback.cls for url in urls
+                   if isinstance(url, URLPattern)
+                   and asyncio.iscoroutinefunction(url.callback)}
+        assert wrapped == {views.TitleViewSet}
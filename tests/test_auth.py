@@ -0,0 +1,48 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import User
+
+from .test_query_counts import assert_num_queries
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+
+
+@pytest.mark.django_db
+class TestAuthFlow:
+
+    def test_signup_queries(self):
+        client = APIClient()
+        data = {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+        # Блокировка, создание, код, письмо (обновление и вставка).
+        with assert_num_queries(5):
+            assert client.post(SIGNUP_URL, data).status_code == 200
+        # Блокировка, код, обновление письма.
+        with assert_num_queries(3):
+            assert client.post(SIGNUP_URL, data).status_code == 200
+        assert User.objects.count() == 1
+
+    def test_signup_conflicts(self, user):
+        client = APIClient()
+        response = client.post(SIGNUP_URL, {'username': user.username,
+                                            'email': 'other@yamdb.fake'})
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+        response = client.post(SIGNUP_URL, {'username': 'other',
+                                            'email': user.email})
+        assert response.status_code == 400
+
+    def test_token(self, user):
+        client = APIClient()
+        client.post(SIGNUP_URL, {'username': user.username,
+                                 'email': user.email})
+        code = User.objects.get(pk=user.pk).confirmation_code
+        data = {'username': user.username, 'confirmation_code': code}
+        # Пользователь и условное обновление кода.
+        with assert_num_queries(2):
+            response = client.post(TOKEN_URL, data)
+        assert response.status_code == 200
+        assert 'token' in response.json()
+        response = client.post(TOKEN_URL, {'username': user.username,
+                                           'confirmation_code': 'wrong'})
+        assert response.status_code == 400
@@ -0,0 +1,151 @@
+import re
+from collections import Counter
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.facets import FACETS, grouped_counts
+from reviews.models import Category, Genre, Title, TitleFacet
+
+URL = '/api/v1/titles/bulk/'
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    admin = django_user_model.objects.create(
+        username='admin', email='admin@yamdb.fake', role='admin'
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def catalog():
+    for slug in ('movie', 'book'):
+        Category.objects.create(name=slug, slug=slug)
+    for slug in ('drama', 'comedy', 'action'):
+        Genre.objects.create(name=slug, slug=slug)
+
+
+def item(name, year=2000, category='movie', genre=('drama',)):
+    return {'name': name, 'year': year, 'category': category,
+            'genre': list(genre)}
+
+
+def genres(title):
+    return set(title.genre.values_list('slug', flat=True))
+
+
+def assert_counts_match():
+    assert (TitleFacet.objects.counts(FACETS)
+            == grouped_counts(Title.objects.all(), FACETS)), (
+        'Проверьте, что пакетная запись обновляет счетчики TitleFacet'
+    )
+
+
+@pytest.mark.django_db
+class TestTitleBulk:
+
+    def test_permissions(self, user_client, catalog):
+        assert APIClient().post(URL, [item('a')],
+                                format='json').status_code == 401
+        assert user_client.post(URL, [item('a')],
+                                format='json').status_code == 403
+        assert not Title.objects.exists()
+
+    def test_create_with_errors(self, admin_client, catalog):
+        response = admin_client.post(URL, [
+            item('Первое', genre=('drama', 'comedy')),
+            item('Неизвестный жанр', genre=('drama', 'horror')),
+            {'name': 'Без года', 'category': 'book', 'genre': []},
+            item('Второе', year=1999, category='book', genre=()),
+            'не объект',
+        ], format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [('errors' in result) for result in results] == [
+            False, True, True, False, True
+        ], 'Проверьте, что ошибки возвращаются по элементам пакета'
+        assert 'genre' in results[1]['errors']
+        assert 'year' in results[2]['errors']
+        first = Title.objects.get(pk=results[0]['id'])
+        assert results[0]['created']
+        assert first.category.slug == 'movie'
+        assert genres(first) == {'drama', 'comedy'}
+        assert Title.objects.count() == 2
+        assert_counts_match()
+
+    def test_one_lookup_per_model(self, admin_client, catalog):
+        items = [item(f'Произведение {index}', genre=('drama', 'action'))
+                 for index in range(20)]
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(URL, items, format='json')
+        assert response.status_code == 200
+        selects = Counter(
+            re.search(r'FROM "(\w+)"', query['sql']).group(1)
+            for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        )
+        assert selects['reviews_category'] == 1, (
+            'Проверьте, что категории пакета находятся одним запросом'
+        )
+        assert selects['reviews_genre'] == 1
+        links = [query for query in context.captured_queries
+                 if query['sql'].startswith('INSERT INTO "reviews_title_genre"')]
+        assert len(links) == 1, (
+            'Проверьте, что связи с жанрами создаются одним запросом'
+        )
+        assert Title.genre.through.objects.count() == 40
+        assert_counts_match()
+
+    def test_upsert_by_natural_key(self, admin_client, catalog):
+        title = Title.objects.create(name='Старое', year=2000,
+                                     category=Category.objects.get(
+                                         slug='movie'))
+        title.genre.set(Genre.objects.filter(slug__in=['drama', 'comedy']))
+        response = admin_client.post(URL + '?upsert=name,year', [
+            {'name': 'Старое', 'year': 2000, 'category': 'book',
+             'genre': ['action']},
+            item('Новое'),
+            item('Новое'),
+        ], format='json')
+        assert response.status_code == 207
+        updated, created, duplicate = response.json()
+        assert updated == {'id': title.pk, 'created': False}, (
+            'Проверьте, что элемент с существующим ключом изменяет '
+            'произведение'
+        )
+        assert created['created']
+        assert 'errors' in duplicate
+        title.refresh_from_db()
+        assert title.category.slug == 'book'
+        assert genres(title) == {'action'}
+        assert_counts_match()
+
+    def test_partial_upsert_by_id(self, admin_client, catalog):
+        title = Title.objects.create(name='Старое', year=2000,
+                                     description='Описание')
+        title.genre.set(Genre.objects.filter(slug='drama'))
+        response = admin_client.post(URL + '?upsert=id', [
+            {'id': title.pk, 'year': 2001},
+            {'id': title.pk + 100, 'name': 'Нет такого'},
+        ], format='json')
+        assert response.status_code == 207
+        assert 'id' in response.json()[1]['errors']
+        title.refresh_from_db()
+        assert (title.name, title.year, title.description) == (
+            'Старое', 2001, 'Описание'
+        ), 'Проверьте, что изменяются только переданные поля'
+        assert genres(title) == {'drama'}
+        assert_counts_match()
+
+    def test_request_errors(self, admin_client, catalog):
+        assert admin_client.post(URL, {'name': 'a'},
+                                 format='json').status_code == 400
+        assert admin_client.post(URL + '?upsert=slug', [item('a')],
+                                 format='json').status_code == 400
+        response = admin_client.post(URL, [{'id': 1, **item('a')}],
+                                     format='json')
+        assert 'id' in response.json()[0]['errors']
@@ -0,0 +1,93 @@
+import gzip
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+from reviews.models import Title
+
+from api_yamdb import compression
+from api_yamdb.compression import CompressionMiddleware, choose_encoding
+
+
+@pytest.fixture
+def titles():
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {index}', year=2000,
+              description='Описание произведения ' * 20)
+        for index in range(5)
+    )
+
+
+@pytest.mark.django_db
+class TestCompressionMiddleware:
+
+    def test_large_response_gzipped(self, titles):
+        client = APIClient()
+        plain = client.get('/api/v1/titles/')
+        response = client.get('/api/v1/titles/', HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert response['ETag'] == 'W/' + plain['ETag']
+        assert gzip.decompress(response.content) == plain.content
+        assert 'Content-Encoding' not in plain
+
+    def test_small_response_not_compressed(self):
+        response = APIClient().get('/api/v1/genres/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        assert 'Content-Encoding' not in response, (
+            'Проверьте, что ответы короче COMPRESSION_MIN_SIZE не сжимаются'
+        )
+
+
+def test_streaming_response_gzipped():
+    chunks = [b'{"name": "row"}\n' * 100] * 3
+    middleware = CompressionMiddleware(
+        lambda request: StreamingHttpResponse(iter(chunks))
+    )
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+    with mock.patch.object(compression, 'brotli', None):
+        response = middleware(request)
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(b''.join(response.streaming_content)) == (
+        b''.join(chunks)
+    )
+
+
+def test_brotli_preferred():
+    brotli = pytest.importorskip('brotli')
+    content = b'x' * 4096
+    middleware = CompressionMiddleware(lambda request: HttpResponse(content))
+    response = middleware(
+        RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+    )
+    assert response['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.content) == content
+
+
+@pytest.mark.parametrize('header, brotli, expected', [
+    ('gzip, deflate, br', True, 'br'),
+    ('gzip, deflate, br', False, 'gzip'),
+    ('gzip;q=1.0, br;q=0.5', True, 'gzip'),
+    ('br;q=0, *', True, 'gzip'),
+    ('deflate', True, None),
+    ('', True, None),
+])
+def test_choose_encoding(header, brotli, expected):
+    with mock.patch.object(compression, 'brotli',
+                           mock.Mock() if brotli else None):
+        assert choose_encoding(header) == expected
+
+
+def test_collectstatic_writes_gzip(settings, tmp_path):
+    settings.STATIC_ROOT = tmp_path
+    call_command('collectstatic', interactive=False, verbosity=0)
+    original = tmp_path / 'admin' / 'css' / 'base.css'
+    compressed = tmp_path / 'admin' / 'css' / 'base.css.gz'
+    assert compressed.exists(), (
+        'Проверьте, что collectstatic записывает сжатые копии файлов'
+    )
+    assert gzip.decompress(compressed.read_bytes()) == original.read_bytes()
+    assert not (tmp_path / 'admin' / 'img' / 'search.svg.gz').exists()
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.fixture
+def review(user):
+    title = Title.objects.create(name='Тест', year=2000)
+    return Review.objects.create(title=title, author=user, text='Отзыв',
+                                 score=5)
+
+
+def etag(url):
+    response = APIClient().get(url)
+    assert response.status_code == 200
+    return response['ETag']
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_if_none_match(self, review):
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{review.title_id}/',
+                    f'/api/v1/titles/{review.title_id}/reviews/'):
+            response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag(url))
+            assert response.status_code == 304, (
+                'Проверьте, что на совпадающий If-None-Match ответ — 304'
+            )
+            assert not response.content
+
+    def test_if_modified_since(self, review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        last_modified = APIClient().get(url)['Last-Modified']
+        assert APIClient().get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        ).status_code == 304
+        earlier = http_date((review.title.modified
+                             - timedelta(minutes=1)).timestamp())
+        assert APIClient().get(
+            url, HTTP_IF_MODIFIED_SINCE=earlier
+        ).status_code == 200
+
+    def test_titles_etag_changes_on_write(self, review):
+        url = '/api/v1/titles/'
+        before = etag(url)
+        Title.objects.create(name='Другое', year=2001)
+        assert etag(url) != before, (
+            'Проверьте, что ETag списка произведений меняется при записи'
+        )
+
+    def test_reviews_etag_changes(self, review, user):
+        reviews = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments = f'{reviews}{review.pk}/comments/'
+        before = etag(reviews), etag(comments)
+
+        review.text = 'Измененный отзыв'
+        review.save()
+        after_review = etag(reviews), etag(comments)
+        assert after_review[0] != before[0], (
+            'Проверьте, что ETag отзывов меняется после изменения отзыва'
+        )
+
+        Comment.objects.create(review=review, author=user, text='Ответ')
+        after_comment = etag(reviews), etag(comments)
+        assert after_comment[0] != after_review[0]
+        assert after_comment[1] != after_review[1], (
+            'Проверьте, что ETag комментариев меняется после комментария'
+        )
+
+        user.username = 'renamed'
+        user.save()
+        after_rename = etag(reviews), etag(comments)
+        assert after_rename[0] != after_comment[0], (
+            'Проверьте, что ETag отзывов меняется после переименования '
+            'автора'
+        )
+        assert after_rename[1] != after_comment[1]
+
+    def test_unrelated_user_save(self, review, django_user_model):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        before = etag(url)
+        other = django_user_model.objects.create(username='other',
+                                                 email='other@yamdb.fake')
+        other.username = 'another'
+        other.save()
+        review.author.bio = 'Биография'
+        review.author.save()
+        assert etag(url) == before, (
+            'Проверьте, что ETag не меняется без изменения имени автора'
+        )
+
+    def test_etag_changes_after_rebuild(self, review, django_user_model):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        before = etag(url)
+        author = django_user_model.objects.create(username='other',
+                                                  email='other@yamdb.fake')
+        # Как при загрузке: bulk_create без сигналов, затем пересчет.
+        Review.objects.bulk_create([Review(title=review.title, author=author,
+                                           text='Новый', score=9)])
+        call_command('rebuild_ratings', stdout=StringIO())
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=before)
+        assert response.status_code == 200, (
+            'Проверьте, что пересчет рейтинга меняет ETag отзывов'
+        )
+        assert response.json()['count'] == 2
+
+    @pytest.mark.parametrize('model', [Category, Genre])
+    def test_title_modified_on_catalog_rename(self, review, model):
+        title = review.title
+        item = model.objects.create(name='Фильм', slug='movie')
+        if model is Category:
+            title.category = item
+            title.save()
+        else:
+            title.genre.add(item)
+        # Дата изменения в прошлом: заголовок точен до секунды.
+        Title.objects.filter(pk=title.pk).update(
+            modified=title.modified - timedelta(minutes=1)
+        )
+        url = f'/api/v1/titles/{title.pk}/'
+        last_modified = APIClient().get(url)['Last-Modified']
+        item.name = 'Кино'
+        item.save()
+        response = APIClient().get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200, (
+            'Проверьте, что переименование категории или жанра меняет '
+            'Last-Modified произведения'
+        )
+        assert 'Кино' in response.content.decode()
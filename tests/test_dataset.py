@@ -0,0 +1,258 @@
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models.sql.compiler import SQLInsertCompiler
+from rest_framework.test import APIClient
+from reviews.dataset import Importer
+from reviews.facets import FACETS
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleFacet, User)
+
+FILES = {
+    'categories.csv': 'name,slug\nФильм,movie\nКнига,book\n',
+    'genres.csv': 'name,slug\nДрама,drama\nКомедия,comedy\n',
+    'users.csv': 'username,email,role,bio,first_name,last_name\n'
+                 'reader,reader@yamdb.fake,user,,,\n'
+                 'writer,writer@yamdb.fake,moderator,,,\n',
+    'titles.csv': 'id,name,year,description,category,genre,rating\n'
+                  '10,Первое,2000,,movie,"drama,comedy",\n'
+                  '11,Второе,1999,,book,,\n',
+    'reviews.csv': 'id,title,author,text,score,pub_date,is_hidden\n'
+                   '20,10,reader,Отзыв,8,2020-01-01T00:00:00+00:00,False\n'
+                   '21,10,writer,Отзыв,6,,\n',
+    'comments.csv': 'id,review,author,text,pub_date\n'
+                    '30,20,writer,Комментарий,\n',
+}
+
+
+def write_files(directory, files):
+    for name, content in files.items():
+        (directory / name).write_text(content, encoding='utf-8')
+    return directory
+
+
+def import_files(*paths, **options):
+    out, err = StringIO(), StringIO()
+    call_command('import_yamdb', *map(str, paths), stdout=out, stderr=err,
+                 **options)
+    return out.getvalue(), err.getvalue()
+
+
+@pytest.mark.django_db
+class TestImport:
+
+    def test_valid_files(self, tmp_path):
+        import_files(write_files(tmp_path, FILES))
+        assert (Category.objects.count(), Genre.objects.count(),
+                User.objects.count(), Title.objects.count(),
+                Review.objects.count(), Comment.objects.count()) == (
+            2, 2, 2, 2, 2, 1
+        )
+        title = Title.objects.get(pk=10)
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+        assert (title.review_count, title.rating) == (2, 7.0), (
+            'Проверьте, что после загрузки пересчитывается рейтинг'
+        )
+        assert Review.objects.get(pk=20).pub_date.year == 2020
+        assert TitleFacet.objects.counts(FACETS)['genre'] == {
+            'drama': 1, 'comedy': 1
+        }
+        # Последовательность id продолжается после загруженных.
+        assert Title.objects.create(name='Новое', year=2001).pk > 11
+
+    def test_malformed_rows(self, tmp_path):
+        files = dict(FILES)
+        files['titles.csv'] += ('12,Без года,abc,,movie,,\n'
+                                'x,Плохой id,2000,,movie,,\n'
+                                '13,Третье,2001,,movie,,\n')
+        files['reviews.csv'] += ('22,11,reader,Отзыв,отлично,,\n'
+                                 '25,11,reader,Отзыв,5,,может быть\n'
+                                 '23,11,writer,Отзыв,5,вчера,\n'
+                                 '24,abc,writer,Отзыв,5,,\n')
+        del files['comments.csv']
+        write_files(tmp_path, files)
+        (tmp_path / 'comments.jsonl').write_text(
+            '{"id": 31, "review": 20, "author": "reader", "text": "a"}\n'
+            '{"id": 32, "review": \n'
+            '[1, 2]\n',
+            encoding='utf-8'
+        )
+        out, err = import_files(tmp_path)
+        assert 'titles: загружено 3 строк' in out
+        assert 'reviews: загружено 2 строк' in out
+        assert 'comments: загружено 1 строк' in out, (
+            'Проверьте, что некорректные строки пропускаются, '
+            'а загрузка продолжается'
+        )
+        assert 'year: не целое число <abc>' in err
+        assert 'score: не целое число <отлично>' in err
+        assert 'pub_date: некорректная дата <вчера>' in err
+        assert 'is_hidden: ожидалось True или False <может быть>' in err
+        assert 'comments.jsonl, строка 2: строка не разобрана' in err
+        assert set(Title.objects.values_list('pk', flat=True)) == {
+            10, 11, 13
+        }
+        assert Title.objects.get(pk=10).review_count == 2
+
+    def test_duplicates(self, tmp_path):
+        User.objects.create(username='reader', email='old@yamdb.fake')
+        files = {
+            'users.csv': FILES['users.csv']
+            + 'writer,other@yamdb.fake,user,,,\n'
+              'third,writer@yamdb.fake,user,,,\n'
+              'fourth,fourth@yamdb.fake,user,,,\n',
+        }
+        out, err = import_files(write_files(tmp_path, files))
+        assert 'users: загружено 2 строк' in out
+        assert 'пропущено 3' in out, (
+            'Проверьте, что повторные username и email пропускаются '
+            'построчно'
+        )
+        assert 'строка 1: нарушено ограничение БД' in err
+        assert set(User.objects.values_list('username', flat=True)) == {
+            'reader', 'writer', 'fourth'
+        }
+
+    def test_model_field_unchanged(self, tmp_path):
+        # Поле модели общее для потоков: загрузка не должна его менять.
+        fields = [model._meta.get_field('pub_date')
+                  for model in (Review, Comment)]
+        states = []
+        execute_sql = SQLInsertCompiler.execute_sql
+
+        def record(compiler, *args, **kwargs):
+            states.extend(field.auto_now_add for field in fields)
+            return execute_sql(compiler, *args, **kwargs)
+
+        with mock.patch.object(SQLInsertCompiler, 'execute_sql', record):
+            import_files(write_files(tmp_path, FILES))
+        assert states and all(states), (
+            'Проверьте, что загрузка не отключает auto_now_add у pub_date'
+        )
+        assert Review.objects.get(pk=20).pub_date.year == 2020
+        assert Review.objects.get(pk=21).pub_date is not None
+        assert Comment.objects.get(pk=30).pub_date is not None
+
+    def test_importer_is_abstract(self):
+        with pytest.raises(TypeError):
+            Importer()
+
+    def test_rebuild_after_failure(self, tmp_path):
+        write_files(tmp_path, FILES)
+        with mock.patch('reviews.dataset.CommentImporter.run',
+                        side_effect=ValueError('сбой')):
+            with pytest.raises(CommandError):
+                import_files(tmp_path)
+        assert Title.objects.get(pk=10).review_count == 2, (
+            'Проверьте, что пересчет выполняется и после ошибки загрузки'
+        )
+
+
+@pytest.fixture
+def catalog(user):
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    genres = [Genre.objects.create(name=name, slug=slug)
+              for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'))]
+    writer = User.objects.create(username='writer', email='w@yamdb.fake',
+                                 role='moderator', bio='Биография')
+    first = Title.objects.create(name='Первое', year=2000, category=movie,
+                                 description='Описание, "в кавычках"')
+    first.genre.set(genres)
+    second = Title.objects.create(name='Второе', year=1999)
+    review = Review.objects.create(title=first, author=user, text='Отзыв',
+                                   score=8)
+    Review.objects.create(title=first, author=writer, text='Строка\nдве',
+                          score=5)
+    Review.objects.create(title=second, author=writer, text='b', score=3)
+    Review.objects.create(title=second, author=user, text='Спам', score=1,
+                          is_hidden=True)
+    Comment.objects.create(review=review, author=writer, text='Ответ')
+    Comment.objects.create(review=review, author=user, text='Спам',
+                           is_hidden=True)
+
+
+def snapshot():
+    """Содержимое всех выгружаемых моделей в сравнимом виде."""
+    titles = {
+        (title.pk, title.name, title.year, title.description,
+         title.category and title.category.slug,
+         frozenset(genre.slug for genre in title.genre.all()),
+         title.review_count, title.rating)
+        for title in (Title.objects.select_related('category')
+                      .prefetch_related('genre'))
+    }
+    return {
+        'categories': set(Category.objects.values_list('name', 'slug')),
+        'genres': set(Genre.objects.values_list('name', 'slug')),
+        'users': set(User.objects.values_list(
+            'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+        )),
+        'titles': titles,
+        'reviews': set(Review.objects.values_list(
+            'pk', 'title', 'author__username', 'text', 'score', 'pub_date',
+            'is_hidden'
+        )),
+        'comments': set(Comment.objects.values_list(
+            'pk', 'review', 'author__username', 'text', 'pub_date',
+            'is_hidden'
+        )),
+    }
+
+
+def clear_dataset():
+    for model in (Comment, Review, Title, Genre, Category, User):
+        model.objects.all().delete()
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    @pytest.mark.parametrize('file_format', ['csv', 'jsonl'])
+    def test_round_trip(self, tmp_path, catalog, file_format):
+        before = snapshot()
+        call_command('export_yamdb', str(tmp_path), '--format', file_format,
+                     stdout=StringIO())
+        clear_dataset()
+        out, err = import_files(tmp_path)
+        assert not err
+        assert snapshot() == before, (
+            'Проверьте, что выгрузка загружается без потерь'
+        )
+        assert Review.objects.filter(is_hidden=True).count() == 1, (
+            'Проверьте, что скрытые модератором отзывы остаются скрытыми'
+        )
+
+    def test_endpoint_permissions(self, user_client, catalog, user):
+        url = '/api/v1/export/titles/'
+        assert APIClient().get(url).status_code == 401
+        assert user_client.get(url).status_code == 403, (
+            'Проверьте, что выгрузка доступна только администратору'
+        )
+        user.role = 'admin'
+        user.save()
+        response = user_client.get(url + '?file_format=jsonl')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert len(lines) == Title.objects.count()
+        assert user_client.get(
+            '/api/v1/export/passwords/'
+        ).status_code == 404
+
+    def test_endpoint_round_trip(self, tmp_path, user_client, catalog, user):
+        user.role = 'admin'
+        user.save()
+        before = snapshot()
+        for name in ('categories', 'genres', 'users', 'titles', 'reviews',
+                     'comments'):
+            response = user_client.get(f'/api/v1/export/{name}/')
+            (tmp_path / f'{name}.csv').write_bytes(
+                b''.join(response.streaming_content)
+            )
+        clear_dataset()
+        import_files(tmp_path)
+        assert snapshot() == before
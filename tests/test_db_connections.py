@@ -0,0 +1,70 @@
+import importlib
+from unittest import mock
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from rest_framework.test import APIClient
+
+
+def request_cycle(client):
+    """Запрос с сигналами начала и конца, которые отключает тестовый клиент."""
+    request_started.send(sender=None)
+    assert client.get('/api/v1/categories/').status_code == 200
+    request_finished.send(sender=None)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPersistentConnections:
+
+    def test_connection_reused(self):
+        client = APIClient()
+        request_cycle(client)
+        assert connection.settings_dict['CONN_MAX_AGE'] > 0
+        with mock.patch.object(connection, 'close') as close:
+            request_cycle(client)
+            request_cycle(client)
+        close.assert_not_called()
+
+    def test_obsolete_connection_closed(self):
+        request_cycle(APIClient())
+        connection.close_at = 0
+        with mock.patch.object(connection, 'close') as close:
+            request_finished.send(sender=None)
+        close.assert_called_once()
+
+    def test_broken_connection_closed_before_request(self, settings):
+        settings.DB_CONN_HEALTH_CHECKS = True
+        request_cycle(APIClient())
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            with mock.patch.object(connection, 'close') as close:
+                request_started.send(sender=None)
+        close.assert_called()
+
+    def test_no_health_check_by_default(self):
+        request_cycle(APIClient())
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            request_started.send(sender=None)
+        is_usable.assert_not_called()
+
+
+class TestConnectionPool:
+
+    def test_pool_closes_connections_after_request(self, monkeypatch):
+        from api_yamdb import settings
+        monkeypatch.setenv('DB_ENGINE', 'api_yamdb.db.postgresql_pool')
+        monkeypatch.setenv('DB_CONN_MAX_AGE', '60')
+        try:
+            importlib.reload(settings)
+            assert settings.DATABASES['default']['CONN_MAX_AGE'] == 0, (
+                'Проверьте, что с пулом соединений CONN_MAX_AGE равен 0'
+            )
+        finally:
+            monkeypatch.undo()
+            importlib.reload(settings)
+
+    def test_pool_rejects_persistent_connections(self):
+        from api_yamdb.db.postgresql_pool.base import DatabaseWrapper
+        with pytest.raises(ImproperlyConfigured):
+            DatabaseWrapper({'CONN_MAX_AGE': 60}, 'default')
@@ -0,0 +1,139 @@
+"""
+Планы запросов горячих эндпоинтов: полный просмотр таблицы
+или отдельная сортировка означают, что составной индекс не подходит
+под запрос (или пропал).
+"""
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+def get_plan(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Планировщик выбирает полный просмотр маленьких таблиц,
+            # поэтому проверяется, возможен ли план без него.
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute('SET enable_sort = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = [row[0] for row in cursor.fetchall()]
+            cursor.execute('RESET enable_seqscan')
+            cursor.execute('RESET enable_sort')
+            return plan
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def find_problems(plan, allow_sort=False):
+    problems = []
+    for line in plan:
+        if (re.search(r'Seq Scan on reviews_', line)
+                or re.fullmatch(r'SCAN (TABLE )?reviews_\w+( AS \w+)?', line)):
+            problems.append(line)
+        if not allow_sort and re.search(r'\bSort\b|TEMP B-TREE', line):
+            problems.append(line)
+    return problems
+
+
+# Связанные строки страницы, выбираемые по ключам ее строк: их сортировка
+# в памяти БД допустима, строк в них не больше, чем на странице
+# (с ограничением comments_limit на отзыв).
+PAGE_RELATED = (
+    ('reviews_title_genre', 'title_id'),
+    ('reviews_comment', 'review_id'),
+)
+
+
+def check_query(sql, allow_sort=False):
+    page_related = any(
+        re.search(rf'FROM "{table}" .*"{table}"\."{column}" IN \(', sql)
+        for table, column in PAGE_RELATED
+    )
+    return find_problems(get_plan(sql), allow_sort or page_related)
+
+
+def explain_endpoint(url, allow_sort=False):
+    with CaptureQueriesContext(connection) as context:
+        assert APIClient().get(url).status_code == 200
+    problems = {}
+    for query in context.captured_queries:
+        sql = query['sql']
+        if not sql.startswith('SELECT'):
+            continue
+        found = check_query(sql, allow_sort)
+        if found:
+            problems[sql] = found
+    return problems
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(settings):
+    # Ответ из кэша не выполнил бы проверяемых запросов.
+    settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, 'ENABLED': False}
+
+
+@pytest.fixture
+def catalog(user):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    titles = [Title.objects.create(name=f'Фильм {index}', year=2000 + index,
+                                   category=category)
+              for index in range(3)]
+    for title in titles:
+        title.genre.add(genre)
+    review = Review.objects.create(title=titles[0], author=user,
+                                   text='Отзыв', score=5)
+    Comment.objects.create(review=review, author=user, text='Комментарий')
+    return titles[0], review
+
+
+@pytest.mark.django_db
+class TestHotPathPlans:
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/{title}/',
+        '/api/v1/titles/?pagination=cursor',
+        '/api/v1/titles/{title}/reviews/?pagination=cursor',
+        '/api/v1/titles/{title}/reviews/',
+        '/api/v1/titles/{title}/reviews/?expand=comments',
+        '/api/v1/titles/{title}/reviews/{review}/comments/?pagination=cursor',
+        '/api/v1/titles/{title}/reviews/{review}/comments/',
+        '/api/v1/titles/top/',
+        '/api/v1/titles/top/?category=movie',
+    ])
+    def test_no_scan_or_sort(self, catalog, url):
+        title, review = catalog
+        problems = explain_endpoint(url.format(title=title.pk,
+                                               review=review.pk))
+        assert not problems, (
+            'Проверьте индексы: в плане запроса есть полный просмотр '
+            f'или сортировка: {problems}'
+        )
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/?category=movie&year=2001',
+        '/api/v1/titles/?category=movie&pagination=cursor',
+    ])
+    def test_filters_use_indexes(self, catalog, url):
+        problems = explain_endpoint(url, allow_sort=True)
+        assert not problems, (
+            f'Проверьте индексы: в плане есть полный просмотр: {problems}'
+        )
+
+    def test_sort_allowed_only_for_page_related(self, catalog):
+        title, review = catalog
+        page_genres = str(Title.genre.through.objects
+                          .filter(title_id__in=[title.pk])
+                          .order_by('genre__name').query)
+        assert not check_query(page_genres)
+        by_author = str(Review.objects.filter(author_id__in=[review.author_id])
+                        .order_by('text').query)
+        assert check_query(by_author), (
+            'Проверьте, что сортировка выборки по другому внешнему ключу '
+            'попадает в отчет'
+        )
@@ -0,0 +1,87 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.facets import FACETS, grouped_counts
+from reviews.models import Category, Genre, Title, TitleFacet
+
+from .test_query_counts import assert_num_queries
+
+
+@pytest.fixture
+def catalog():
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    book = Category.objects.create(name='Книга', slug='book')
+    drama, comedy, action = (
+        Genre.objects.create(name=slug, slug=slug)
+        for slug in ('drama', 'comedy', 'action')
+    )
+    titles = [
+        Title.objects.create(name=f'Произведение {index}', year=2000 + index,
+                             category=category)
+        for index, category in enumerate((movie, movie, book, None))
+    ]
+    titles[0].genre.set([drama, comedy])
+    titles[1].genre.set([drama])
+    titles[2].genre.set([comedy, action])
+    return titles
+
+
+def assert_counts_match():
+    assert (TitleFacet.objects.counts(FACETS)
+            == grouped_counts(Title.objects.all(), FACETS)), (
+        'Проверьте, что счетчики TitleFacet совпадают с подсчетом по таблицам'
+    )
+
+
+@pytest.mark.django_db
+class TestTitleFacets:
+
+    def test_counters_follow_changes(self, catalog):
+        assert_counts_match()
+        assert TitleFacet.objects.counts(['genre'])['genre'] == {
+            'drama': 2, 'comedy': 2, 'action': 1
+        }
+        first, second, third, fourth = catalog
+        first.year = 1990
+        first.category = None
+        first.save()
+        first.genre.remove(*Genre.objects.filter(slug__in=['comedy',
+                                                           'action']))
+        third.genre.clear()
+        Genre.objects.get(slug='action').titles.add(second, fourth)
+        assert_counts_match()
+        second.delete()
+        Category.objects.get(slug='book').delete()
+        Genre.objects.get(slug='action').titles.remove(fourth)
+        assert_counts_match()
+        TitleFacet.objects.rebuild()
+        assert_counts_match()
+
+    def test_facets_from_counters(self, catalog):
+        # версия каталога, COUNT(*), страница, жанры страницы
+        # и счетчики срезов
+        with assert_num_queries(5):
+            response = APIClient().get(
+                '/api/v1/titles/?facets=genre,category,year'
+            )
+        assert response.status_code == 200
+        assert response.json()['facets'] == {
+            'genre': {'comedy': 2, 'drama': 2, 'action': 1},
+            'category': {'movie': 2, 'book': 1},
+            'year': {'2000': 1, '2001': 1, '2002': 1, '2003': 1},
+        }
+
+    def test_facets_for_filters(self, catalog):
+        with assert_num_queries(5):
+            response = APIClient().get(
+                '/api/v1/titles/?genre=drama&facets=genre,category'
+            )
+        assert response.status_code == 200
+        assert response.json()['facets'] == {
+            'genre': {'drama': 2, 'comedy': 1},
+            'category': {'movie': 2},
+        }, 'Проверьте, что срезы считаются для отфильтрованных произведений'
+
+    def test_unknown_facet(self):
+        response = APIClient().get('/api/v1/titles/?facets=author')
+        assert response.status_code == 400
+        assert 'facets' in response.json()
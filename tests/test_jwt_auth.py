@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings):
+    # Как с общим кэшем (Memcached): в памяти процесса кэш выключен.
+    settings.JWT_USER_CACHE_TIMEOUT = 60
+
+
+@pytest.fixture
+def token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def count_user_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return sum('"reviews_user"' in query['sql']
+               for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+
+    def test_user_is_cached(self, token_client):
+        count_user_queries(token_client, '/api/v1/categories/')
+        assert count_user_queries(token_client, '/api/v1/categories/') == 0, (
+            'Проверьте, что пользователь токена берется из кэша'
+        )
+
+    def test_no_cache_without_shared_backend(self, settings, token_client):
+        settings.JWT_USER_CACHE_TIMEOUT = 0
+        count_user_queries(token_client, '/api/v1/categories/')
+        assert count_user_queries(token_client, '/api/v1/categories/') == 1, (
+            'Проверьте, что без общего кэша пользователь читается из БД'
+        )
+
+    def test_role_change_invalidates(self, user, token_client):
+        assert token_client.get('/api/v1/users/').status_code == 403
+        user.role = 'admin'
+        user.save()
+        assert token_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что изменение роли сбрасывает кэш пользователя'
+        )
+        user.delete()
+        assert token_client.get('/api/v1/users/').status_code == 401
+
+    def test_me_returns_full_profile(self, user, token_client):
+        user.bio = 'Биография'
+        user.save()
+        response = token_client.get('/api/v1/users/me/')
+        assert response.json()['email'] == user.email
+        assert response.json()['bio'] == 'Биография'
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import (Category, DailyReviewCount, Genre, Review, Title,
+                            User)
+
+
+@pytest.fixture
+def authors():
+    return [
+        User.objects.create(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(5)
+    ]
+
+
+@pytest.fixture
+def titles(authors):
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    single, popular, other = (
+        Title.objects.create(name=name, year=2000, category=category)
+        for name, category in (('Один отзыв', None), ('Популярное', movie),
+                               ('Без отзывов', movie))
+    )
+    single.genre.set([drama])
+    Review.objects.create(title=single, author=authors[0], text='a',
+                          score=10)
+    for author in authors:
+        Review.objects.create(title=popular, author=author, text='a',
+                              score=9)
+    return single, popular, other
+
+
+def names(response):
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()]
+
+
+@pytest.mark.django_db
+class TestLeaderboard:
+
+    def test_weighted_rating(self, titles, authors):
+        single, popular, other = titles
+        for title in titles:
+            title.refresh_from_db()
+        assert single.weighted_rating == pytest.approx((10 + 55) / 11)
+        assert popular.weighted_rating == pytest.approx((45 + 55) / 15), (
+            'Проверьте, что взвешенный рейтинг учитывает число отзывов'
+        )
+        assert other.weighted_rating is None
+
+        Review.objects.filter(title=single).delete()
+        single.refresh_from_db()
+        assert single.weighted_rating is None, (
+            'Проверьте, что без отзывов взвешенного рейтинга нет'
+        )
+        Title.objects.update(weighted_rating=None)
+        call_command('rebuild_ratings')
+        popular.refresh_from_db()
+        assert popular.weighted_rating == pytest.approx((45 + 55) / 15), (
+            'Проверьте, что rebuild_ratings пересчитывает взвешенный рейтинг'
+        )
+
+    def test_daily_counters(self, titles, authors):
+        single, popular, _ = titles
+        today = timezone.localdate()
+        assert dict(DailyReviewCount.objects.filter(day=today)
+                    .values_list('title', 'review_count')) == {
+            single.pk: 1, popular.pk: 5
+        }
+        Review.objects.filter(title=popular, author=authors[0]).delete()
+        assert DailyReviewCount.objects.get(
+            title=popular, day=today
+        ).review_count == 4, (
+            'Проверьте, что удаление отзыва уменьшает счетчик за день'
+        )
+        DailyReviewCount.objects.all().delete()
+        DailyReviewCount.objects.rebuild()
+        assert DailyReviewCount.objects.get(
+            title=popular, day=today
+        ).review_count == 4
+
+    def test_top(self, titles):
+        client = APIClient()
+        assert names(client.get('/api/v1/titles/top/')) == [
+            'Популярное', 'Один отзыв'
+        ], 'Проверьте, что один высокий отзыв не поднимает произведение'
+        assert names(client.get('/api/v1/titles/top/?genre=drama')) == [
+            'Один отзыв'
+        ]
+        assert names(
+            client.get('/api/v1/titles/top/?category=movie&limit=1')
+        ) == ['Популярное']
+        response = client.get('/api/v1/titles/top/?limit=0')
+        assert response.status_code == 400
+        assert 'limit' in response.json()
+
+    def test_trending(self, titles):
+        single, popular, _ = titles
+        Review.objects.filter(title=popular).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        DailyReviewCount.objects.rebuild()
+        assert names(APIClient().get('/api/v1/titles/trending/')) == [
+            'Один отзыв'
+        ], 'Проверьте, что старые отзывы не учитываются в трендах'
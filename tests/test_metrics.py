@@ -0,0 +1,49 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+
+from api.metrics import registry
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    admin = django_user_model.objects.create(
+        username='admin', email='admin@yamdb.fake', role='admin'
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_prometheus_endpoint(self, admin_client, user_client, user):
+        registry.clear()
+        title = Title.objects.create(name='Тест', year=2000)
+        Review.objects.create(title=title, author=user, text='a', score=5)
+        client = APIClient()
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.pk}/reviews/')
+
+        assert user_client.get('/api/v1/metrics/').status_code == 403
+        response = admin_client.get('/api/v1/metrics/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert 'yamdb_request_duration_seconds_count{route="titles-list"} 1' in text
+        # Произведение, количество отзывов, страница отзывов
+        # и число комментариев к ним.
+        assert 'yamdb_request_queries_sum{route="reviews-list"} 4' in text, (
+            'Проверьте, что метрики учитывают запросы к БД по маршрутам'
+        )
+        assert 'yamdb_response_cache_misses_total' in text
+
+    def test_server_timing(self, settings):
+        settings.METRICS = {**settings.METRICS, 'SERVER_TIMING': True}
+        response = APIClient().get('/api/v1/genres/')
+        assert 'db;dur=' in response['Server-Timing']
+        settings.METRICS = {**settings.METRICS, 'SERVER_TIMING': False}
+        assert not APIClient().get('/api/v1/genres/').has_header(
+            'Server-Timing'
+        )
@@ -0,0 +1,110 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Comment, DailyReviewCount, Review, Title, User
+
+from .test_query_counts import assert_num_queries
+
+URL = '/api/v1/moderation/'
+
+
+@pytest.fixture
+def moderator_client():
+    moderator = User.objects.create(username='moderator',
+                                    email='moderator@yamdb.fake',
+                                    role='moderator')
+    client = APIClient()
+    client.force_authenticate(moderator)
+    return client
+
+
+@pytest.fixture
+def spam():
+    """Два произведения: отзывы спамера и обычного пользователя."""
+    spammer = User.objects.create(username='spammer',
+                                  email='spammer@yamdb.fake')
+    reader = User.objects.create(username='reader', email='reader@yamdb.fake')
+    titles = [Title.objects.create(name=f'Произведение {index}', year=2000)
+              for index in range(2)]
+    for title in titles:
+        good = Review.objects.create(title=title, author=reader, text='a',
+                                     score=8)
+        bad = Review.objects.create(title=title, author=spammer, text='b',
+                                    score=1)
+        Comment.objects.create(review=good, author=spammer, text='спам')
+        Comment.objects.create(review=bad, author=reader, text='ответ')
+    return titles
+
+
+def ratings(titles):
+    return [Title.objects.values_list('review_count', 'rating')
+            .get(pk=title.pk) for title in titles]
+
+
+@pytest.mark.django_db
+class TestModeration:
+
+    def test_permissions(self, user_client, spam):
+        data = {'action': 'delete', 'authors': ['spammer']}
+        assert APIClient().post(URL, data,
+                                format='json').status_code == 401
+        assert user_client.post(URL, data, format='json').status_code == 403
+        assert Review.objects.count() == 4
+
+    def test_delete_by_author(self, moderator_client, spam):
+        # автор, произведения отзывов и комментариев, DELETE комментариев
+        # и отзывов, пересчет рейтинга (2), счетчиков отзывов за день (3),
+        # версий и версии кэша ответов — не зависит от числа строк
+        with assert_num_queries(12):
+            response = moderator_client.post(
+                URL, {'action': 'delete', 'authors': ['spammer']},
+                format='json'
+            )
+        assert response.status_code == 200
+        assert response.json() == {'reviews': 2, 'comments': 4}, (
+            'Проверьте, что вместе с отзывами удаляются их комментарии'
+        )
+        assert ratings(spam) == [(1, 8.0), (1, 8.0)], (
+            'Проверьте, что рейтинг пересчитывается после удаления'
+        )
+        assert sum(DailyReviewCount.objects.values_list('review_count',
+                                                        flat=True)) == 2
+        assert not Comment.objects.exists()
+
+    def test_hide_and_unhide(self, moderator_client, user_client, spam):
+        title = spam[0]
+        review = Review.objects.get(title=title, author__username='spammer')
+        comment = Comment.objects.get(review__title=title,
+                                      author__username='spammer')
+        response = moderator_client.post(URL, {
+            'action': 'hide', 'reviews': [review.pk],
+            'comments': [comment.pk],
+        }, format='json')
+        assert response.json() == {'reviews': 1, 'comments': 1}
+        assert ratings([title]) == [(1, 8.0)], (
+            'Проверьте, что скрытый отзыв не учитывается в рейтинге'
+        )
+        reviews = user_client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert [item['id'] for item in reviews.json()['results']] == [
+            review.pk - 1
+        ], 'Проверьте, что скрытые отзывы не показываются'
+        assert user_client.get(
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/'
+        ).status_code == 404
+        comments = user_client.get(
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk - 1}/comments/'
+        )
+        assert comments.json()['results'] == []
+
+        # Повторное скрытие ничего не меняет.
+        assert moderator_client.post(URL, {
+            'action': 'hide', 'reviews': [review.pk]
+        }, format='json').json() == {'reviews': 0, 'comments': 0}
+        moderator_client.post(URL, {'action': 'unhide',
+                                    'authors': ['spammer']}, format='json')
+        assert ratings([title]) == [(2, 4.5)]
+
+    def test_validation(self, moderator_client):
+        assert moderator_client.post(URL, {'action': 'delete'},
+                                     format='json').status_code == 400
+        assert moderator_client.post(URL, {'action': 'ban', 'reviews': [1]},
+                                     format='json').status_code == 400
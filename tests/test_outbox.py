@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import EmailStatus, OutgoingEmail
+from reviews.outbox import claim_batch, dispatch_batch, enqueue_email
+
+SIGNUP_DATA = {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+
+
+@pytest.fixture
+def signup():
+    def post():
+        response = APIClient().post('/api/v1/auth/signup/', SIGNUP_DATA)
+        assert response.status_code == 200
+    return post
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_enqueues_one_email(self, signup):
+        signup()
+        signup()
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо сама'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.to_email == SIGNUP_DATA['email']
+        assert email.body == email.user.confirmation_code, (
+            'Проверьте, что повторная регистрация заменяет текст письма'
+        )
+
+        call_command('dispatch_outbox', '--once', '--workers', '2')
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].body == email.body
+        assert OutgoingEmail.objects.get().status == EmailStatus.SENT
+
+    def test_retry_with_backoff(self, signup):
+        signup()
+        with mock.patch('django.core.mail.EmailMessage.send',
+                        side_effect=OSError('smtp down')):
+            assert dispatch_batch(max_attempts=2,
+                                  backoff=timedelta(0)) == (0, 1)
+            email = OutgoingEmail.objects.get()
+            assert (email.status, email.attempts) == (EmailStatus.PENDING, 1)
+            assert dispatch_batch(max_attempts=2,
+                                  backoff=timedelta(0)) == (0, 1)
+        email.refresh_from_db()
+        assert email.status == EmailStatus.FAILED
+        assert 'smtp down' in email.last_error
+
+    @pytest.mark.parametrize('error', [None, OSError('smtp down')])
+    def test_enqueue_during_dispatch(self, signup, error):
+        signup()
+        queued = OutgoingEmail.objects.get()
+
+        def claim_then_enqueue(batch_size):
+            # Новый код, пока взятая пачка отправляется.
+            emails = claim_batch(batch_size)
+            enqueue_email(queued.user, queued.subject, 'Новый код',
+                          queued.from_email, queued.to_email)
+            return emails
+
+        with mock.patch('reviews.outbox.claim_batch',
+                        side_effect=claim_then_enqueue), \
+                mock.patch('django.core.mail.EmailMessage.send',
+                           side_effect=error):
+            dispatch_batch(max_attempts=1)
+        email = OutgoingEmail.objects.get()
+        assert (email.status, email.attempts, email.body) == (
+            EmailStatus.PENDING, 0, 'Новый код'
+        ), 'Проверьте, что письмо с новым кодом остается в очереди'
+        assert dispatch_batch() == (1, 0)
+        assert mail.outbox[-1].body == 'Новый код'
+        assert OutgoingEmail.objects.get().status == EmailStatus.SENT
@@ -0,0 +1,98 @@
+import json
+from base64 import urlsafe_b64encode
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(settings):
+    settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, 'ENABLED': False}
+
+
+@pytest.fixture
+def titles():
+    # Совпадающие названия: порядок внутри них задает id.
+    return [Title.objects.create(name=name, year=2000)
+            for name in ('Б', 'А', 'Б', 'А', 'В', 'Б', 'А', 'Б', 'А', 'В',
+                         'А', 'Б')]
+
+
+@pytest.fixture
+def reviews(titles, django_user_model):
+    title = titles[0]
+    authors = [django_user_model.objects.create(
+        username=f'author{index}', email=f'author{index}@yamdb.fake'
+    ) for index in range(8)]
+    for author in authors:
+        Review.objects.create(title=title, author=author, text='a', score=5)
+    # Все отзывы с одной датой публикации.
+    Review.objects.update(pub_date=timezone.now())
+    return title
+
+
+def traverse(url):
+    """Проходит все страницы по ссылкам next, возвращает id строк."""
+    client = APIClient()
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data
+        ids.extend(item['id'] for item in data['results'])
+        url = data['next']
+    return ids
+
+
+def cursor(values):
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_titles_with_equal_names(self, titles):
+        ids = traverse('/api/v1/titles/?pagination=cursor')
+        expected = [title.pk for title in sorted(
+            titles, key=lambda title: (title.name, title.pk)
+        )]
+        assert ids == expected, (
+            'Проверьте, что курсор не теряет и не повторяет строки '
+            'с одинаковым ключом сортировки'
+        )
+
+    def test_reviews_with_equal_dates(self, reviews):
+        ids = traverse(f'/api/v1/titles/{reviews.pk}/reviews/'
+                       '?pagination=cursor')
+        assert ids == sorted(reviews.reviews.values_list('pk', flat=True))
+
+    @pytest.mark.parametrize('value', [
+        'не курсор',
+        cursor(['А']),
+        cursor(['А', 'не число']),
+        cursor({'name': 'А', 'id': 1}),
+        urlsafe_b64encode(b'not json').decode(),
+    ])
+    def test_invalid_cursor(self, titles, value):
+        response = APIClient().get('/api/v1/titles/', {'cursor': value})
+        assert response.status_code == 404, (
+            'Проверьте, что неверный курсор дает 404'
+        )
+
+    def test_no_count_query(self, titles, reviews):
+        for url in ('/api/v1/titles/?pagination=cursor',
+                    f'/api/v1/titles/?cursor={cursor(["А", 0])}',
+                    f'/api/v1/titles/{reviews.pk}/reviews/'
+                    '?pagination=cursor'):
+            with CaptureQueriesContext(connection) as context:
+                assert APIClient().get(url).status_code == 200
+            # Число комментариев к отзывам страницы — не подсчет записей.
+            assert not any('COUNT(*)' in query['sql']
+                           for query in context.captured_queries), (
+                'Проверьте, что страница курсора не считает число записей'
+            )
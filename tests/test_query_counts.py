@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review, Title
+
+
+@contextmanager
+def assert_num_queries(expected):
+    """
+    Проверяет число запросов без SAVEPOINT: их добавляет транзакция теста,
+    в работающем приложении их нет.
+    """
+    with CaptureQueriesContext(connection) as context:
+        yield
+    queries = [query['sql'] for query in context.captured_queries
+               if 'SAVEPOINT' not in query['sql']]
+    assert len(queries) == expected, (
+        f'Ожидалось запросов: {expected}, выполнено: {len(queries)}\n'
+        + '\n'.join(queries)
+    )
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Тест', year=2000)
+
+
+@pytest.fixture
+def review(title, django_user_model):
+    author = django_user_model.objects.create(username='author',
+                                              email='author@yamdb.fake')
+    return Review.objects.create(title=title, author=author,
+                                 text='Отзыв', score=5)
+
+
+@pytest.mark.django_db
+class TestNestedQueryCounts:
+
+    def test_review_list(self, user_client, review):
+        # произведение, COUNT(*), страница отзывов с авторами
+        # и число комментариев к отзывам страницы
+        with assert_num_queries(4):
+            response = user_client.get(
+                f'/api/v1/titles/{review.title_id}/reviews/'
+            )
+        assert response.status_code == 200
+
+    def test_review_list_expand_comments(self, user_client, review):
+        for text in ('Первый', 'Второй', 'Третий'):
+            Comment.objects.create(review=review, author=review.author,
+                                   text=text)
+        # комментарии и их число — одним оконным запросом на страницу
+        with assert_num_queries(4):
+            response = user_client.get(
+                f'/api/v1/titles/{review.title_id}/reviews/'
+                '?expand=comments&comments_limit=2'
+            )
+        assert response.status_code == 200
+        result = response.json()['results'][0]
+        assert result['comment_count'] == 3
+        assert [comment['text'] for comment in result['comments']] == [
+            'Первый', 'Второй'
+        ], 'Проверьте, что встраиваются первые комментарии отзыва'
+
+    def test_review_create(self, user_client, title):
+        # произведение, INSERT отзыва, счетчик отзывов за день
+        # (INSERT ... ON CONFLICT), UPDATE рейтинга и версия кэша ответов
+        with assert_num_queries(5):
+            response = user_client.post(
+                f'/api/v1/titles/{title.pk}/reviews/',
+                {'text': 'Отзыв', 'score': 7}
+            )
+        assert response.status_code == 201
+
+    def test_duplicate_review(self, user_client, title, user):
+        Review.objects.create(title=title, author=user, text='a', score=1)
+        response = user_client.post(f'/api/v1/titles/{title.pk}/reviews/',
+                                    {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв на произведение запрещен'
+        )
+        assert 'non_field_errors' in response.json()
+        title.refresh_from_db()
+        assert title.review_count == 1
+
+    def test_comment_list(self, user_client, review):
+        Comment.objects.create(review=review, author=review.author,
+                               text='Комментарий')
+        # отзыв с произведением, COUNT(*) и страница комментариев
+        with assert_num_queries(3):
+            response = user_client.get(
+                f'/api/v1/titles/{review.title_id}'
+                f'/reviews/{review.pk}/comments/'
+            )
+        assert response.status_code == 200
+
+    def test_comment_create(self, user_client, review):
+        # отзыв с произведением, INSERT комментария и версия произведения
+        with assert_num_queries(3):
+            response = user_client.post(
+                f'/api/v1/titles/{review.title_id}'
+                f'/reviews/{review.pk}/comments/',
+                {'text': 'Комментарий'}
+            )
+        assert response.status_code == 201
+
+    def test_comment_review_of_other_title(self, user_client, review):
+        other = Title.objects.create(name='Другое', year=2001)
+        response = user_client.get(
+            f'/api/v1/titles/{other.pk}/reviews/{review.pk}/comments/'
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв должен относиться к произведению из URL'
+        )
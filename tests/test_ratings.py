@@ -0,0 +1,72 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Review, Title, User
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Тест', year=2000)
+
+
+@pytest.fixture
+def authors():
+    return [
+        User.objects.create(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_review_create_update_delete(self, title, authors):
+        first = Review.objects.create(title=title, author=authors[0],
+                                      text='a', score=4)
+        Review.objects.create(title=title, author=authors[1],
+                              text='b', score=9)
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum) == (2, 13), (
+            'Проверьте, что создание отзыва обновляет агрегаты рейтинга'
+        )
+        assert title.rating == 6.5
+
+        first.score = 10
+        first.save()
+        title.refresh_from_db()
+        assert title.score_sum == 19, (
+            'Проверьте, что изменение оценки обновляет сумму оценок'
+        )
+
+        Review.objects.get(pk=first.pk).delete()
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum, title.rating) == (
+            1, 9, 9.0
+        ), 'Проверьте, что удаление отзыва исключает его из рейтинга'
+
+    def test_cascade_delete(self, title, authors):
+        for author in authors:
+            Review.objects.create(title=title, author=author,
+                                  text='a', score=3)
+        authors[0].delete()
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum) == (2, 6), (
+            'Проверьте, что каскадное удаление отзывов обновляет рейтинг'
+        )
+        Review.objects.filter(title=title).delete()
+        title.refresh_from_db()
+        assert (title.review_count, title.rating) == (0, None)
+
+    def test_rebuild_ratings(self, title, authors):
+        Review.objects.bulk_create([
+            Review(title=title, author=author, text='a', score=i + 1)
+            for i, author in enumerate(authors)
+        ])
+        version, modified = title.version, title.modified
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        assert (title.review_count, title.score_sum, title.rating) == (
+            3, 6, 2.0
+        ), 'Проверьте, что команда rebuild_ratings пересчитывает рейтинг'
+        assert title.version > version and title.modified > modified, (
+            'Проверьте, что пересчет рейтинга меняет версию произведения'
+        )
@@ -0,0 +1,56 @@
+import io
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from api import parsers, renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+DATA = OrderedDict([
+    ('results', ReturnList([
+        {'name': 'Мир', 'rating': 7.25, 'genre': [], 'category': None},
+    ], serializer=None)),
+    ('utc', datetime(2022, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)),
+    ('msk', datetime(2022, 5, 1, 12, 30, tzinfo=timezone(timedelta(hours=3)))),
+    ('naive', datetime(2022, 5, 1, 12, 30)),
+    ('date', date(2022, 5, 1)),
+    ('decimal', Decimal('1.5')),
+    ('duration', timedelta(minutes=1)),
+    ('lazy', gettext_lazy('Неверный курсор.')),
+    ('separators', 'a\u2028b\u2029c'),
+    (1, 'ключ-число'),
+])
+
+
+@pytest.mark.parametrize('orjson', [renderers.orjson, None])
+def test_renderer_matches_drf(orjson):
+    with mock.patch.object(renderers, 'orjson', orjson):
+        content = FastJSONRenderer().render(DATA, 'application/json')
+    assert content == JSONRenderer().render(DATA, 'application/json'), (
+        'Проверьте, что ответ совпадает с ответом JSONRenderer'
+    )
+    assert FastJSONRenderer().render(None) == b''
+
+
+def test_renderer_indent_falls_back():
+    assert (FastJSONRenderer().render(DATA, 'application/json; indent=4')
+            == JSONRenderer().render(DATA, 'application/json; indent=4'))
+
+
+@pytest.mark.parametrize('orjson', [parsers.orjson, None])
+def test_parser(orjson):
+    body = '{"text": "Отзыв", "score": 7}'.encode()
+    with mock.patch.object(parsers, 'orjson', orjson):
+        assert (FastJSONParser().parse(io.BytesIO(body))
+                == JSONParser().parse(io.BytesIO(body)))
+        for invalid in (b'{"score": NaN}', b'{"text": '):
+            with pytest.raises(ParseError):
+                FastJSONParser().parse(io.BytesIO(invalid))
@@ -0,0 +1,81 @@
+import pytest
+from api.cache import response_cache
+from django.db import connections
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Category, Genre, Title, User
+
+from api_yamdb.db.routers import ReplicaRouter, use_replicas
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    """Вторая БД SQLite в роли отстающей реплики."""
+    connections.settings['replica'] = {
+        **connections.settings['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, 'ENABLED': True}
+    response_cache.backend.clear()
+    with connections['replica'].schema_editor() as editor:
+        for model in (User, Category, Genre, Title):
+            editor.create_model(model)
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+def get_titles(client):
+    response = client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    return response
+
+
+def title_names(client):
+    return [title['name'] for title in get_titles(client).json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouting:
+
+    def test_router(self, replica):
+        router = ReplicaRouter()
+        assert router.db_for_read(Title) == 'default'
+        with use_replicas():
+            assert router.db_for_read(Title) == 'replica'
+        assert router.db_for_write(Title) == 'default'
+        assert not router.allow_migrate('replica', 'reviews')
+
+    def test_reads_go_to_replica_until_write(self, replica, user):
+        user.save(using=replica)
+        title = Title.objects.create(name='Основная', year=2000)
+        Title.objects.using(replica).create(name='Реплика', year=2000)
+        author = APIClient()
+        author.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        assert title_names(author) == ['Реплика'], (
+            'Проверьте, что GET-запросы читают с реплики'
+        )
+        response = author.post(f'/api/v1/titles/{title.pk}/reviews/',
+                               {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        # Запись изменила версию кэша, но реплика ее еще не получила.
+        assert title_names(APIClient()) == ['Реплика']
+        assert title_names(author) == ['Основная'], (
+            'Проверьте, что после записи автор читает из основной БД '
+            'и ответ с реплики не сохранен в кэше'
+        )
+        assert get_titles(author)['X-Cache'] == 'HIT'
+        assert title_names(APIClient()) == ['Основная'], (
+            'Проверьте, что из кэша отдаются ответы основной БД'
+        )
+
+    def test_no_etag_from_replica(self, replica):
+        Title.objects.create(name='Основная', year=2000)
+        response = get_titles(APIClient())
+        assert not response.has_header('ETag'), (
+            'Проверьте, что ответы с реплики не получают ETag'
+        )
@@ -0,0 +1,109 @@
+import pytest
+from api.cache import LocMemLRUBackend, ResponseCache, response_cache
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .test_query_counts import assert_num_queries
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(settings):
+    settings.RESPONSE_CACHE = {**settings.RESPONSE_CACHE, 'ENABLED': True}
+    response_cache.backend.clear()
+
+
+@pytest.fixture
+def title(user):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Тест', year=2000, category=category)
+    title.genre.set([genre])
+    return title
+
+
+def get(url):
+    response = APIClient().get(url)
+    assert response.status_code == 200
+    return response
+
+
+def write_title(title, user):
+    title.name = 'Новое название'
+    title.save()
+
+
+def write_review(title, user):
+    Review.objects.create(title=title, author=user, text='Отзыв', score=7)
+
+
+def write_category(title, user):
+    title.category.delete()
+
+
+def write_genre(title, user):
+    genre = Genre.objects.get(slug='drama')
+    genre.name = 'Мелодрама'
+    genre.save()
+
+
+def write_title_genres(title, user):
+    title.genre.clear()
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    @pytest.mark.parametrize('url', ['/api/v1/titles/',
+                                     '/api/v1/categories/',
+                                     '/api/v1/genres/'])
+    def test_hit_and_miss(self, title, url):
+        assert get(url)['X-Cache'] == 'MISS'
+        # только версия ресурса по первичному ключу
+        with assert_num_queries(1):
+            response = get(url)
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный запрос отдается из кэша'
+        )
+        assert get(url + '?search=x')['X-Cache'] == 'MISS', (
+            'Проверьте, что параметры запроса входят в ключ кэша'
+        )
+
+    @pytest.mark.parametrize('write', [
+        write_title, write_review, write_category, write_genre,
+        write_title_genres,
+    ])
+    def test_invalidation(self, title, user, write):
+        url = f'/api/v1/titles/{title.pk}/'
+        before = get(url).json()
+        assert get(url)['X-Cache'] == 'HIT'
+        write(title, user)
+        response = get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись сбрасывает кэш ответов произведений'
+        )
+        assert response.json() != before
+
+    def test_comment_write(self, title, user):
+        review = Review.objects.create(title=title, author=user, text='a',
+                                       score=5)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert get(url).json()['results'][0]['comment_count'] == 0
+        Comment.objects.create(review=review, author=user, text='Ответ')
+        assert get(url).json()['results'][0]['comment_count'] == 1, (
+            'Проверьте, что отзывы не отдаются устаревшими после '
+            'комментария'
+        )
+
+    def test_versions_shared_between_processes(self, title):
+        # Два процесса: свои кэши ответов в памяти, общие версии в БД.
+        first, second = (ResponseCache(LocMemLRUBackend()) for _ in range(2))
+        request = Request(RequestFactory().get('/api/v1/titles/'))
+        request.accepted_renderer = type('Renderer', (), {'format': 'json'})
+        key = second.make_key('titles', request)
+        assert first.make_key('titles', request) == key
+        first.invalidate('titles')
+        assert second.make_key('titles', request) != key, (
+            'Проверьте, что версия кэша меняется для всех процессов'
+        )
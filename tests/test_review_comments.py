@@ -0,0 +1,71 @@
+from unittest import mock
+
+import pytest
+from django.db import connection
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture
+def reviews(user, django_user_model):
+    title = Title.objects.create(name='Тест', year=2000)
+    other = django_user_model.objects.create(username='other',
+                                             email='other@yamdb.fake')
+    first, second = (
+        Review.objects.create(title=title, author=author, text='a', score=5)
+        for author in (user, other)
+    )
+    for index in range(4):
+        Comment.objects.create(review=first, author=other,
+                               text=f'Комментарий {index}',
+                               is_hidden=index == 1)
+    return first, second
+
+
+@pytest.mark.django_db
+class TestReviewComments:
+
+    def test_first_by_review(self, reviews):
+        first, second = reviews
+        counts, comments = Comment.objects.first_by_review(
+            [first.pk, second.pk], 2
+        )
+        assert counts == {first.pk: 3}, (
+            'Проверьте, что скрытые комментарии не учитываются'
+        )
+        assert [comment.text for comment in comments[first.pk]] == [
+            'Комментарий 0', 'Комментарий 2'
+        ]
+        assert comments[first.pk][0].author_name == 'other'
+        with mock.patch.object(connection.features, 'supports_over_clause',
+                               False):
+            fallback = Comment.objects.first_by_review(
+                [first.pk, second.pk], 2
+            )
+        assert fallback[0] == counts
+        assert ({pk: [comment.pk for comment in items]
+                 for pk, items in fallback[1].items()}
+                == {pk: [comment.pk for comment in items]
+                    for pk, items in comments.items()})
+
+    def test_expand(self, user_client, reviews):
+        first, second = reviews
+        url = f'/api/v1/titles/{first.title_id}/reviews/'
+        results = user_client.get(url).json()['results']
+        assert [review['comment_count'] for review in results] == [3, 0]
+        assert 'comments' not in results[0], (
+            'Проверьте, что комментарии встраиваются только с ?expand'
+        )
+        results = user_client.get(url + '?expand=comments').json()['results']
+        assert [len(review['comments']) for review in results] == [3, 0]
+        assert user_client.get(
+            url + '?expand=comments&comments_limit=100'
+        ).status_code == 400
+        assert user_client.get(url + '?expand=votes').status_code == 400
+
+    def test_create_response(self, user_client, reviews):
+        title = reviews[0].title
+        Review.objects.filter(title=title).delete()
+        response = user_client.post(f'/api/v1/titles/{title.pk}/reviews/',
+                                    {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['comment_count'] == 0
@@ -0,0 +1,57 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+
+
+@pytest.fixture
+def titles():
+    return [
+        Title.objects.create(name='Война и мир', year=1869,
+                             description='Роман о войне 1812 года'),
+        Title.objects.create(name='Мир', year=2000,
+                             description='Мир мир мир'),
+        Title.objects.create(name='Идиот', year=1869,
+                             description='Роман'),
+    ]
+
+
+@pytest.mark.django_db
+class TestFullTextSearch:
+
+    def test_titles_ranked(self, titles):
+        response = APIClient().get('/api/v1/titles/?q=мир')
+        assert response.status_code == 200
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Мир', 'Война и мир'], (
+            'Проверьте, что ?q= отбирает совпадения и сортирует '
+            'их по релевантности'
+        )
+
+    def test_no_pragma_per_request(self, titles):
+        APIClient().get('/api/v1/titles/?q=мир')
+        with CaptureQueriesContext(connection) as context:
+            APIClient().get('/api/v1/titles/?q=война')
+        assert not any('PRAGMA' in query['sql']
+                       for query in context.captured_queries), (
+            'Проверьте, что поддержка FTS5 проверяется один раз'
+        )
+
+    def test_index_follows_changes(self, titles):
+        titles[2].name = 'Мир идиота'
+        titles[2].save()
+        titles[0].delete()
+        response = APIClient().get('/api/v1/titles/?q=мир&ordering=name')
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Мир', 'Мир идиота'], (
+            'Проверьте, что индекс обновляется при изменении и удалении'
+        )
+
+    def test_reviews(self, titles, user):
+        Review.objects.create(title=titles[0], author=user,
+                              text='Длинно, но хорошо', score=8)
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+        client = APIClient()
+        assert client.get(url + '?q=хорошо').json()['count'] == 1
+        assert client.get(url + '?q=плохо').json()['count'] == 0
@@ -0,0 +1,31 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+from reviews.models import Comment, Review, Title
+from reviews.synthetic import zipf_counts
+
+
+def test_zipf_counts():
+    counts = zipf_counts(1000, 50, 1.1, limit=100)
+    assert sum(counts) == 1000
+    assert max(counts) == 100, (
+        'Проверьте, что отзывов на произведение не больше числа авторов'
+    )
+    assert counts == sorted(counts, reverse=True)
+
+
+@pytest.mark.django_db
+def test_generate_dataset_appends_data():
+    options = ['--titles', '20', '--reviews', '300', '--users', '40',
+               '--comments', '50', '--categories', '3', '--genres', '5']
+    call_command('generate_dataset', *options)
+    call_command('generate_dataset', *options, '--seed', '1')
+    assert Title.objects.count() == 40
+    assert Review.objects.count() == 600
+    assert Comment.objects.count() == 100
+    counts = Title.objects.annotate(
+        reviews_total=Count('reviews')
+    ).values_list('review_count', 'reviews_total')
+    assert all(stored == actual for stored, actual in counts), (
+        'Проверьте, что после загрузки пересчитывается рейтинг'
+    )
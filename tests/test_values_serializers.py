@@ -0,0 +1,86 @@
+from unittest import mock
+
+import pytest
+from api.serializers import ValuesSerializer
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [Genre.objects.create(name=name, slug=slug)
+              for name, slug in (('Драма', 'drama'), ('Боевик', 'action'))]
+    titles = [
+        Title.objects.create(name=f'Мир {index}', year=2000 + index,
+                             description='Мир и война',
+                             category=category if index else None)
+        for index in range(7)
+    ]
+    for title in titles[1:]:
+        title.genre.set(genres[:title.pk % 2 + 1])
+    authors = [django_user_model.objects.create(username=f'author{index}',
+                                                email=f'{index}@yamdb.fake')
+               for index in range(7)]
+    reviews = [Review.objects.create(title=titles[1], author=author,
+                                     text=f'Мир {index}', score=index % 3 + 4)
+               for index, author in enumerate(authors)]
+    for author in authors:
+        Comment.objects.create(review=reviews[0], author=author, text='Мир')
+    return titles[1], reviews[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', [
+    '/api/v1/titles/',
+    '/api/v1/titles/?page=2',
+    '/api/v1/titles/?ordering=-rating',
+    '/api/v1/titles/?pagination=cursor',
+    '/api/v1/titles/?genre=drama&q=мир',
+    '/api/v1/titles/{title}/',
+    '/api/v1/titles/{title}/reviews/',
+    '/api/v1/titles/{title}/reviews/?pagination=cursor',
+    '/api/v1/titles/{title}/reviews/?q=мир',
+    '/api/v1/titles/{title}/reviews/{review}/',
+    '/api/v1/titles/{title}/reviews/?expand=comments&comments_limit=2',
+    '/api/v1/titles/{title}/reviews/{review}/?expand=comments',
+    '/api/v1/titles/{title}/reviews/{review}/comments/',
+    '/api/v1/titles/{title}/reviews/{review}/comments/?page=2',
+])
+def test_values_serializers_match(catalog, settings, url):
+    settings.RESPONSE_CACHE = dict(settings.RESPONSE_CACHE, ENABLED=False)
+    title, review = catalog
+    url = url.format(title=title.pk, review=review.pk)
+    fast = APIClient().get(url)
+    assert fast.status_code == 200
+    with mock.patch.object(TitleViewSet, 'values_serializer_class', None), \
+            mock.patch.object(ReviewViewSet, 'values_serializer_class', None), \
+            mock.patch.object(CommentViewSet, 'values_serializer_class',
+                              None):
+        regular = APIClient().get(url)
+    assert fast.content == regular.content, (
+        'Проверьте, что быстрые сериализаторы отдают тот же ответ'
+    )
+
+
+@pytest.mark.django_db
+def test_title_write_response_fields(catalog, user_client, user):
+    user.role = 'admin'
+    user.save()
+    payload = {'name': 'Новое', 'year': 2001, 'description': '',
+               'genre': ['drama'], 'category': 'movie'}
+    created = user_client.post('/api/v1/titles/', payload, format='json')
+    assert created.status_code == 201
+    updated = user_client.patch(f'/api/v1/titles/{created.json()["id"]}/',
+                                {'name': 'Другое'}, format='json')
+    assert updated.status_code == 200
+    for response in (created, updated):
+        assert set(response.json()) == {
+            'id', 'name', 'year', 'description', 'genre', 'category'
+        }, 'Проверьте, что ответ на запись не содержит служебных полей'
+
+
+def test_values_serializer_is_abstract():
+    with pytest.raises(TypeError):
+        ValuesSerializer()